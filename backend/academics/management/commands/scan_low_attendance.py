@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from academics.models import Attendance
+from academics.utils import run_low_attendance_scan
+
+
+class Command(BaseCommand):
+    help = 'Flag students below an attendance threshold per subject and store the results'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--course',
+            help='Course code to scan (default: every course/intake/semester with attendance)',
+        )
+        parser.add_argument(
+            '--intake',
+            help='Intake to scan (requires --course)',
+        )
+        parser.add_argument(
+            '--semester',
+            help='Semester to scan (requires --course)',
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=75,
+            help='Attendance percentage below which students are flagged (default: 75)',
+        )
+
+    def handle(self, *args, **options):
+        course = options.get('course')
+        intake = options.get('intake')
+        semester = options.get('semester')
+        threshold = options['threshold']
+
+        if not 0 < threshold <= 100:
+            raise CommandError('--threshold must be between 0 and 100')
+        if (intake or semester) and not course:
+            raise CommandError('--intake and --semester require --course')
+
+        if course:
+            cohorts = [(course, intake, semester)]
+        else:
+            cohorts = list(
+                Attendance.objects.order_by('course', 'intake', 'semester')
+                .values_list('course', 'intake', 'semester')
+                .distinct()
+            )
+
+        if not cohorts:
+            self.stdout.write(self.style.WARNING('No attendance records found.'))
+            return
+
+        total_flagged = 0
+        for cohort_course, cohort_intake, cohort_semester in cohorts:
+            scan = run_low_attendance_scan(
+                cohort_course, intake=cohort_intake, semester=cohort_semester, threshold=threshold
+            )
+            total_flagged += scan.flagged_count
+            self.stdout.write(
+                f'{scan.course} {scan.intake or "all"} {scan.semester or "all"}: '
+                f'{scan.students_scanned} students scanned, {scan.flagged_count} flagged'
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Scanned {len(cohorts)} cohort(s); {total_flagged} student/subject pairs below {threshold:g}%'
+        ))
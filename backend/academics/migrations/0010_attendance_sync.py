@@ -0,0 +1,51 @@
+# Generated by Django 5.0 on 2026-10-19 00:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0009_attendance'),
+        ('accounts', '0008_student_major_student_major_locked'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceSyncOperation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(help_text='Client-generated key identifying a single attendance delta', max_length=64, unique=True)),
+                ('outcome', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('stale', 'Stale (newer server version kept)')], help_text='How the delta was applied', max_length=10)),
+                ('client_timestamp', models.DateTimeField(help_text='When the change was made on the client')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Attendance Sync Operation',
+                'verbose_name_plural': 'Attendance Sync Operations',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='client_modified_at',
+            field=models.DateTimeField(blank=True, help_text='Client-side timestamp of the last offline edit (used for last-writer-wins sync)', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['updated_at'], name='academics_a_updated_2c2eae_idx'),
+        ),
+        migrations.AddField(
+            model_name='attendancesyncoperation',
+            name='attendance',
+            field=models.ForeignKey(blank=True, help_text='Attendance record affected by this delta', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sync_operations', to='academics.attendance'),
+        ),
+        migrations.AddField(
+            model_name='attendancesyncoperation',
+            name='submitted_by',
+            field=models.ForeignKey(blank=True, help_text='User who pushed the delta', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attendance_sync_operations', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
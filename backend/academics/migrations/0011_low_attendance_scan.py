@@ -0,0 +1,61 @@
+# Generated by Django 5.0 on 2026-10-19 00:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0010_attendance_sync'),
+        ('accounts', '0008_student_major_student_major_locked'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LowAttendanceScan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('course', models.CharField(help_text='Course code (BBA, MBA, CSE, THM)', max_length=10)),
+                ('intake', models.CharField(blank=True, help_text='Intake number (blank = all intakes)', max_length=10, null=True)),
+                ('semester', models.CharField(blank=True, help_text='Semester (blank = all semesters)', max_length=10, null=True)),
+                ('threshold', models.DecimalField(decimal_places=2, default=75, help_text='Attendance percentage below which a student is flagged', max_digits=5)),
+                ('students_scanned', models.PositiveIntegerField(default=0, help_text='Number of students with attendance in scope')),
+                ('flagged_count', models.PositiveIntegerField(default=0, help_text='Number of student/subject pairs below the threshold')),
+                ('scanned_at', models.DateTimeField(auto_now_add=True)),
+                ('triggered_by', models.ForeignKey(blank=True, help_text='User who ran the scan (empty for scheduled runs)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='low_attendance_scans', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Low Attendance Scan',
+                'verbose_name_plural': 'Low Attendance Scans',
+                'ordering': ['-scanned_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LowAttendanceFlag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_classes', models.PositiveIntegerField(help_text='Classes recorded for the student in this subject')),
+                ('present', models.PositiveIntegerField(help_text='Classes attended')),
+                ('attendance_percentage', models.DecimalField(decimal_places=2, help_text='Attendance percentage at scan time', max_digits=5)),
+                ('student', models.ForeignKey(help_text='Student', on_delete=django.db.models.deletion.CASCADE, related_name='low_attendance_flags', to='accounts.student')),
+                ('subject', models.ForeignKey(help_text='Subject', on_delete=django.db.models.deletion.CASCADE, related_name='low_attendance_flags', to='academics.subject')),
+                ('scan', models.ForeignKey(help_text='Scan that produced this flag', on_delete=django.db.models.deletion.CASCADE, related_name='flags', to='academics.lowattendancescan')),
+            ],
+            options={
+                'verbose_name': 'Low Attendance Flag',
+                'verbose_name_plural': 'Low Attendance Flags',
+                'ordering': ['attendance_percentage', 'student__student_id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='lowattendancescan',
+            index=models.Index(fields=['course', 'intake', 'semester', 'scanned_at'], name='academics_l_course_00e926_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='lowattendanceflag',
+            unique_together={('scan', 'student', 'subject')},
+        ),
+    ]
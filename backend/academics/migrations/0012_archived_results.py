@@ -0,0 +1,59 @@
+# Generated by Django 5.0 on 2026-10-19 01:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0011_low_attendance_scan'),
+        ('accounts', '0015_cohort_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAttendance',
+            fields=[
+                ('id', models.BigIntegerField(help_text='Primary key of the original Attendance record', primary_key=True, serialize=False)),
+                ('date', models.DateField(help_text='Date of the class')),
+                ('status', models.CharField(choices=[('present', 'Present'), ('absent', 'Absent')], help_text='Attendance status (Present/Absent)', max_length=10)),
+                ('course', models.CharField(help_text='Course code', max_length=10)),
+                ('intake', models.CharField(help_text='Intake number', max_length=10)),
+                ('semester', models.CharField(help_text='Semester', max_length=10)),
+                ('session', models.CharField(blank=True, help_text='Academic session', max_length=50, null=True)),
+                ('remarks', models.TextField(blank=True, help_text='Additional remarks', null=True)),
+                ('client_modified_at', models.DateTimeField(blank=True, help_text='Client-side timestamp of the last offline edit', null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('student', models.ForeignKey(help_text='Student', on_delete=django.db.models.deletion.CASCADE, related_name='archived_attendances', to='accounts.student')),
+                ('subject', models.ForeignKey(help_text='Subject', on_delete=django.db.models.deletion.CASCADE, related_name='archived_attendances', to='academics.subject')),
+            ],
+            options={
+                'verbose_name': 'Archived Attendance',
+                'verbose_name_plural': 'Archived Attendance Records',
+                'ordering': ['-date', 'student'],
+                'indexes': [models.Index(fields=['student', 'date'], name='academics_a_student_f75b1d_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedResult',
+            fields=[
+                ('id', models.BigIntegerField(help_text='Primary key of the original Result', primary_key=True, serialize=False)),
+                ('marks_obtained', models.DecimalField(decimal_places=2, help_text='Marks obtained by student', max_digits=5)),
+                ('remarks', models.TextField(blank=True, help_text='Additional remarks', null=True)),
+                ('teacher_comment', models.TextField(blank=True, help_text='Teacher comment for this result', null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('exam', models.ForeignKey(help_text='Exam', on_delete=django.db.models.deletion.CASCADE, related_name='archived_results', to='academics.exam')),
+                ('student', models.ForeignKey(help_text='Student', on_delete=django.db.models.deletion.CASCADE, related_name='archived_results', to='accounts.student')),
+                ('subject', models.ForeignKey(help_text='Subject', on_delete=django.db.models.deletion.CASCADE, related_name='archived_results', to='academics.subject')),
+            ],
+            options={
+                'verbose_name': 'Archived Result',
+                'verbose_name_plural': 'Archived Results',
+                'ordering': ['-exam__exam_date', 'student'],
+                'indexes': [models.Index(fields=['student'], name='academics_a_student_680533_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0 on 2026-10-19 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0012_archived_results'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attendancesyncoperation',
+            name='attendance',
+            field=models.ForeignKey(blank=True, db_constraint=False, help_text='Attendance record affected by this delta', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sync_operations', to='academics.attendance'),
+        ),
+    ]
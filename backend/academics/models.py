@@ -497,6 +497,12 @@ class Attendance(models.Model):
         help_text='Additional remarks'
     )
     
+    client_modified_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text='Client-side timestamp of the last offline edit (used for last-writer-wins sync)'
+    )
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -513,7 +519,351 @@ class Attendance(models.Model):
             models.Index(fields=['subject']),
             models.Index(fields=['student']),
             models.Index(fields=['course', 'intake', 'semester', 'subject', 'date']),
+            models.Index(fields=['updated_at']),
         ]
     
     def __str__(self):
         return f"{self.student.student_id} - {self.subject.name} - {self.date} - {self.status}"
+    
+    @property
+    def last_modified_at(self):
+        """
+        Timestamp used for last-writer-wins conflict resolution.
+        Falls back to the server write time for records saved online.
+        """
+        return self.client_modified_at or self.updated_at
+
+
+class AttendanceSyncOperation(models.Model):
+    """
+    Idempotency log for offline attendance sync.
+    Every delta pushed by a client is recorded once by its idempotency key,
+    so replayed batches are recognised and not applied twice.
+    """
+    
+    OUTCOME_CHOICES = [
+        ('created', 'Created'),
+        ('updated', 'Updated'),
+        ('stale', 'Stale (newer server version kept)'),
+    ]
+    
+    idempotency_key = models.CharField(
+        max_length=64,
+        unique=True,
+        help_text='Client-generated key identifying a single attendance delta'
+    )
+    
+    # No database constraint: archiving a cohort moves its attendance out and
+    # back with the same ids, and the pointer must survive the round trip
+    attendance = models.ForeignKey(
+        Attendance,
+        on_delete=models.SET_NULL,
+        related_name='sync_operations',
+        null=True,
+        blank=True,
+        db_constraint=False,
+        help_text='Attendance record affected by this delta'
+    )
+    
+    outcome = models.CharField(
+        max_length=10,
+        choices=OUTCOME_CHOICES,
+        help_text='How the delta was applied'
+    )
+    
+    client_timestamp = models.DateTimeField(
+        help_text='When the change was made on the client'
+    )
+    
+    submitted_by = models.ForeignKey(
+        'accounts.User',
+        on_delete=models.SET_NULL,
+        related_name='attendance_sync_operations',
+        null=True,
+        blank=True,
+        help_text='User who pushed the delta'
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Attendance Sync Operation'
+        verbose_name_plural = 'Attendance Sync Operations'
+    
+    def __str__(self):
+        return f"{self.idempotency_key} - {self.outcome}"
+
+
+class LowAttendanceScan(models.Model):
+    """
+    A batch scan of per-student, per-subject attendance rates for a cohort.
+    Stores when the scan ran and which threshold was applied.
+    """
+    
+    course = models.CharField(
+        max_length=10,
+        help_text='Course code (BBA, MBA, CSE, THM)'
+    )
+    
+    intake = models.CharField(
+        max_length=10,
+        blank=True,
+        null=True,
+        help_text='Intake number (blank = all intakes)'
+    )
+    
+    semester = models.CharField(
+        max_length=10,
+        blank=True,
+        null=True,
+        help_text='Semester (blank = all semesters)'
+    )
+    
+    threshold = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        default=75,
+        help_text='Attendance percentage below which a student is flagged'
+    )
+    
+    students_scanned = models.PositiveIntegerField(
+        default=0,
+        help_text='Number of students with attendance in scope'
+    )
+    
+    flagged_count = models.PositiveIntegerField(
+        default=0,
+        help_text='Number of student/subject pairs below the threshold'
+    )
+    
+    triggered_by = models.ForeignKey(
+        'accounts.User',
+        on_delete=models.SET_NULL,
+        related_name='low_attendance_scans',
+        null=True,
+        blank=True,
+        help_text='User who ran the scan (empty for scheduled runs)'
+    )
+    
+    scanned_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-scanned_at']
+        verbose_name = 'Low Attendance Scan'
+        verbose_name_plural = 'Low Attendance Scans'
+        indexes = [
+            models.Index(fields=['course', 'intake', 'semester', 'scanned_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.course} {self.intake or 'all'} {self.semester or 'all'} - {self.scanned_at:%Y-%m-%d %H:%M}"
+
+
+class LowAttendanceFlag(models.Model):
+    """
+    A student whose attendance in a subject fell below the scan threshold.
+    """
+    
+    scan = models.ForeignKey(
+        LowAttendanceScan,
+        on_delete=models.CASCADE,
+        related_name='flags',
+        help_text='Scan that produced this flag'
+    )
+    
+    student = models.ForeignKey(
+        'accounts.Student',
+        on_delete=models.CASCADE,
+        related_name='low_attendance_flags',
+        help_text='Student'
+    )
+    
+    subject = models.ForeignKey(
+        Subject,
+        on_delete=models.CASCADE,
+        related_name='low_attendance_flags',
+        help_text='Subject'
+    )
+    
+    total_classes = models.PositiveIntegerField(
+        help_text='Classes recorded for the student in this subject'
+    )
+    
+    present = models.PositiveIntegerField(
+        help_text='Classes attended'
+    )
+    
+    attendance_percentage = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        help_text='Attendance percentage at scan time'
+    )
+    
+    class Meta:
+        ordering = ['attendance_percentage', 'student__student_id']
+        verbose_name = 'Low Attendance Flag'
+        verbose_name_plural = 'Low Attendance Flags'
+        unique_together = ['scan', 'student', 'subject']
+    
+    def __str__(self):
+        return f"{self.student.student_id} - {self.subject.name} - {self.attendance_percentage}%"
+
+
+class ArchivedResult(models.Model):
+    """
+    Cold copy of a Result of an archived cohort.
+    Same columns and primary key as the Result row it replaced, so a cohort
+    can be moved back unchanged. Read-only outside archive/restore.
+    """
+    
+    id = models.BigIntegerField(
+        primary_key=True,
+        help_text='Primary key of the original Result'
+    )
+    
+    student = models.ForeignKey(
+        'accounts.Student',
+        on_delete=models.CASCADE,
+        related_name='archived_results',
+        help_text='Student'
+    )
+    
+    exam = models.ForeignKey(
+        Exam,
+        on_delete=models.CASCADE,
+        related_name='archived_results',
+        help_text='Exam'
+    )
+    
+    subject = models.ForeignKey(
+        Subject,
+        on_delete=models.CASCADE,
+        related_name='archived_results',
+        help_text='Subject'
+    )
+    
+    marks_obtained = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        help_text='Marks obtained by student'
+    )
+    
+    remarks = models.TextField(
+        blank=True,
+        null=True,
+        help_text='Additional remarks'
+    )
+    
+    teacher_comment = models.TextField(
+        blank=True,
+        null=True,
+        help_text='Teacher comment for this result'
+    )
+    
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['-exam__exam_date', 'student']
+        verbose_name = 'Archived Result'
+        verbose_name_plural = 'Archived Results'
+        indexes = [
+            models.Index(fields=['student']),
+        ]
+    
+    def __str__(self):
+        return f"{self.student_id} - {self.exam_id} - {self.subject_id} (archived)"
+    
+    def as_result(self):
+        """
+        Unsaved Result with this row's values, for transcripts and serializers.
+        Relations loaded on this row (select_related) are carried over.
+        """
+        result = Result(**{field.attname: getattr(self, field.attname) for field in self._meta.concrete_fields})
+        result._state.fields_cache.update(self._state.fields_cache)
+        return result
+
+
+class ArchivedAttendance(models.Model):
+    """
+    Cold copy of an Attendance record of an archived cohort.
+    Same columns and primary key as the original row.
+    """
+    
+    id = models.BigIntegerField(
+        primary_key=True,
+        help_text='Primary key of the original Attendance record'
+    )
+    
+    student = models.ForeignKey(
+        'accounts.Student',
+        on_delete=models.CASCADE,
+        related_name='archived_attendances',
+        help_text='Student'
+    )
+    
+    subject = models.ForeignKey(
+        Subject,
+        on_delete=models.CASCADE,
+        related_name='archived_attendances',
+        help_text='Subject'
+    )
+    
+    date = models.DateField(
+        help_text='Date of the class'
+    )
+    
+    status = models.CharField(
+        max_length=10,
+        choices=Attendance.STATUS_CHOICES,
+        help_text='Attendance status (Present/Absent)'
+    )
+    
+    course = models.CharField(
+        max_length=10,
+        help_text='Course code'
+    )
+    
+    intake = models.CharField(
+        max_length=10,
+        help_text='Intake number'
+    )
+    
+    semester = models.CharField(
+        max_length=10,
+        help_text='Semester'
+    )
+    
+    session = models.CharField(
+        max_length=50,
+        blank=True,
+        null=True,
+        help_text='Academic session'
+    )
+    
+    remarks = models.TextField(
+        blank=True,
+        null=True,
+        help_text='Additional remarks'
+    )
+    
+    client_modified_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text='Client-side timestamp of the last offline edit'
+    )
+    
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['-date', 'student']
+        verbose_name = 'Archived Attendance'
+        verbose_name_plural = 'Archived Attendance Records'
+        indexes = [
+            models.Index(fields=['student', 'date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.student_id} - {self.subject_id} - {self.date} - {self.status} (archived)"
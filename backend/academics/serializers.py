@@ -1,5 +1,8 @@
 from rest_framework import serializers
-from .models import MajorMinorOption, Subject, Exam, Result, Attendance
+from .models import (
+    MajorMinorOption, Subject, Exam, Result, Attendance,
+    LowAttendanceScan, LowAttendanceFlag
+)
 
 
 class MajorMinorOptionSerializer(serializers.ModelSerializer):
@@ -267,10 +270,7 @@ class AttendanceDetailSerializer(serializers.ModelSerializer):
         source='student.student_id',
         read_only=True
     )
-    student_photo = serializers.ImageField(
-        source='student.photo',
-        read_only=True
-    )
+    student_photo = serializers.SerializerMethodField()
     subject_name = serializers.CharField(source='subject.name', read_only=True)
     subject_code = serializers.CharField(source='subject.code', read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
@@ -285,6 +285,14 @@ class AttendanceDetailSerializer(serializers.ModelSerializer):
             'remarks', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+    
+    def get_student_photo(self, obj):
+        """Thumbnail URL, or the original photo until its thumbnail is generated"""
+        photo = obj.student.photo_thumbnail or obj.student.photo
+        if not photo:
+            return None
+        request = self.context.get('request')
+        return request.build_absolute_uri(photo.url) if request else photo.url
 
 
 class BulkAttendanceSerializer(serializers.Serializer):
@@ -295,6 +303,23 @@ class BulkAttendanceSerializer(serializers.Serializer):
     status = serializers.ChoiceField(choices=['present', 'absent'])
 
 
+class AttendanceSyncDeltaSerializer(serializers.Serializer):
+    """
+    Serializer for a single offline attendance delta pushed to the sync endpoint
+    """
+    idempotency_key = serializers.CharField(max_length=64)
+    client_timestamp = serializers.DateTimeField()
+    student_id = serializers.IntegerField()
+    subject_id = serializers.IntegerField()
+    date = serializers.DateField()
+    status = serializers.ChoiceField(choices=['present', 'absent'])
+    course = serializers.CharField(max_length=10, required=False)
+    intake = serializers.CharField(max_length=10, required=False)
+    semester = serializers.CharField(max_length=10, required=False)
+    session = serializers.CharField(max_length=50, required=False, allow_blank=True)
+    remarks = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+
 class AttendanceSessionSerializer(serializers.Serializer):
     """
     Serializer for attendance session summary (used in history view)
@@ -312,6 +337,51 @@ class AttendanceSessionSerializer(serializers.Serializer):
     session = serializers.CharField(allow_null=True)
 
 
+class LowAttendanceScanSerializer(serializers.ModelSerializer):
+    """
+    Serializer for LowAttendanceScan model
+    """
+    triggered_by_name = serializers.CharField(
+        source='triggered_by.get_full_name',
+        read_only=True,
+        allow_null=True
+    )
+    
+    class Meta:
+        model = LowAttendanceScan
+        fields = [
+            'id', 'course', 'intake', 'semester', 'threshold',
+            'students_scanned', 'flagged_count',
+            'triggered_by', 'triggered_by_name', 'scanned_at'
+        ]
+        read_only_fields = fields
+
+
+class LowAttendanceFlagSerializer(serializers.ModelSerializer):
+    """
+    Serializer for LowAttendanceFlag model
+    """
+    student_name = serializers.CharField(
+        source='student.user.get_full_name',
+        read_only=True
+    )
+    student_id = serializers.CharField(
+        source='student.student_id',
+        read_only=True
+    )
+    subject_name = serializers.CharField(source='subject.name', read_only=True)
+    subject_code = serializers.CharField(source='subject.code', read_only=True)
+    
+    class Meta:
+        model = LowAttendanceFlag
+        fields = [
+            'id', 'student', 'student_name', 'student_id',
+            'subject', 'subject_name', 'subject_code',
+            'total_classes', 'present', 'attendance_percentage'
+        ]
+        read_only_fields = fields
+
+
 
 
 
@@ -1,3 +1,402 @@
-from django.test import TestCase
+import csv
+import io
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User, Student
+from config.exports import HAS_OPENPYXL
+from .models import Subject, Attendance, AttendanceSyncOperation, LowAttendanceFlag, LowAttendanceScan
+from .utils import run_low_attendance_scan
+
+
+class AttendanceQueryCountTests(TestCase):
+    """
+    Pin the number of queries used by the attendance summary endpoints
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', role='ADMIN')
+        cls.subject = Subject.objects.create(
+            name='Principles of Accounting', code='510201', course_code='BBA', semester='1st'
+        )
+        cls.students = []
+        for idx in range(5):
+            user = User.objects.create(
+                username=f'student{idx}', role='STUDENT',
+                first_name='Student', last_name=str(idx)
+            )
+            cls.students.append(Student.objects.create(
+                user=user,
+                date_of_birth=date(2003, 1, 1),
+                admission_date=date(2024, 1, 1),
+                course='BBA', intake='15th', semester='1st'
+            ))
+        for day in range(1, 4):
+            for idx, student in enumerate(cls.students):
+                Attendance.objects.create(
+                    student=student,
+                    subject=cls.subject,
+                    date=date(2025, 1, day),
+                    status='absent' if idx == 0 else 'present',
+                    course='BBA', intake='15th', semester='1st'
+                )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_session_details_uses_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/academics/attendance/session_details/', {
+                'course': 'BBA', 'intake': '15th', 'semester': '1st',
+                'subject': self.subject.id, 'date': '2025-01-01'
+            })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_students'], 5)
+        self.assertEqual(response.data['present_count'], 4)
+        self.assertEqual(response.data['absent_count'], 1)
+        self.assertEqual(response.data['subject']['code'], '510201')
+
+    def test_session_details_without_records_looks_up_subject(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/academics/attendance/session_details/', {
+                'course': 'BBA', 'intake': '15th', 'semester': '1st',
+                'subject': self.subject.id, 'date': '2025-02-01'
+            })
+
+        self.assertEqual(response.data['total_students'], 0)
+        self.assertEqual(response.data['subject']['id'], self.subject.id)
+
+    def test_student_attendance_uses_aggregate_and_data_query(self):
+        student = self.students[0]
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/academics/attendance/student_attendance/', {
+                'student_id': student.id
+            })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_classes'], 3)
+        self.assertEqual(response.data['present'], 0)
+        self.assertEqual(response.data['absent'], 3)
+        self.assertEqual(len(response.data['records']), 3)
+
+
+@override_settings(ATTENDANCE_SYNC_PAGE_SIZE=2)
+class AttendanceSyncTests(TestCase):
+    """
+    Offline attendance sync: idempotent replay, conflicts and returned changes
+    """
+
+    def setUp(self):
+        self.teacher = User.objects.create(username='teacher', role='TEACHER')
+        self.subject = Subject.objects.create(
+            name='Business Communication', code='510202', course_code='BBA', semester='1st'
+        )
+        self.students = [
+            Student.objects.create(
+                user=User.objects.create(username=f'sync{idx}', role='STUDENT'),
+                date_of_birth=date(2003, 1, 1), admission_date=date(2024, 1, 1),
+                course='BBA', intake='15th', semester='1st'
+            )
+            for idx in range(3)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def delta(self, key, student, status, timestamp):
+        return {
+            'idempotency_key': key, 'client_timestamp': timestamp.isoformat(),
+            'student_id': student.id, 'subject_id': self.subject.id,
+            'date': '2025-03-01', 'status': status,
+        }
+
+    def sync(self, deltas=(), **data):
+        return self.client.post('/api/academics/attendance/sync/', {'deltas': list(deltas), **data}, format='json')
+
+    def test_replayed_delta_is_applied_once(self):
+        delta = self.delta('k-1', self.students[0], 'absent', timezone.now())
+
+        first = self.sync([delta])
+        replay = self.sync([delta])
+
+        self.assertEqual(first.data['created'], 1)
+        self.assertEqual(replay.data['duplicates'], 1)
+        self.assertEqual(replay.data['results'][0]['attendance_id'], first.data['results'][0]['attendance_id'])
+        self.assertEqual(AttendanceSyncOperation.objects.count(), 1)
+        self.assertEqual(Attendance.objects.get().status, 'absent')
+
+    def test_last_writer_wins_on_client_timestamp(self):
+        edited_at = timezone.now()
+        self.sync([self.delta('k-1', self.students[0], 'absent', edited_at)])
+
+        older = self.sync([self.delta('k-2', self.students[0], 'present', edited_at - timedelta(minutes=5))])
+        self.assertEqual(older.data['stale'], 1)
+        self.assertEqual(Attendance.objects.get().status, 'absent')
+
+        newer = self.sync([self.delta('k-3', self.students[0], 'present', edited_at + timedelta(minutes=5))])
+        self.assertEqual(newer.data['updated'], 1)
+        self.assertEqual(Attendance.objects.get().status, 'present')
+
+    def test_concurrent_replay_conflicts(self):
+        delta = self.delta('k-1', self.students[0], 'absent', timezone.now())
+        self.sync([delta])
+
+        # The other request's log row is not visible yet when this one checks for replays
+        with mock.patch.object(
+            AttendanceSyncOperation.objects, 'filter', return_value=AttendanceSyncOperation.objects.none()
+        ):
+            response = self.sync([delta])
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(AttendanceSyncOperation.objects.count(), 1)
+
+    def test_changes_include_late_commits_and_are_paged(self):
+        token = timezone.now()
+        # Written before the token was issued but committed after it
+        Attendance.objects.bulk_create([
+            Attendance(
+                student=student, subject=self.subject, date=date(2025, 3, 2),
+                course='BBA', intake='15th', semester='1st'
+            )
+            for student in self.students
+        ])
+        Attendance.objects.update(updated_at=token - timedelta(seconds=5))
+
+        first = self.sync(last_sync_token=token.isoformat(), course='BBA')
+        self.assertEqual(len(first.data['changes']), 2)
+        self.assertEqual(first.data['sync_token'], token.isoformat())
+
+        last = self.sync(last_sync_token=token.isoformat(), course='BBA', changes_after=first.data['changes_after'])
+        self.assertEqual(len(last.data['changes']), 1)
+        self.assertIsNone(last.data['changes_after'])
+        self.assertEqual(
+            {change['id'] for change in first.data['changes'] + last.data['changes']},
+            set(Attendance.objects.values_list('id', flat=True))
+        )
+
+    def test_changes_need_a_course(self):
+        response = self.sync(last_sync_token=timezone.now().isoformat())
+
+        self.assertEqual(response.status_code, 400)
+
+
+class AttendanceAnalyticsTests(TestCase):
+    """
+    Bucketed attendance rate series
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', role='ADMIN')
+        cls.subjects = [
+            Subject.objects.create(name='Accounting', code='510201', course_code='BBA', semester='1st'),
+            Subject.objects.create(name='Management', code='510204', course_code='BBA', semester='1st'),
+        ]
+        students = [
+            Student.objects.create(
+                user=User.objects.create(username=f'analytics{idx}', role='STUDENT'),
+                date_of_birth=date(2003, 1, 1), admission_date=date(2024, 1, 1),
+                course='BBA', intake='15th', semester='1st'
+            )
+            for idx in range(2)
+        ]
+        # Mondays of two consecutive weeks; the second student misses accounting in week two
+        for day in (date(2025, 3, 3), date(2025, 3, 10)):
+            for subject in cls.subjects:
+                for idx, student in enumerate(students):
+                    absent = idx == 1 and subject == cls.subjects[0] and day.day == 10
+                    Attendance.objects.create(
+                        student=student, subject=subject, date=day,
+                        status='absent' if absent else 'present',
+                        course='BBA', intake='15th', semester='1st'
+                    )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def get(self, **params):
+        return self.client.get('/api/academics/attendance/analytics/', {
+            'date_from': '2025-03-01', 'date_to': '2025-03-31', **params
+        })
+
+    def test_weekly_series_per_subject(self):
+        response = self.get(bucket='week', group_by='subject')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['periods'], ['2025-03-03', '2025-03-10'])
+        self.assertEqual(response.data['overall']['total'], [4, 4])
+        self.assertEqual(response.data['overall']['rate'], [100.0, 75.0])
+        series = {entry['key']: entry for entry in response.data['series']}
+        self.assertEqual(series[self.subjects[0].id]['rate'], [100.0, 50.0])
+        self.assertEqual(series[self.subjects[1].id]['present'], [2, 2])
+        self.assertEqual(series[self.subjects[0].id]['label'], '510201 - Accounting')
+
+    def test_monthly_bucket_without_grouping(self):
+        response = self.get(bucket='month')
+
+        self.assertEqual(response.data['periods'], ['2025-03-01'])
+        self.assertEqual(response.data['overall']['present'], [7])
+        self.assertEqual(response.data['series'], [])
+
+    def test_rejects_unknown_bucket_and_grouping(self):
+        self.assertEqual(self.get(bucket='year').status_code, 400)
+        self.assertEqual(self.get(group_by='teacher').status_code, 400)
+
+
+class LowAttendanceScanTests(TestCase):
+    """
+    Stored low-attendance scans and the flag listing
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', role='ADMIN')
+        cls.subject = Subject.objects.create(name='Statistics', code='510205', course_code='BBA', semester='1st')
+        cls.students = [
+            Student.objects.create(
+                user=User.objects.create(username=f'scan{idx}', role='STUDENT'),
+                date_of_birth=date(2003, 1, 1), admission_date=date(2024, 1, 1),
+                course='BBA', intake='15th', semester='1st'
+            )
+            for idx in range(3)
+        ]
+        # Present in 4, 3 and 2 of 4 classes: 100%, exactly 75% and 50%
+        for idx, student in enumerate(cls.students):
+            for day in range(1, 5):
+                Attendance.objects.create(
+                    student=student, subject=cls.subject, date=date(2025, 4, day),
+                    status='present' if day <= 4 - idx else 'absent',
+                    course='BBA', intake='15th', semester='1st'
+                )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_scan_flags_students_strictly_below_threshold(self):
+        scan = run_low_attendance_scan('BBA', intake='15th', threshold=75)
+
+        self.assertEqual((scan.students_scanned, scan.flagged_count), (3, 1))
+        flag = LowAttendanceFlag.objects.get(scan=scan)
+        self.assertEqual(flag.student, self.students[2])
+        self.assertEqual(flag.attendance_percentage, Decimal('50.00'))
+
+    def test_endpoint_lists_latest_scan_flags(self):
+        response = self.client.post('/api/academics/attendance/scan_low_attendance/', {
+            'course': 'BBA', 'intake': '15th', 'threshold': 80
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        response = self.client.get('/api/academics/attendance/low_attendance/', {
+            'course': 'BBA', 'intake': '15th', 'subject': self.subject.id
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['scan']['flagged_count'], 2)
+        self.assertEqual(
+            [flag['student_id'] for flag in response.data['results']],
+            [self.students[2].student_id, self.students[1].student_id]
+        )
+
+    def test_invalid_parameters_are_rejected(self):
+        scan = run_low_attendance_scan('BBA')
+
+        for params in ({'scan': scan.id, 'subject': 'abc'}, {'scan': 'latest'}):
+            response = self.client.get('/api/academics/attendance/low_attendance/', params)
+            self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/academics/attendance/scan_low_attendance/', {
+            'course': 'BBA', 'threshold': 150
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_fractional_threshold_compares_exactly(self):
+        # 75% sits just below 75.01 and exactly on 75.00
+        scan = run_low_attendance_scan('BBA', threshold='75.01')
+
+        self.assertEqual(scan.flagged_count, 2)
+        self.assertEqual(scan.threshold, Decimal('75.01'))
+
+    def test_only_admins_can_scan_or_list(self):
+        self.client.force_authenticate(self.students[0].user)
+
+        response = self.client.post('/api/academics/attendance/scan_low_attendance/', {
+            'course': 'BBA'
+        }, format='json')
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get('/api/academics/attendance/low_attendance/', {'course': 'BBA'})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(LowAttendanceScan.objects.exists())
+
+
+class AttendanceRegisterExportTests(TestCase):
+    """
+    The attendance register download
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', role='ADMIN')
+        cls.subject = Subject.objects.create(name='Finance', code='510206', course_code='BBA', semester='1st')
+        cls.students = [
+            Student.objects.create(
+                user=User.objects.create(
+                    username=f'register{idx}', role='STUDENT', first_name='Student', last_name=str(idx)
+                ),
+                date_of_birth=date(2003, 1, 1), admission_date=date(2024, 1, 1),
+                course='BBA', intake='15th', semester='1st'
+            )
+            for idx in range(2)
+        ]
+        for day in (5, 12):
+            Attendance.objects.create(
+                student=cls.students[0], subject=cls.subject, date=date(2025, 5, day),
+                status='present' if day == 5 else 'absent',
+                course='BBA', intake='15th', semester='1st'
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def get(self, **params):
+        return self.client.get('/api/academics/attendance/export_register/', {
+            'course': 'BBA', 'intake': '15th', 'semester': '1st', 'subject': self.subject.id,
+            'date_from': '2025-05-01', 'date_to': '2025-05-31', **params
+        })
+
+    def test_csv_register(self):
+        response = self.get()
+
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], ['Student ID', 'Name', '05-05-2025', '12-05-2025', 'Present', 'Total', 'Percentage'])
+        self.assertEqual(rows[1], [self.students[0].student_id, 'Student 0', 'P', 'A', '1', '2', '50.0%'])
+        # Enrolled students without records still get a row
+        self.assertEqual(rows[2], [self.students[1].student_id, 'Student 1', '', '', '0', '0', ''])
+
+    @skipUnless(HAS_OPENPYXL, 'openpyxl is not installed')
+    def test_xlsx_register(self):
+        from openpyxl import load_workbook
+
+        response = self.get(file_format='xlsx')
+
+        self.assertEqual(response.status_code, 200)
+        sheet = load_workbook(io.BytesIO(b''.join(response.streaming_content))).active
+        self.assertEqual(sheet.title, '510206')
+        self.assertEqual(
+            [cell.value for cell in sheet[2]],
+            [self.students[0].student_id, 'Student 0', 'P', 'A', 1, 2, '50.0%']
+        )
+
+    def test_bad_parameters(self):
+        self.assertEqual(self.get(file_format='pdf').status_code, 400)
+        self.assertEqual(self.get(subject='finance').status_code, 400)
+        self.assertEqual(self.get(date_from='May').status_code, 400)
@@ -1,6 +1,6 @@
 """
 Utility functions for academics app
-Includes PDF report card generation
+Includes PDF report card generation and attendance scans
 """
 from io import BytesIO
 from reportlab.lib import colors
@@ -10,10 +10,15 @@ from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q, Value
 from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
 
 from accounts.models import Student
-from academics.models import Exam, Result
+from academics.models import (
+    Exam, Result, Attendance, LowAttendanceScan, LowAttendanceFlag, ArchivedResult
+)
 
 
 def generate_report_card(student_id, exam_id=None, exam_type=None):
@@ -42,23 +47,25 @@ def generate_report_card(student_id, exam_id=None, exam_type=None):
         except Exam.DoesNotExist:
             raise ValueError("Exam not found")
         # Get results for specific exam
-        results = Result.objects.filter(
-            student=student,
-            exam=exam
-        ).select_related('subject', 'exam').order_by('subject__name')
+        filters = {'exam': exam}
+        ordering = ('subject__name',)
     elif exam_type:
         # Get results for specific exam type
-        results = Result.objects.filter(
-            student=student,
-            exam__exam_type=exam_type
-        ).select_related('subject', 'exam').order_by('subject__name')
+        filters = {'exam__exam_type': exam_type}
+        ordering = ('subject__name',)
     else:
         # Get all results for student
-        results = Result.objects.filter(
-            student=student
-        ).select_related('subject', 'exam').order_by('subject__name', 'exam__exam_type')
+        filters = {}
+        ordering = ('subject__name', 'exam__exam_type')
     
+    results = Result.objects.filter(
+        student=student, **filters
+    ).select_related('subject', 'exam').order_by(*ordering)
     if not results.exists():
+        # Archived cohorts keep their transcripts in the archive table
+        results = archived_results(student.id, ordering, **filters)
+    
+    if not results:
         raise ValueError("No results found for this student")
     
     # Create PDF buffer - compact margins to fit on 1 page
@@ -314,6 +321,29 @@ def generate_report_card(student_id, exam_id=None, exam_type=None):
     return buffer
 
 
+def archived_results(student_id, ordering=None, **filters):
+    """
+    A student's archived results as unsaved Result instances
+    
+    Read-only fallback for transcripts and report cards once the student's
+    cohort was moved to the archive.
+    
+    Args:
+        student_id: ID of the student
+        ordering: order_by() fields (default: Result ordering)
+        **filters: Extra Result lookups (e.g. exam, exam__exam_type)
+    
+    Returns:
+        List of Result instances
+    """
+    rows = ArchivedResult.objects.filter(student_id=student_id, **filters).select_related(
+        'student', 'student__user', 'exam', 'subject'
+    )
+    if ordering:
+        rows = rows.order_by(*ordering)
+    return [row.as_result() for row in rows]
+
+
 def calculate_overall_grade(percentage):
     """Calculate letter grade based on percentage"""
     if percentage >= 80:
@@ -386,7 +416,8 @@ def generate_bulk_report_cards(course=None, intake=None, semester=None, session=
     report_cards = []
     for student in students:
         # Check if student has results for this exam
-        if Result.objects.filter(student=student, exam=exam).exists():
+        if (Result.objects.filter(student=student, exam=exam).exists()
+                or ArchivedResult.objects.filter(student=student, exam=exam).exists()):
             try:
                 pdf_buffer = generate_report_card(student.id, exam_id)
                 report_cards.append((student.user.get_full_name(), pdf_buffer))
@@ -395,3 +426,134 @@ def generate_bulk_report_cards(course=None, intake=None, semester=None, session=
     
     return report_cards
 
+
+def run_low_attendance_scan(course, intake=None, semester=None, threshold=75, triggered_by=None):
+    """
+    Flag students whose attendance in a subject is below the threshold
+    
+    Per-student, per-subject rates for the whole cohort are computed in one
+    grouped query; only the pairs below the threshold leave the database.
+    
+    Args:
+        course: Course code
+        intake: Intake number (optional)
+        semester: Semester (optional)
+        threshold: Attendance percentage below which a student is flagged
+        triggered_by: User running the scan (optional)
+    
+    Returns:
+        The saved LowAttendanceScan
+    """
+    threshold = Decimal(str(threshold)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    # In hundredths of a percent, so the comparison below is in integers
+    threshold_hundredths = int(threshold * 100)
+    
+    attendance = Attendance.objects.filter(course=course)
+    if intake:
+        attendance = attendance.filter(intake=intake)
+    if semester:
+        attendance = attendance.filter(semester=semester)
+    
+    # present * 10000 < total * threshold (in hundredths) keeps the comparison exact in SQL
+    below_threshold = attendance.order_by().values('student', 'subject').annotate(
+        total=Count('id'),
+        present_count=Count('id', filter=Q(status='present'))
+    ).annotate(
+        present_scaled=F('present_count') * 10000
+    ).filter(
+        present_scaled__lt=F('total') * Value(threshold_hundredths)
+    ).values_list('student', 'subject', 'total', 'present_count')
+    
+    students_scanned = attendance.aggregate(
+        students=Count('student', distinct=True)
+    )['students']
+    
+    with transaction.atomic():
+        scan = LowAttendanceScan.objects.create(
+            course=course,
+            intake=intake or None,
+            semester=semester or None,
+            threshold=threshold,
+            students_scanned=students_scanned,
+            triggered_by=triggered_by,
+        )
+        
+        flags = [
+            LowAttendanceFlag(
+                scan=scan,
+                student_id=student_id,
+                subject_id=subject_id,
+                total_classes=total,
+                present=present,
+                attendance_percentage=(Decimal(present * 100) / total).quantize(
+                    Decimal('0.01'), rounding=ROUND_HALF_UP
+                ),
+            )
+            for student_id, subject_id, total, present in below_threshold.iterator(chunk_size=2000)
+        ]
+        LowAttendanceFlag.objects.bulk_create(flags, batch_size=1000)
+        
+        scan.flagged_count = len(flags)
+        scan.save(update_fields=['flagged_count'])
+    
+    return scan
+
+
+def iter_attendance_register(course, intake, semester, subject_id, date_from, date_to):
+    """
+    Yield an attendance register: one row per student, one column per class date
+    
+    The class dates are read first (they form the header), then the roster and the
+    attendance records are streamed in the same student order and merged, so only
+    one student's row is held in memory at a time.
+    
+    Yields:
+        Header row, then [student_id, name, P/A per date..., present, total, percentage]
+    """
+    attendance = Attendance.objects.filter(
+        course=course,
+        intake=intake,
+        semester=semester,
+        subject_id=subject_id,
+        date__gte=date_from,
+        date__lte=date_to
+    )
+    
+    class_dates = list(
+        attendance.order_by('date').values_list('date', flat=True).distinct()
+    )
+    date_columns = {class_date: idx for idx, class_date in enumerate(class_dates)}
+    
+    yield (
+        ['Student ID', 'Name']
+        + [class_date.strftime('%d-%m-%Y') for class_date in class_dates]
+        + ['Present', 'Total', 'Percentage']
+    )
+    
+    # Students who have since moved cohort still appear for the classes they attended
+    students = Student.objects.filter(
+        Q(course=course, intake=intake, semester=semester)
+        | Q(id__in=attendance.values('student_id'))
+    ).order_by('student_id').values_list(
+        'id', 'student_id', 'full_name', 'user__first_name', 'user__last_name'
+    )
+    records = attendance.order_by('student__student_id', 'date').values_list(
+        'student_id', 'date', 'status'
+    ).iterator(chunk_size=2000)
+    
+    record = next(records, None)
+    for pk, student_id, full_name, first_name, last_name in students.iterator(chunk_size=2000):
+        cells = [''] * len(class_dates)
+        present = total = 0
+        
+        while record is not None and record[0] == pk:
+            _, class_date, record_status = record
+            cells[date_columns[class_date]] = 'P' if record_status == 'present' else 'A'
+            total += 1
+            if record_status == 'present':
+                present += 1
+            record = next(records, None)
+        
+        name = full_name or f"{first_name} {last_name}".strip()
+        percentage = f"{present / total * 100:.1f}%" if total else ''
+        yield [student_id, name] + cells + [present, total, percentage]
@@ -4,18 +4,31 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.pagination import PageNumberPagination
 from django_filters.rest_framework import DjangoFilterBackend
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.db.models import Avg, Count, Q
+from django.db.models.functions import TruncDay, TruncWeek, TruncMonth
 from django.http import FileResponse
-from datetime import datetime
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from datetime import datetime, timedelta
 
-from .models import MajorMinorOption, Subject, Exam, Result, Attendance
+from .models import (
+    MajorMinorOption, Subject, Exam, Result, Attendance, AttendanceSyncOperation,
+    LowAttendanceScan, LowAttendanceFlag, ArchivedAttendance
+)
 from .serializers import (
     MajorMinorOptionSerializer, SubjectSerializer, ExamSerializer, ExamDetailSerializer,
     ResultSerializer, ResultDetailSerializer, BulkResultSerializer,
     AttendanceSerializer, AttendanceDetailSerializer, BulkAttendanceSerializer,
-    AttendanceSessionSerializer
+    AttendanceSessionSerializer, AttendanceSyncDeltaSerializer,
+    LowAttendanceScanSerializer, LowAttendanceFlagSerializer
+)
+from .utils import (
+    generate_report_card, generate_bulk_report_cards, run_low_attendance_scan,
+    iter_attendance_register, archived_results
 )
-from .utils import generate_report_card, generate_bulk_report_cards
+from config.exports import EXPORT_FORMATS, export_response
 
 
 class MajorMinorOptionViewSet(viewsets.ModelViewSet):
@@ -307,6 +320,9 @@ class ResultViewSet(viewsets.ModelViewSet):
             )
         
         results = self.queryset.filter(student__id=student_id)
+        if not results.exists():
+            # Archived cohorts keep their transcripts in the archive table (read-only)
+            results = archived_results(student_id)
         
         page = self.paginate_queryset(results)
         if page is not None:
@@ -476,6 +492,7 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         'student', 'student__user', 'subject'
     ).all()
     permission_classes = [IsAuthenticated]
+    authenticate_from_db = {'scan_low_attendance', 'low_attendance'}
     pagination_class = AttendancePagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['course', 'intake', 'semester', 'subject', 'date', 'status']
@@ -608,11 +625,13 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         roster = []
         for student in students:
             att_record = attendance_map.get(student.id)
+            # Serve the small thumbnail; fall back to the upload until it is generated
+            photo = student.photo_thumbnail or student.photo
             roster.append({
                 'id': student.id,
                 'student_id': student.student_id,
                 'name': student.user.get_full_name(),
-                'photo': student.photo.url if student.photo else None,
+                'photo': photo.url if photo else None,
                 'status': att_record['status'] if att_record else 'present',
                 'attendance_id': att_record['id'] if att_record else None,
             })
@@ -714,6 +733,243 @@ class AttendanceViewSet(viewsets.ModelViewSet):
             'errors': errors
         }, status=status.HTTP_201_CREATED if created_count > 0 else status.HTTP_200_OK)
     
+    @action(detail=False, methods=['post'])
+    def sync(self, request):
+        """
+        Offline-first sync endpoint.
+        Applies a batch of attendance deltas (across any number of sessions) in one
+        transaction using last-writer-wins on the client timestamp, and returns the
+        server-side changes made since the client's last sync token.
+        Each delta carries a client-generated idempotency_key; replayed deltas are
+        reported as duplicates and never applied twice.
+        Body: last_sync_token (optional), deltas (list), course (required with a token)
+        and intake/semester (optional) scoping the returned changes, changes_after
+        (optional page cursor).
+        Changes are re-read from ATTENDANCE_SYNC_LAG_SECONDS before the token, so
+        writes committed after the token was issued are not missed; clients replace
+        records they already hold by id. A page of ATTENDANCE_SYNC_PAGE_SIZE changes
+        comes back with changes_after set and the token unchanged until the last page.
+        """
+        last_sync_token = request.data.get('last_sync_token')
+        deltas = request.data.get('deltas', [])
+        
+        since = None
+        if last_sync_token:
+            since = parse_datetime(str(last_sync_token))
+            if since is None:
+                return Response(
+                    {'error': 'Invalid last_sync_token'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        if not isinstance(deltas, list):
+            return Response(
+                {'error': 'deltas must be a list'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if since and not request.data.get('course'):
+            return Response(
+                {'error': 'course is required to fetch changes'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        changes_after = None
+        if request.data.get('changes_after'):
+            cursor_time, _, cursor_id = str(request.data['changes_after']).rpartition('|')
+            changes_after = (parse_datetime(cursor_time), cursor_id)
+            if changes_after[0] is None or not cursor_id.isdigit():
+                return Response(
+                    {'error': 'Invalid changes_after'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        from accounts.models import Student
+        
+        results = []
+        errors = []
+        valid_deltas = []
+        
+        for item in deltas:
+            serializer = AttendanceSyncDeltaSerializer(data=item)
+            if not serializer.is_valid():
+                errors.append({
+                    'idempotency_key': item.get('idempotency_key') if isinstance(item, dict) else None,
+                    'error': serializer.errors
+                })
+                continue
+            valid_deltas.append(serializer.validated_data)
+        
+        # Replayed deltas are answered from the idempotency log without touching attendance
+        keys = [delta['idempotency_key'] for delta in valid_deltas]
+        seen_operations = {
+            op['idempotency_key']: op for op in AttendanceSyncOperation.objects.filter(
+                idempotency_key__in=keys
+            ).values('idempotency_key', 'outcome', 'attendance_id')
+        }
+        
+        pending = []
+        batch_keys = set()
+        for delta in valid_deltas:
+            key = delta['idempotency_key']
+            if key in seen_operations or key in batch_keys:
+                op = seen_operations.get(key, {})
+                results.append({
+                    'idempotency_key': key,
+                    'result': 'duplicate',
+                    'outcome': op.get('outcome'),
+                    'attendance_id': op.get('attendance_id'),
+                })
+                continue
+            batch_keys.add(key)
+            pending.append(delta)
+        
+        # Oldest first, so later edits to the same record win inside the batch too
+        pending.sort(key=lambda delta: delta['client_timestamp'])
+        
+        students = Student.objects.in_bulk({delta['student_id'] for delta in pending})
+        subject_ids = set(Subject.objects.filter(
+            id__in={delta['subject_id'] for delta in pending}
+        ).values_list('id', flat=True))
+        
+        applicable = []
+        for delta in pending:
+            if delta['student_id'] not in students:
+                errors.append({'idempotency_key': delta['idempotency_key'], 'error': 'Student not found'})
+            elif delta['subject_id'] not in subject_ids:
+                errors.append({'idempotency_key': delta['idempotency_key'], 'error': 'Subject not found'})
+            else:
+                applicable.append(delta)
+        
+        try:
+            with transaction.atomic():
+                existing = {}
+                if applicable:
+                    existing_qs = Attendance.objects.select_for_update().filter(
+                        student_id__in={delta['student_id'] for delta in applicable},
+                        subject_id__in={delta['subject_id'] for delta in applicable},
+                        date__in={delta['date'] for delta in applicable}
+                    )
+                    existing = {
+                        (att.student_id, att.subject_id, att.date): att for att in existing_qs
+                    }
+                
+                now = timezone.now()
+                to_create = {}
+                to_update = {}
+                operations = []
+                
+                for delta in applicable:
+                    record_key = (delta['student_id'], delta['subject_id'], delta['date'])
+                    student = students[delta['student_id']]
+                    attendance = existing.get(record_key) or to_create.get(record_key)
+                    
+                    if attendance is None:
+                        attendance = Attendance(
+                            student_id=delta['student_id'],
+                            subject_id=delta['subject_id'],
+                            date=delta['date'],
+                        )
+                        to_create[record_key] = attendance
+                        outcome = 'created'
+                    elif attendance.last_modified_at and delta['client_timestamp'] < attendance.last_modified_at:
+                        operations.append((delta, attendance, 'stale'))
+                        continue
+                    else:
+                        if record_key not in to_create:
+                            to_update[record_key] = attendance
+                        outcome = 'updated'
+                    
+                    attendance.status = delta['status']
+                    attendance.course = delta.get('course') or attendance.course or student.course
+                    attendance.intake = delta.get('intake') or attendance.intake or student.intake
+                    attendance.semester = delta.get('semester') or attendance.semester or student.semester
+                    attendance.session = delta.get('session') or attendance.session or student.session
+                    if 'remarks' in delta:
+                        attendance.remarks = delta['remarks']
+                    attendance.client_modified_at = delta['client_timestamp']
+                    attendance.updated_at = now
+                    operations.append((delta, attendance, outcome))
+                
+                Attendance.objects.bulk_create(to_create.values())
+                Attendance.objects.bulk_update(
+                    to_update.values(),
+                    ['status', 'course', 'intake', 'semester', 'session',
+                     'remarks', 'client_modified_at', 'updated_at']
+                )
+                
+                # The unique idempotency_key makes a concurrent replay of the same batch fail here
+                AttendanceSyncOperation.objects.bulk_create([
+                    AttendanceSyncOperation(
+                        idempotency_key=delta['idempotency_key'],
+                        attendance=attendance,
+                        outcome=outcome,
+                        client_timestamp=delta['client_timestamp'],
+                        submitted_by=request.user,
+                    )
+                    for delta, attendance, outcome in operations
+                ])
+                
+                sync_token = timezone.now()
+        except IntegrityError:
+            return Response(
+                {'error': 'A conflicting sync is in progress for these records. Retry the batch.'},
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        for delta, attendance, outcome in operations:
+            results.append({
+                'idempotency_key': delta['idempotency_key'],
+                'result': 'applied' if outcome != 'stale' else 'stale',
+                'outcome': outcome,
+                'attendance_id': attendance.id,
+            })
+        
+        # Server-side changes the client has not seen yet (excluding its own writes).
+        # A first sync has no token; the client seeds itself from roster/session_details.
+        changes = []
+        changes_cursor = None
+        if since:
+            lag = timedelta(seconds=getattr(settings, 'ATTENDANCE_SYNC_LAG_SECONDS', 120))
+            changes_qs = self.queryset.filter(updated_at__gt=since - lag, updated_at__lte=sync_token)
+            for param in ('course', 'intake', 'semester'):
+                value = request.data.get(param)
+                if value:
+                    changes_qs = changes_qs.filter(**{param: value})
+            if changes_after:
+                after_time, after_id = changes_after
+                changes_qs = changes_qs.filter(
+                    Q(updated_at__gt=after_time) | Q(updated_at=after_time, id__gt=int(after_id))
+                )
+            own_ids = [attendance.id for _, attendance, outcome in operations if outcome != 'stale']
+            if own_ids:
+                changes_qs = changes_qs.exclude(id__in=own_ids)
+            
+            page_size = getattr(settings, 'ATTENDANCE_SYNC_PAGE_SIZE', 500)
+            changes = list(changes_qs.order_by('updated_at', 'id')[:page_size + 1])
+            if len(changes) > page_size:
+                changes = changes[:page_size]
+                changes_cursor = f"{changes[-1].updated_at.isoformat()}|{changes[-1].id}"
+                # The client keeps its token until it has every page
+                sync_token = since
+        
+        counts = {'created': 0, 'updated': 0, 'stale': 0}
+        for _, _, outcome in operations:
+            counts[outcome] += 1
+        
+        return Response({
+            'success': True,
+            'sync_token': sync_token.isoformat(),
+            'created': counts['created'],
+            'updated': counts['updated'],
+            'stale': counts['stale'],
+            'duplicates': sum(1 for r in results if r['result'] == 'duplicate'),
+            'results': results,
+            'errors': errors,
+            'changes': AttendanceSerializer(changes, many=True).data,
+            'changes_after': changes_cursor,
+        })
+    
     @action(detail=False, methods=['get'])
     def history(self, request):
         """
@@ -785,6 +1041,192 @@ class AttendanceViewSet(viewsets.ModelViewSet):
             'sessions': result
         })
     
+    @action(detail=False, methods=['get'])
+    def analytics(self, request):
+        """
+        Attendance rate time series for charting.
+        Buckets attendance by day, week or month (database date truncation) and
+        optionally splits it by subject or intake, all in a single grouped query.
+        Query params: bucket (day|week|month, default day), group_by (subject|intake),
+        date_from, date_to (YYYY-MM-DD, default last 30 days), course, intake, semester, subject
+        """
+        bucket = request.query_params.get('bucket', 'day')
+        group_by = request.query_params.get('group_by')
+        
+        truncators = {'day': TruncDay, 'week': TruncWeek, 'month': TruncMonth}
+        if bucket not in truncators:
+            return Response(
+                {'error': 'bucket must be one of: day, week, month'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        group_fields = {
+            'subject': ['subject', 'subject__name', 'subject__code'],
+            'intake': ['intake'],
+        }
+        if group_by and group_by not in group_fields:
+            return Response(
+                {'error': 'group_by must be one of: subject, intake'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            date_to = datetime.strptime(
+                request.query_params.get('date_to') or datetime.now().date().isoformat(), '%Y-%m-%d'
+            ).date()
+            date_from = datetime.strptime(
+                request.query_params.get('date_from') or (date_to - timedelta(days=30)).isoformat(), '%Y-%m-%d'
+            ).date()
+        except ValueError:
+            return Response(
+                {'error': 'Invalid date format. Use YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queryset = Attendance.objects.filter(date__gte=date_from, date__lte=date_to)
+        
+        for param in ('course', 'intake', 'semester'):
+            value = request.query_params.get(param)
+            if value:
+                queryset = queryset.filter(**{param: value})
+        subject_id = request.query_params.get('subject')
+        if subject_id:
+            queryset = queryset.filter(subject_id=subject_id)
+        
+        extra_fields = group_fields.get(group_by, [])
+        rows = queryset.annotate(
+            period=truncators[bucket]('date')
+        ).values('period', *extra_fields).annotate(
+            total=Count('id'),
+            present=Count('id', filter=Q(status='present'))
+        ).order_by('period')
+        
+        periods = []
+        period_index = {}
+        series = {}
+        overall = {}
+        
+        for row in rows:
+            period = row['period']
+            if hasattr(period, 'date'):
+                period = period.date()
+            if period not in period_index:
+                period_index[period] = len(periods)
+                periods.append(period)
+            
+            overall_counts = overall.setdefault(period, [0, 0])
+            overall_counts[0] += row['total']
+            overall_counts[1] += row['present']
+            
+            if group_by == 'subject':
+                key = row['subject']
+                label = f"{row['subject__code']} - {row['subject__name']}"
+            elif group_by == 'intake':
+                key = label = row['intake']
+            else:
+                continue
+            
+            entry = series.setdefault(key, {'key': key, 'label': label, 'counts': {}})
+            entry['counts'][period] = (row['total'], row['present'])
+        
+        def rate(total, present):
+            return round(present / total * 100, 2) if total else None
+        
+        response_series = []
+        for entry in series.values():
+            totals = [entry['counts'].get(p, (0, 0))[0] for p in periods]
+            presents = [entry['counts'].get(p, (0, 0))[1] for p in periods]
+            response_series.append({
+                'key': entry['key'],
+                'label': entry['label'],
+                'total': totals,
+                'present': presents,
+                'rate': [rate(t, pr) for t, pr in zip(totals, presents)],
+            })
+        
+        overall_totals = [overall[p][0] for p in periods]
+        overall_presents = [overall[p][1] for p in periods]
+        
+        return Response({
+            'bucket': bucket,
+            'group_by': group_by,
+            'date_from': date_from.isoformat(),
+            'date_to': date_to.isoformat(),
+            'periods': [p.isoformat() for p in periods],
+            'overall': {
+                'total': overall_totals,
+                'present': overall_presents,
+                'rate': [rate(t, pr) for t, pr in zip(overall_totals, overall_presents)],
+            },
+            'series': response_series
+        })
+    
+    @action(detail=False, methods=['get'])
+    def export_register(self, request):
+        """
+        Download the attendance register (students x class dates, P/A cells)
+        for a Course/Intake/Semester/Subject over a date range.
+        Query params: course, intake, semester, subject (required),
+        date_from, date_to (YYYY-MM-DD, default current month), file_format (csv|xlsx)
+        """
+        course = request.query_params.get('course')
+        intake = request.query_params.get('intake')
+        semester = request.query_params.get('semester')
+        subject_id = request.query_params.get('subject')
+        file_format = request.query_params.get('file_format', 'csv')
+        
+        if not all([course, intake, semester, subject_id]):
+            return Response(
+                {'error': 'course, intake, semester, and subject parameters are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if file_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': 'file_format must be csv or xlsx'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not subject_id.isdigit():
+            return Response(
+                {'error': 'subject must be an integer id'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            today = datetime.now().date()
+            date_from = datetime.strptime(
+                request.query_params.get('date_from') or today.replace(day=1).isoformat(), '%Y-%m-%d'
+            ).date()
+            date_to = datetime.strptime(
+                request.query_params.get('date_to') or today.isoformat(), '%Y-%m-%d'
+            ).date()
+        except ValueError:
+            return Response(
+                {'error': 'Invalid date format. Use YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        subject = Subject.objects.filter(id=subject_id).only('code').first()
+        if not subject:
+            return Response(
+                {'error': 'Subject not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        rows = iter_attendance_register(
+            course, intake, semester, subject.id, date_from, date_to
+        )
+        filename = f'attendance_register_{course}_{intake}_{semester}_{subject.code}_{date_from}_{date_to}'
+        
+        try:
+            return export_response(rows, filename, file_format, sheet_title=subject.code)
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    
     @action(detail=False, methods=['get'])
     def session_details(self, request):
         """
@@ -811,29 +1253,30 @@ class AttendanceViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        attendance_records = self.queryset.filter(
+        attendance_records = list(self.queryset.filter(
             course=course,
             intake=intake,
             semester=semester,
             subject_id=subject_id,
             date=selected_date
-        ).order_by('student__student_id')
+        ).order_by('student__student_id'))
         
         serializer = AttendanceDetailSerializer(attendance_records, many=True)
         
-        # Get subject info
-        try:
-            subject = Subject.objects.get(id=subject_id)
-            subject_info = {
-                'id': subject.id,
-                'name': subject.name,
-                'code': subject.code
-            }
-        except Subject.DoesNotExist:
-            subject_info = None
+        # Subject and counts come from the rows already fetched
+        if attendance_records:
+            subject = attendance_records[0].subject
+        else:
+            subject = Subject.objects.filter(id=subject_id).only('id', 'name', 'code').first()
         
-        present_count = attendance_records.filter(status='present').count()
-        absent_count = attendance_records.filter(status='absent').count()
+        subject_info = {
+            'id': subject.id,
+            'name': subject.name,
+            'code': subject.code
+        } if subject else None
+        
+        present_count = sum(1 for record in attendance_records if record.status == 'present')
+        absent_count = sum(1 for record in attendance_records if record.status == 'absent')
         
         return Response({
             'date': selected_date.isoformat(),
@@ -841,7 +1284,7 @@ class AttendanceViewSet(viewsets.ModelViewSet):
             'intake': intake,
             'semester': semester,
             'subject': subject_info,
-            'total_students': attendance_records.count(),
+            'total_students': len(attendance_records),
             'present_count': present_count,
             'absent_count': absent_count,
             'records': serializer.data
@@ -986,14 +1429,25 @@ class AttendanceViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        queryset = self.queryset.filter(student_id=student_id)
-        
-        if subject_id:
-            queryset = queryset.filter(subject_id=subject_id)
+        def summarize(queryset):
+            queryset = queryset.filter(student_id=student_id)
+            if subject_id:
+                queryset = queryset.filter(subject_id=subject_id)
+            return queryset, queryset.aggregate(
+                total=Count('id'),
+                present=Count('id', filter=Q(status='present')),
+                absent=Count('id', filter=Q(status='absent'))
+            )
         
-        total = queryset.count()
-        present = queryset.filter(status='present').count()
-        absent = queryset.filter(status='absent').count()
+        # One conditional aggregate for the summary, one query for the latest records
+        queryset, counts = summarize(self.queryset)
+        if not counts['total']:
+            # Archived cohorts keep their attendance in the archive table (read-only)
+            queryset, counts = summarize(
+                ArchivedAttendance.objects.select_related('student', 'student__user', 'subject')
+            )
+        total = counts['total']
+        present = counts['present']
         
         attendance_records = AttendanceSerializer(queryset[:50], many=True).data
         
@@ -1001,7 +1455,109 @@ class AttendanceViewSet(viewsets.ModelViewSet):
             'student_id': student_id,
             'total_classes': total,
             'present': present,
-            'absent': absent,
+            'absent': counts['absent'],
             'attendance_percentage': round((present / total * 100), 2) if total > 0 else 0,
             'records': attendance_records
         })
+    
+    @action(detail=False, methods=['post'])
+    def scan_low_attendance(self, request):
+        """
+        Run a low-attendance scan for a course (optionally intake/semester).
+        Body: course (required), intake, semester, threshold (default 75)
+        """
+        if getattr(request.user, 'role', None) != 'ADMIN':
+            return Response(
+                {'error': 'Only administrators can run low-attendance scans'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        course = request.data.get('course')
+        intake = request.data.get('intake')
+        semester = request.data.get('semester')
+        threshold = request.data.get('threshold', 75)
+        
+        if not course:
+            return Response(
+                {'error': 'course is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            threshold = float(threshold)
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'threshold must be a number'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 0 < threshold <= 100:
+            return Response(
+                {'error': 'threshold must be between 0 and 100'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        scan = run_low_attendance_scan(
+            course, intake=intake, semester=semester,
+            threshold=threshold, triggered_by=request.user
+        )
+        
+        return Response(
+            LowAttendanceScanSerializer(scan).data,
+            status=status.HTTP_201_CREATED
+        )
+    
+    @action(detail=False, methods=['get'])
+    def low_attendance(self, request):
+        """
+        Paginated list of flagged students from a stored low-attendance scan.
+        Query params: scan (scan id) or course/intake/semester (latest matching scan),
+        subject (optional filter)
+        """
+        if getattr(request.user, 'role', None) != 'ADMIN':
+            return Response(
+                {'error': 'Only administrators can view low-attendance scans'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        scan_id = request.query_params.get('scan')
+        course = request.query_params.get('course')
+        subject_id = request.query_params.get('subject')
+        
+        for name, value in (('scan', scan_id), ('subject', subject_id)):
+            if value and not value.isdigit():
+                return Response(
+                    {'error': f'{name} must be an integer id'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        if scan_id:
+            scan = LowAttendanceScan.objects.filter(id=scan_id).first()
+        elif course:
+            scan = LowAttendanceScan.objects.filter(
+                course=course,
+                intake=request.query_params.get('intake') or None,
+                semester=request.query_params.get('semester') or None
+            ).first()
+        else:
+            return Response(
+                {'error': 'scan or course parameter is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not scan:
+            return Response(
+                {'error': 'No low-attendance scan found. Run a scan first.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        flags = LowAttendanceFlag.objects.filter(scan=scan).select_related(
+            'student', 'student__user', 'subject'
+        )
+        if subject_id:
+            flags = flags.filter(subject_id=subject_id)
+        
+        page = self.paginate_queryset(flags)
+        serializer = LowAttendanceFlagSerializer(page, many=True)
+        response = self.get_paginated_response(serializer.data)
+        response.data['scan'] = LowAttendanceScanSerializer(scan).data
+        return response
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, Student
+from .models import User, Student, CohortPromotion, CohortPromotionEntry, CohortArchive
 
 
 @admin.register(User)
@@ -81,3 +81,65 @@ class StudentAdmin(admin.ModelAdmin):
     def get_phone(self, obj):
         return obj.user.phone_number
     get_phone.short_description = 'Phone'
+
+
+class CohortPromotionEntryInline(admin.TabularInline):
+    model = CohortPromotionEntry
+    fields = ['student', 'previous_semester', 'previous_session', 'held_back']
+    readonly_fields = fields
+    raw_id_fields = ['student']
+    extra = 0
+    can_delete = False
+
+
+@admin.register(CohortPromotion)
+class CohortPromotionAdmin(admin.ModelAdmin):
+    """
+    Read-only audit trail of bulk semester promotions
+    """
+    list_display = [
+        'course',
+        'intake',
+        'from_semester',
+        'to_semester',
+        'promoted_count',
+        'held_back_count',
+        'promoted_by',
+        'created_at'
+    ]
+    list_filter = ['course', 'intake', 'from_semester']
+    readonly_fields = [
+        'course', 'intake', 'from_semester', 'to_semester', 'to_session',
+        'promoted_count', 'held_back_count', 'promoted_by', 'created_at'
+    ]
+    inlines = [CohortPromotionEntryInline]
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(CohortArchive)
+class CohortArchiveAdmin(admin.ModelAdmin):
+    """
+    Read-only log of archived cohorts (archive/restore via the API or the
+    archive_cohort command)
+    """
+    list_display = [
+        'course',
+        'intake',
+        'status',
+        'student_count',
+        'result_count',
+        'attendance_count',
+        'payment_count',
+        'archived_at',
+        'restored_at'
+    ]
+    list_filter = ['status', 'course', 'intake']
+    readonly_fields = [
+        'course', 'intake', 'status', 'student_count', 'result_count', 'attendance_count',
+        'payment_count', 'archived_by', 'restored_by', 'created_at', 'archived_at', 'restored_at'
+    ]
+    
+    def has_add_permission(self, request):
+        return False
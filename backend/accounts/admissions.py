@@ -0,0 +1,306 @@
+"""
+Bulk student admission import.
+Streams rows from a CSV or XLSX roster, validates them a chunk at a time,
+hashes initial passwords in a process pool, reserves student ids in bulk and
+bulk-creates User and Student rows in one transaction per chunk.
+"""
+import codecs
+import csv
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import django
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+from .models import User, Student
+from .search import index_students
+from .serializers import StudentCreateSerializer
+from .student_ids import reserve_student_ids
+
+# Try to import openpyxl, XLSX rosters are unavailable without it
+try:
+    from openpyxl import load_workbook
+    HAS_OPENPYXL = True
+except ImportError:
+    HAS_OPENPYXL = False
+
+DEFAULT_CHUNK_SIZE = 500
+
+# Below this many passwords a chunk is hashed inline; pool round trips would cost more
+MIN_POOL_BATCH = 32
+
+
+class AdmissionImportError(ValueError):
+    """Raised when the roster file itself cannot be read"""
+
+
+class AdmissionRowSerializer(StudentCreateSerializer):
+    """
+    Validates one roster row with the same rules as StudentCreateSerializer.
+    The password may come from the import's default instead of the row, and is
+    checked once per distinct value by the importer rather than per row.
+    """
+    password = serializers.CharField(required=False, allow_blank=True)
+
+    def save(self, **kwargs):
+        raise TypeError('AdmissionRowSerializer only validates; import_admissions creates the rows')
+
+
+def _normalise_header(name):
+    return str(name or '').strip().lower().replace(' ', '_')
+
+
+def _normalise_value(value):
+    """Turn spreadsheet cell values into what the row serializer expects"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def _checked_rows(rows, read_errors, description):
+    """Number the rows, turning read errors (bad encoding, broken file) into AdmissionImportError"""
+    rows = iter(rows)
+    line = 0
+    while True:
+        line += 1
+        try:
+            values = next(rows)
+        except StopIteration:
+            return
+        except read_errors as e:
+            raise AdmissionImportError(f'Roster line {line} is not valid {description}: {e}') from e
+        yield line, values
+
+
+def iter_roster_rows(file, file_format='csv'):
+    """
+    Stream (line number, row dict) pairs from a roster; the first row is the header
+
+    Rows are read lazily, so an unreadable line raises AdmissionImportError
+    only when reached, after the chunks before it have been imported.
+
+    Args:
+        file: Uploaded file or any binary file object
+        file_format: 'csv' or 'xlsx'
+    """
+    if file_format == 'xlsx':
+        if not HAS_OPENPYXL:
+            raise AdmissionImportError('XLSX rosters require openpyxl to be installed')
+        try:
+            workbook = load_workbook(file, read_only=True, data_only=True)
+        except Exception:
+            raise AdmissionImportError('Roster is not a readable XLSX workbook')
+        # openpyxl parses sheet XML while iterating and has no common error type
+        rows = _checked_rows(workbook.worksheets[0].iter_rows(values_only=True), Exception, 'XLSX')
+    else:
+        # Decode line by line so uploads are never read into memory whole
+        rows = _checked_rows(
+            csv.reader(codecs.iterdecode(file, 'utf-8-sig')), (UnicodeDecodeError, csv.Error), 'UTF-8 CSV'
+        )
+
+    header = None
+    for line, values in rows:
+        if header is None:
+            header = [_normalise_header(name) for name in values]
+            if 'username' not in header:
+                raise AdmissionImportError('Roster header must include a username column')
+            continue
+        if not any(value not in (None, '') for value in values):
+            continue
+        yield line, {
+            name: _normalise_value(value)
+            for name, value in zip(header, values)
+            if name and value not in (None, '')
+        }
+    if header is None:
+        raise AdmissionImportError('Roster is empty')
+
+
+def _init_hash_worker():
+    """Pool initializer: spawned (not forked) workers need Django set up before hashing"""
+    if not apps.ready:
+        django.setup()
+
+
+def hash_password(raw_password):
+    return make_password(raw_password)
+
+
+def _validate_chunk(chunk, default_password, seen_usernames, checked_passwords):
+    """
+    Validate one chunk of rows
+
+    Uniqueness of usernames is checked for the whole chunk with one query.
+
+    Returns:
+        List of (entry, validated data) for valid rows; invalid rows get their
+        report entry marked as errors
+    """
+    existing = set(User.objects.filter(
+        username__in=[row.get('username') for _, row, _ in chunk if row.get('username')]
+    ).values_list('username', flat=True))
+
+    valid = []
+    for line, row, entry in chunk:
+        row.setdefault('password', default_password or '')
+        serializer = AdmissionRowSerializer(data=row)
+        if not serializer.is_valid():
+            entry.update(status='error', errors=serializer.errors)
+            continue
+
+        data = serializer.validated_data
+        username = data['username']
+        if username in existing or username in seen_usernames:
+            entry.update(status='error', errors={'username': ['A user with that username already exists.']})
+            continue
+
+        password = data.get('password')
+        if not password:
+            entry.update(status='error', errors={'password': ['No password given and no default password set.']})
+            continue
+        if password not in checked_passwords:
+            try:
+                validate_password(password)
+            except ValidationError as e:
+                entry.update(status='error', errors={'password': list(e.messages)})
+                continue
+            checked_passwords.add(password)
+
+        seen_usernames.add(username)
+        valid.append((entry, dict(data)))
+    return valid
+
+
+def _split_user_data(data):
+    """Separate a validated row into User kwargs, raw password and Student kwargs"""
+    full_name = data.pop('full_name', '') or ''
+    first_name = data.pop('first_name', '') or ''
+    last_name = data.pop('last_name', '') or ''
+    if full_name and not first_name:
+        name_parts = full_name.strip().split(' ', 1)
+        first_name = name_parts[0]
+        last_name = name_parts[1] if len(name_parts) > 1 else ''
+
+    user_data = {
+        'username': data.pop('username'),
+        'email': data.pop('email', '') or '',
+        'first_name': first_name,
+        'last_name': last_name,
+        'role': 'STUDENT',
+        'phone_number': data.pop('phone_number', '') or '',
+    }
+    password = data.pop('password')
+    data['full_name'] = full_name or f"{first_name} {last_name}".strip()
+    return user_data, password, data
+
+
+def _create_chunk(valid, pool):
+    """Hash passwords, reserve ids and bulk-create one chunk in a transaction"""
+    from payments.ledger import rebuild_ledgers
+
+    prepared = [_split_user_data(data) for _, data in valid]
+    passwords = [password for _, password, _ in prepared]
+    if pool is not None and len(passwords) >= MIN_POOL_BATCH:
+        hashes = list(pool.map(hash_password, passwords, chunksize=max(1, len(passwords) // 16)))
+    else:
+        hashes = [hash_password(password) for password in passwords]
+
+    student_ids = reserve_student_ids(len(prepared))
+
+    with transaction.atomic():
+        users = User.objects.bulk_create([
+            User(password=password_hash, **user_data)
+            for (user_data, _, _), password_hash in zip(prepared, hashes)
+        ])
+        students = Student.objects.bulk_create([
+            Student(user=user, student_id=student_id, **student_data)
+            for user, student_id, (_, _, student_data) in zip(users, student_ids, prepared)
+        ])
+        # bulk_create skips Student.save, so price ledgers and index the new students in one pass each
+        created = Student.objects.filter(id__in=[student.id for student in students])
+        rebuild_ledgers(created)
+        index_students(created)
+
+    for (entry, _), student in zip(valid, students):
+        entry.update(status='created', student_id=student.student_id)
+
+
+def import_admissions(rows, default_password=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                      workers=None, dry_run=False):
+    """
+    Import student admissions from roster rows
+
+    Each chunk is validated, hashed, allocated ids and created on its own, so
+    one bad chunk (for example a username taken concurrently) does not undo
+    the chunks before it.
+
+    Args:
+        rows: Iterable of (line number, row dict), e.g. from iter_roster_rows()
+        default_password: Initial password for rows without one (optional)
+        chunk_size: Rows validated and created per transaction
+        workers: Processes used to hash passwords (None = CPU count, 0 = hash inline)
+        dry_run: Validate only, create nothing
+
+    Returns:
+        Dict with created/error counts and a per-row report
+    """
+    report = []
+    seen_usernames = set()
+    checked_passwords = set()
+    pool = None
+
+    def flush(chunk):
+        nonlocal pool, workers
+        valid = _validate_chunk(chunk, default_password, seen_usernames, checked_passwords)
+        if not valid:
+            return
+        if dry_run:
+            for entry, _ in valid:
+                entry.update(status='valid')
+            return
+        if pool is None and workers != 0 and len(valid) >= MIN_POOL_BATCH:
+            try:
+                pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_hash_worker)
+            except (OSError, NotImplementedError):
+                # No multiprocessing support here (e.g. serverless); hash inline instead
+                workers = 0
+        try:
+            _create_chunk(valid, pool)
+        except IntegrityError as e:
+            for entry, _ in valid:
+                entry.update(status='error', errors={'non_field_errors': [f'Chunk rolled back: {e}']})
+
+    try:
+        chunk = []
+        for line, row in rows:
+            entry = {'line': line, 'username': row.get('username'), 'status': 'pending'}
+            report.append(entry)
+            chunk.append((line, row, entry))
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    created = sum(1 for entry in report if entry['status'] == 'created')
+    errors = sum(1 for entry in report if entry['status'] == 'error')
+    return {
+        'dry_run': dry_run,
+        'total': len(report),
+        'created': created,
+        'valid': sum(1 for entry in report if entry['status'] == 'valid'),
+        'errors': errors,
+        'rows': report,
+    }
@@ -0,0 +1,201 @@
+"""
+Cold archive for graduated cohorts.
+Moves a course/intake's results, attendance and payments out of the hot
+tables into their archive twins, a batch of students per transaction, and
+moves them back on restore. Each table and batch costs one INSERT ... SELECT
+and one DELETE; rows keep their primary keys both ways.
+"""
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from academics.models import ArchivedAttendance, ArchivedResult, Attendance, Result
+from payments.models import ArchivedPayment, Payment
+from .models import Student, CohortArchive
+from .promotions import SEMESTERS
+from .summary import summary_cache_key
+
+DEFAULT_ARCHIVE_BATCH_SIZE = 200
+
+# (hot model, archive model, CohortArchive counter)
+ARCHIVE_TABLES = [
+    (Result, ArchivedResult, 'result_count'),
+    (Attendance, ArchivedAttendance, 'attendance_count'),
+    (Payment, ArchivedPayment, 'payment_count'),
+]
+
+
+class ArchiveError(ValueError):
+    """Raised when a cohort cannot be archived or restored"""
+
+
+def open_archive(course, intake):
+    """The cohort's archive that has not been restored, or None"""
+    return CohortArchive.objects.filter(course=course, intake=intake).exclude(status='restored').first()
+
+
+def _check_unreferenced(cursor, model, where, params):
+    """
+    Refuse to move rows that another table still points at through a foreign key constraint
+
+    Pointers declared with db_constraint=False (such as the attendance sync
+    log's) are left as they are: rows keep their ids, so the pointers are
+    valid again once the rows are restored.
+    """
+    quote = connection.ops.quote_name
+    for relation in model._meta.get_fields(include_hidden=True):
+        if not (relation.auto_created and not relation.concrete and (relation.one_to_many or relation.one_to_one)):
+            continue
+        if not relation.field.db_constraint:
+            continue
+        cursor.execute(
+            f"SELECT 1 FROM {quote(relation.related_model._meta.db_table)} "
+            f"WHERE {quote(relation.field.column)} IN ("
+            f"SELECT {quote(relation.field.target_field.column)} FROM {quote(model._meta.db_table)} "
+            f"WHERE {where}) LIMIT 1",
+            params
+        )
+        if cursor.fetchone():
+            raise ArchiveError(
+                f'Cannot move {model._meta.verbose_name_plural}: '
+                f'still referenced by {relation.related_model._meta.verbose_name_plural}'
+            )
+
+
+def _move_rows(source, target, student_ids):
+    """
+    Copy the students' rows of one table into its twin, then delete the originals
+
+    The originals go with a raw DELETE rather than the ORM's, which would run
+    on_delete handlers (e.g. SET_NULL) on rows pointing at them.
+
+    Returns:
+        Number of rows moved
+    """
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(field.column) for field in target._meta.concrete_fields)
+    placeholders = ', '.join(['%s'] * len(student_ids))
+    pk = quote(source._meta.pk.column)
+    # Exactly the copied rows
+    copied = (
+        f"student_id IN ({placeholders}) AND {pk} IN ("
+        f"SELECT {quote(target._meta.pk.column)} FROM {quote(target._meta.db_table)} "
+        f"WHERE student_id IN ({placeholders}))"
+    )
+    params = [*student_ids, *student_ids]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote(target._meta.db_table)} ({columns}) "
+            f"SELECT {columns} FROM {quote(source._meta.db_table)} "
+            f"WHERE student_id IN ({placeholders})",
+            list(student_ids)
+        )
+        _check_unreferenced(cursor, source, copied, params)
+        cursor.execute(f"DELETE FROM {quote(source._meta.db_table)} WHERE {copied}", params)
+        return cursor.rowcount
+
+
+def _move_cohort(archive, to_archive, batch_size):
+    """Move every member's rows in one direction, one transaction per batch of students"""
+    student_ids = list(
+        Student.objects.filter(course=archive.course, intake=archive.intake)
+        .order_by('id').values_list('id', flat=True)
+    )
+    for start in range(0, len(student_ids), batch_size):
+        batch = student_ids[start:start + batch_size]
+        with transaction.atomic():
+            # Row locks keep new results/attendance/payments for these students out mid-move
+            list(Student.objects.filter(id__in=batch).select_for_update().values_list('id', flat=True))
+            moved = {}
+            for hot, cold, counter in ARCHIVE_TABLES:
+                source, target = (hot, cold) if to_archive else (cold, hot)
+                moved[counter] = _move_rows(source, target, batch)
+            if to_archive:
+                CohortArchive.objects.filter(pk=archive.pk).update(
+                    **{counter: F(counter) + count for counter, count in moved.items()}
+                )
+        cache.delete_many([summary_cache_key(student_id) for student_id in batch])
+
+
+def archive_cohort(course, intake, batch_size=DEFAULT_ARCHIVE_BATCH_SIZE, archived_by=None, force=False):
+    """
+    Move a graduated course/intake's results, attendance and payments to the archive
+
+    Ledgers, daily rollups and dues aging count archived payments, so the
+    move leaves every balance and financial total unchanged. A run that was
+    interrupted part way is resumed by calling this again.
+
+    Args:
+        course: Course code
+        intake: Intake number
+        batch_size: Students moved per transaction
+        archived_by: User running the archive (optional)
+        force: Archive even if some students are not in the final semester
+
+    Returns:
+        The CohortArchive record
+    """
+    archive = open_archive(course, intake)
+    if archive is None:
+        student_count = Student.objects.filter(course=course, intake=intake).count()
+        if not student_count:
+            raise ArchiveError('No students found in this course/intake')
+        if not force and Student.objects.filter(course=course, intake=intake).exclude(
+            semester=SEMESTERS[-1]
+        ).exists():
+            raise ArchiveError(
+                f'{course} {intake} has students before the final semester ({SEMESTERS[-1]}); '
+                'pass force to archive it anyway'
+            )
+        archive = CohortArchive.objects.create(
+            course=course,
+            intake=intake,
+            student_count=student_count,
+            archived_by=archived_by
+        )
+    elif archive.status == 'archived':
+        raise ArchiveError(f'{course} {intake} is already archived')
+    elif archive.status == 'restoring':
+        raise ArchiveError(f'{course} {intake} is being restored; finish the restore first')
+
+    _move_cohort(archive, True, batch_size)
+
+    archive.refresh_from_db()
+    archive.status = 'archived'
+    archive.archived_at = timezone.now()
+    archive.save(update_fields=['status', 'archived_at'])
+    return archive
+
+
+def restore_cohort(course, intake, batch_size=DEFAULT_ARCHIVE_BATCH_SIZE, restored_by=None):
+    """
+    Move an archived cohort's rows back into the hot tables
+
+    Args:
+        course: Course code
+        intake: Intake number
+        batch_size: Students moved per transaction
+        restored_by: User running the restore (optional)
+
+    Returns:
+        The CohortArchive record
+    """
+    archive = open_archive(course, intake)
+    if archive is None:
+        raise ArchiveError(f'{course} {intake} is not archived')
+
+    archive.status = 'restoring'
+    archive.restored_by = restored_by
+    archive.save(update_fields=['status', 'restored_by'])
+
+    try:
+        _move_cohort(archive, False, batch_size)
+    except IntegrityError as e:
+        # e.g. a result entered for an archived student after the move; the batch is rolled back
+        raise ArchiveError(f'Archived rows clash with rows added since archiving: {e}')
+
+    archive.status = 'restored'
+    archive.restored_at = timezone.now()
+    archive.save(update_fields=['status', 'restored_at'])
+    return archive
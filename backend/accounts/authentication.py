@@ -0,0 +1,141 @@
+"""
+Claims-based JWT authentication.
+Tokens issued at login carry the user's role, student profile id and token
+version, so a request is authenticated from the signed claims alone instead
+of loading the user row (and then the student profile) every time.
+Revocation still works: bumping User.token_version invalidates older tokens.
+The current version is cached for TOKEN_VERSION_CACHE_SECONDS, and views
+that must see the stored user opt in with authenticate_from_db.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import User, Student
+
+VERSION_CLAIM = 'token_version'
+
+# User fields copied into tokens and read back from them as-is
+USER_CLAIMS = ('username', 'role', 'is_staff', 'is_superuser')
+
+
+def token_version_cache_key(user_id):
+    return f"token_version:{user_id}"
+
+
+def forget_token_version(user_id):
+    """
+    Drop the cached version after it changed
+
+    With the default per-process cache, other processes keep theirs until
+    TOKEN_VERSION_CACHE_SECONDS pass; a shared cache makes this global.
+    """
+    cache.delete(token_version_cache_key(user_id))
+
+
+def current_token_version(user_id):
+    """
+    The token version tokens of this user must carry (cached)
+
+    Inactive or deleted users get -1, which no token carries.
+    """
+    key = token_version_cache_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = User.objects.filter(pk=user_id, is_active=True).values_list(
+            'token_version', flat=True
+        ).first()
+        if version is None:
+            version = -1
+        cache.set(key, version, getattr(settings, 'TOKEN_VERSION_CACHE_SECONDS', 60))
+    return version
+
+
+def token_claims(user):
+    """Claims embedded in a user's tokens"""
+    student_profile = None
+    if user.role == 'STUDENT':
+        student_profile = Student.objects.filter(user_id=user.pk).values_list('id', flat=True).first()
+    return {
+        **{claim: getattr(user, claim) for claim in USER_CLAIMS},
+        'student_profile': student_profile,
+        VERSION_CLAIM: user.token_version,
+    }
+
+
+def token_for_user(user):
+    """Refresh token with the user's claims; its access token inherits them"""
+    refresh = RefreshToken.for_user(user)
+    for claim, value in token_claims(user).items():
+        refresh[claim] = value
+    return refresh
+
+
+def wants_db_user(request):
+    """
+    Whether the view asked for the stored user
+
+    Views set authenticate_from_db to True, or to the names of the actions
+    (e.g. admin-only ones) that need it.
+    """
+    view = (getattr(request, 'parser_context', None) or {}).get('view')
+    setting = getattr(view, 'authenticate_from_db', False)
+    if isinstance(setting, bool):
+        return setting
+    return getattr(view, 'action', None) in setting
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that trusts the claims of tokens from token_for_user.
+
+    request.user is a User instance holding only the claimed fields (others
+    load on access), with student_profile pre-set to a Student holding just
+    its id. Tokens without claims, and views that opt in, load the user row.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+
+        if VERSION_CLAIM not in validated_token:
+            return self.get_user(validated_token), validated_token
+        if wants_db_user(request):
+            user = self.get_user(validated_token)
+            if user.token_version != validated_token[VERSION_CLAIM]:
+                raise AuthenticationFailed(_('Token has been revoked'), code='token_revoked')
+            return user, validated_token
+        return self.get_claims_user(validated_token), validated_token
+
+    def get_claims_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+        if current_token_version(user_id) != validated_token[VERSION_CLAIM]:
+            raise AuthenticationFailed(_('Token has been revoked'), code='token_revoked')
+
+        fields = ['id', 'is_active', VERSION_CLAIM, *USER_CLAIMS]
+        values = [
+            user_id, True, validated_token[VERSION_CLAIM],
+            *(validated_token.get(claim) for claim in USER_CLAIMS)
+        ]
+        user = User.from_db(DEFAULT_DB_ALIAS, fields, values)
+
+        student_id = validated_token.get('student_profile')
+        student = None
+        if student_id:
+            student = Student.from_db(DEFAULT_DB_ALIAS, ['id', 'user_id'], [student_id, user_id])
+            Student.user.field.set_cached_value(student, user)
+        User.student_profile.related.set_cached_value(user, student)
+        return user
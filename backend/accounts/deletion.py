@@ -0,0 +1,188 @@
+"""
+Student deletion.
+Removes students, their user accounts and everything that cascades from them
+with chunked raw DELETEs, dependents first, instead of Django's collector,
+which loads every related result, attendance record and payment into memory
+before deleting. Only primary keys pass through Python, one chunk at a time.
+"""
+from django.core.cache import cache
+from django.db import connection, models, transaction
+
+from payments.models import ArchivedPayment, Payment
+from payments.rollups import apply_payment_rollups
+from .models import User, Student
+from .summary import summary_cache_key
+
+DEFAULT_DELETE_CHUNK_SIZE = 500
+
+
+class StudentDeletionError(ValueError):
+    """Raised when students cannot be deleted"""
+
+
+def _relations(model):
+    """Foreign keys pointing at model (hidden ones such as M2M through tables included)"""
+    return [
+        field for field in model._meta.get_fields(include_hidden=True)
+        if field.auto_created and not field.concrete and (field.one_to_many or field.one_to_one)
+    ]
+
+
+def _child_filter(relation, parent, parent_filter):
+    """SQL selecting the rows that reference the parent rows matched by parent_filter"""
+    quote = connection.ops.quote_name
+    return (
+        f"{quote(relation.field.column)} IN ("
+        f"SELECT {quote(relation.field.target_field.column)} FROM {quote(parent._meta.db_table)} "
+        f"WHERE {parent_filter})"
+    )
+
+
+def _in(column, values):
+    return f"{connection.ops.quote_name(column)} IN ({', '.join(['%s'] * len(values))})"
+
+
+def _on_delete(relation):
+    """
+    How deleting a parent row treats the rows that reference it
+
+    Returns:
+        ('cascade', None), ('set', value) for SET_NULL / SET_DEFAULT / SET(...),
+        ('check', None) when referencing rows must block the delete, or
+        ('ignore', None) for DO_NOTHING without a database constraint
+    """
+    on_delete = relation.field.remote_field.on_delete
+    if on_delete is models.CASCADE:
+        return 'cascade', None
+    if on_delete is models.SET_NULL:
+        return 'set', None
+    if on_delete is models.SET_DEFAULT:
+        return 'set', relation.field.get_default()
+    if on_delete in (models.PROTECT, models.RESTRICT):
+        return 'check', None
+    if on_delete is models.DO_NOTHING:
+        # Left to the database: a constrained reference would fail at commit
+        return ('check' if relation.field.db_constraint else 'ignore'), None
+    deconstruct = getattr(on_delete, 'deconstruct', None)
+    if deconstruct and deconstruct()[0] == 'django.db.models.SET':
+        value = deconstruct()[1][0]
+        value = value() if callable(value) else value
+        return 'set', value.pk if isinstance(value, models.Model) else value
+    raise StudentDeletionError(
+        f'Cannot delete: unsupported on_delete for {relation.related_model._meta.label}.{relation.field.name}'
+    )
+
+
+def _count(cursor, model, where, params, counts, path=()):
+    """Add the rows of model (and its cascade) matched by where to counts"""
+    cursor.execute(
+        f"SELECT COUNT(*) FROM {connection.ops.quote_name(model._meta.db_table)} WHERE {where}", params
+    )
+    total = cursor.fetchone()[0]
+    if not total:
+        return
+    counts[model._meta.label] = counts.get(model._meta.label, 0) + total
+
+    for relation in _relations(model):
+        handling, _ = _on_delete(relation)
+        child_where = _child_filter(relation, model, where)
+        if handling == 'cascade' and relation.related_model not in (*path, model):
+            _count(cursor, relation.related_model, child_where, params, counts, (*path, model))
+        elif handling in ('cascade', 'check'):
+            # A cascade cycle is only safe to skip when nothing is on the far side of it
+            _check_unreferenced(cursor, relation, child_where, params)
+
+
+def _check_unreferenced(cursor, relation, where, params):
+    table = connection.ops.quote_name(relation.related_model._meta.db_table)
+    cursor.execute(f"SELECT 1 FROM {table} WHERE {where} LIMIT 1", params)
+    if cursor.fetchone():
+        raise StudentDeletionError(
+            f'Cannot delete: still referenced by {relation.related_model._meta.verbose_name_plural}'
+        )
+
+
+def _purge(cursor, model, where, params, chunk_size, deleted, path=()):
+    """
+    Delete the rows of model matched by where, chunk_size rows per statement.
+    Each chunk's dependents are deleted (or repointed) before the chunk itself.
+    Cascades that lead back to a model already being purged are not followed;
+    rows on such a cycle block the delete instead.
+    """
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    pk = model._meta.pk.column
+    relations = [(relation, *_on_delete(relation)) for relation in _relations(model)]
+
+    while True:
+        cursor.execute(f"SELECT {quote(pk)} FROM {table} WHERE {where} LIMIT %s", [*params, chunk_size])
+        pks = [row[0] for row in cursor.fetchall()]
+        if not pks:
+            return
+
+        chunk = _in(pk, pks)
+        for relation, handling, value in relations:
+            child_where = _child_filter(relation, model, chunk)
+            if handling == 'cascade' and relation.related_model not in (*path, model):
+                _purge(
+                    cursor, relation.related_model, child_where, pks, chunk_size, deleted, (*path, model)
+                )
+            elif handling == 'set':
+                cursor.execute(
+                    f"UPDATE {quote(relation.related_model._meta.db_table)} "
+                    f"SET {quote(relation.field.column)} = %s WHERE {child_where}",
+                    [value, *pks]
+                )
+            elif handling in ('cascade', 'check'):
+                _check_unreferenced(cursor, relation, child_where, pks)
+
+        cursor.execute(f"DELETE FROM {table} WHERE {chunk}", pks)
+        deleted[model._meta.label] = deleted.get(model._meta.label, 0) + cursor.rowcount
+
+
+def delete_students(student_ids, dry_run=False, chunk_size=DEFAULT_DELETE_CHUNK_SIZE):
+    """
+    Delete students together with their user accounts and every dependent row
+
+    Runs in one transaction. Payments are removed without Payment.delete, so
+    they are taken out of the daily rollup first.
+
+    Args:
+        student_ids: Student ids (pk)
+        dry_run: Only count what would be deleted
+        chunk_size: Rows per DELETE statement
+
+    Returns:
+        Dict of model label -> rows deleted (or that would be deleted)
+    """
+    student_ids = sorted({int(student_id) for student_id in student_ids})
+    if not student_ids:
+        return {}
+
+    counts = {}
+    with transaction.atomic():
+        found = dict(Student.objects.filter(id__in=student_ids).values_list('id', 'user_id'))
+        missing = set(student_ids) - set(found)
+        if missing:
+            raise StudentDeletionError(
+                f"Students not found: {', '.join(map(str, sorted(missing)))}"
+            )
+        user_ids = sorted(found.values())
+
+        if dry_run:
+            with connection.cursor() as cursor:
+                for start in range(0, len(user_ids), chunk_size):
+                    batch = user_ids[start:start + chunk_size]
+                    _count(cursor, User, _in(User._meta.pk.column, batch), batch, counts)
+            return counts
+
+        for model in (Payment, ArchivedPayment):
+            apply_payment_rollups(model.objects.filter(student_id__in=student_ids), sign=-1)
+
+        with connection.cursor() as cursor:
+            for start in range(0, len(user_ids), chunk_size):
+                batch = user_ids[start:start + chunk_size]
+                _purge(cursor, User, _in(User._meta.pk.column, batch), batch, chunk_size, counts)
+
+    cache.delete_many([summary_cache_key(student_id) for student_id in student_ids])
+    return counts
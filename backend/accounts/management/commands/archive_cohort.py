@@ -0,0 +1,52 @@
+"""
+Management command to move a graduated cohort to the archive tables, or back
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.archive import DEFAULT_ARCHIVE_BATCH_SIZE, ArchiveError, archive_cohort, restore_cohort
+
+
+class Command(BaseCommand):
+    help = "Archive (or restore) a course/intake's results, attendance and payments"
+
+    def add_arguments(self, parser):
+        parser.add_argument('course', help='Course code (e.g. BBA)')
+        parser.add_argument('intake', help='Intake (e.g. 15th)')
+        parser.add_argument(
+            '--restore',
+            action='store_true',
+            help='Move an archived cohort back into the live tables',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Archive even if some students are not in the final semester',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_ARCHIVE_BATCH_SIZE,
+            help=f'Students moved per transaction (default: {DEFAULT_ARCHIVE_BATCH_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        if options['restore']:
+            operation = restore_cohort
+            extra = {}
+        else:
+            operation = archive_cohort
+            extra = {'force': options['force']}
+        started = time.monotonic()
+        try:
+            archive = operation(options['course'], options['intake'], batch_size=options['batch_size'], **extra)
+        except ArchiveError as e:
+            raise CommandError(str(e))
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{archive.course} {archive.intake} {archive.status} in {elapsed:.1f}s: '
+            f'{archive.student_count} students, {archive.result_count} results, '
+            f'{archive.attendance_count} attendance records, {archive.payment_count} payments'
+        ))
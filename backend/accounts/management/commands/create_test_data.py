@@ -7,11 +7,13 @@ from django.utils import timezone
 from datetime import datetime, timedelta
 from decimal import Decimal
 import random
+import uuid
 
 from accounts.models import User, Student
 from students.models import Course, Batch, Enrollment, Teacher
 from academics.models import Subject, Exam, Result
 from payments.models import FeeStructure, Payment, Expense
+from payments.rollups import rebuild_rollups
 
 
 class Command(BaseCommand):
@@ -85,6 +87,8 @@ class Command(BaseCommand):
         Course.objects.all().delete()
         User.objects.filter(role='STUDENT').delete()
         User.objects.filter(role='TEACHER').delete()
+        # The deletes above keep the rollup in step row by row; rebuild to start from a clean slate
+        rebuild_rollups()
         self.stdout.write(self.style.SUCCESS('✓ Cleared existing test data'))
 
     def create_admin(self):
@@ -515,7 +519,7 @@ class Command(BaseCommand):
                     amount_paid=amount,
                     payment_date=today - timedelta(days=random.randint(1, 30)),
                     payment_method=random.choice(['cash', 'bank_transfer', 'online']),
-                    transaction_id=f'TXN{random.randint(100000, 999999)}',
+                    transaction_id=f'TXN{uuid.uuid4().hex[:10].upper()}',
                     discount_amount=Decimal('0.00'),
                     remarks='Regular payment'
                 )
@@ -0,0 +1,60 @@
+"""
+Management command to generate missing thumbnails for student photos and profile pictures
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.models import User, Student
+from accounts.thumbnails import backfill_thumbnails
+
+MODELS = {
+    'student': Student,
+    'user': User,
+}
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnails for stored student photos and profile pictures'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            choices=['student', 'user', 'all'],
+            default='all',
+            help='Which images to process (default: all)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Processes rendering thumbnails (default: CPU count, 0 = no pool)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Images rendered and saved per round (default: 200)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-render images that already have a thumbnail',
+        )
+
+    def handle(self, *args, **options):
+        names = list(MODELS) if options['model'] == 'all' else [options['model']]
+        for name in names:
+            started = time.monotonic()
+            written, failed = backfill_thumbnails(
+                MODELS[name],
+                workers=options['workers'],
+                batch_size=options['batch_size'],
+                force=options['force'],
+            )
+            elapsed = time.monotonic() - started
+            self.stdout.write(self.style.SUCCESS(
+                f'{name}: {written} thumbnails written in {elapsed:.1f}s'
+            ))
+            if failed:
+                self.stdout.write(self.style.WARNING(f'{name}: {failed} images could not be read'))
@@ -0,0 +1,85 @@
+"""
+Management command to bulk-import student admissions from a CSV/XLSX roster
+The header row uses the student create fields (username, full_name, course, ...)
+"""
+import csv
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.admissions import (
+    DEFAULT_CHUNK_SIZE, AdmissionImportError, import_admissions, iter_roster_rows
+)
+
+
+class Command(BaseCommand):
+    help = 'Bulk-import student admissions from a CSV or XLSX roster'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Roster file (.csv or .xlsx)')
+        parser.add_argument(
+            '--default-password',
+            help='Initial password for rows without a password column value',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f'Rows per validation/creation transaction (default: {DEFAULT_CHUNK_SIZE})',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Processes used to hash passwords (default: CPU count, 0 = no pool)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate the roster without creating anything',
+        )
+        parser.add_argument(
+            '--report',
+            help='Write the per-row report to this CSV file',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = 'xlsx' if path.lower().endswith('.xlsx') else 'csv'
+        if not os.path.exists(path):
+            raise CommandError(f'File not found: {path}')
+
+        started = time.monotonic()
+        try:
+            with open(path, 'rb') as roster:
+                result = import_admissions(
+                    iter_roster_rows(roster, file_format),
+                    default_password=options['default_password'],
+                    chunk_size=options['chunk_size'],
+                    workers=options['workers'],
+                    dry_run=options['dry_run'],
+                )
+        except AdmissionImportError as e:
+            raise CommandError(str(e))
+        elapsed = time.monotonic() - started
+
+        if options['report']:
+            with open(options['report'], 'w', newline='') as out:
+                writer = csv.writer(out)
+                writer.writerow(['line', 'username', 'status', 'student_id', 'errors'])
+                for row in result['rows']:
+                    writer.writerow([
+                        row['line'], row['username'], row['status'],
+                        row.get('student_id', ''), row.get('errors', '')
+                    ])
+
+        for row in result['rows']:
+            if row['status'] == 'error':
+                self.stdout.write(self.style.WARNING(f"  line {row['line']} ({row['username']}): {row['errors']}"))
+
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        count = result['valid'] if options['dry_run'] else result['created']
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {count} of {result['total']} rows in {elapsed:.1f}s ({result['errors']} errors)"
+        ))
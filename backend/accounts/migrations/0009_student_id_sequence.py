@@ -0,0 +1,26 @@
+# Generated by Django 5.0 on 2026-10-19 00:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_student_major_student_major_locked'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentIdSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField(help_text='Admission year the sequence belongs to', unique=True)),
+                ('last_number', models.PositiveIntegerField(default=0, help_text='Highest number already allocated for the year')),
+            ],
+            options={
+                'verbose_name': 'Student ID Sequence',
+                'verbose_name_plural': 'Student ID Sequences',
+                'ordering': ['-year'],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+import re
+
+from django.db import migrations
+
+STUDENT_ID_PATTERN = re.compile(r'^STU(\d{4})(\d+)$')
+
+
+def seed_sequences(apps, schema_editor):
+    """Start each year's sequence after the highest student ID already issued"""
+    Student = apps.get_model('accounts', 'Student')
+    StudentIdSequence = apps.get_model('accounts', 'StudentIdSequence')
+
+    highest = {}
+    for student_id in Student.objects.values_list('student_id', flat=True).iterator():
+        match = STUDENT_ID_PATTERN.match(student_id or '')
+        if match:
+            year, number = int(match.group(1)), int(match.group(2))
+            highest[year] = max(highest.get(year, 0), number)
+
+    StudentIdSequence.objects.bulk_create([
+        StudentIdSequence(year=year, last_number=number) for year, number in highest.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_student_id_sequence'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0 on 2026-10-19 01:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_seed_student_id_sequences'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentSearchIndex',
+            fields=[
+                ('student', models.OneToOneField(help_text='Student the document describes', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_index', serialize=False, to='accounts.student')),
+                ('document', models.TextField(blank=True, default='', help_text='Lower-cased name, ID, registration, phone and guardian tokens')),
+            ],
+            options={
+                'verbose_name': 'Student Search Index',
+                'verbose_name_plural': 'Student Search Index',
+            },
+        ),
+    ]
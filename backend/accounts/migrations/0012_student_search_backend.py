@@ -0,0 +1,104 @@
+import re
+
+from django.db import migrations
+
+TOKEN_PATTERN = re.compile(r'[^\W_]+')
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE accounts_studentsearch_fts USING fts5(
+        document, content='accounts_studentsearchindex', content_rowid='student_id', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER accounts_studentsearch_ai AFTER INSERT ON accounts_studentsearchindex BEGIN
+        INSERT INTO accounts_studentsearch_fts(rowid, document) VALUES (new.student_id, new.document);
+    END
+    """,
+    """
+    CREATE TRIGGER accounts_studentsearch_ad AFTER DELETE ON accounts_studentsearchindex BEGIN
+        INSERT INTO accounts_studentsearch_fts(accounts_studentsearch_fts, rowid, document)
+        VALUES ('delete', old.student_id, old.document);
+    END
+    """,
+    """
+    CREATE TRIGGER accounts_studentsearch_au AFTER UPDATE ON accounts_studentsearchindex BEGIN
+        INSERT INTO accounts_studentsearch_fts(accounts_studentsearch_fts, rowid, document)
+        VALUES ('delete', old.student_id, old.document);
+        INSERT INTO accounts_studentsearch_fts(rowid, document) VALUES (new.student_id, new.document);
+    END
+    """,
+]
+
+SQLITE_REVERSE = [
+    'DROP TRIGGER IF EXISTS accounts_studentsearch_au',
+    'DROP TRIGGER IF EXISTS accounts_studentsearch_ad',
+    'DROP TRIGGER IF EXISTS accounts_studentsearch_ai',
+    'DROP TABLE IF EXISTS accounts_studentsearch_fts',
+]
+
+POSTGRESQL_FORWARD = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS accounts_studentsearch_trgm '
+    'ON accounts_studentsearchindex USING gin (document gin_trgm_ops)',
+]
+
+POSTGRESQL_REVERSE = [
+    'DROP INDEX IF EXISTS accounts_studentsearch_trgm',
+]
+
+
+def phone_variants(phone):
+    digits = re.sub(r'\D', '', phone or '')
+    if not digits:
+        return []
+    if digits.startswith('880') and len(digits) > 10:
+        return [digits, digits[2:]]
+    return [digits]
+
+
+def run_statements(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_search_backend(apps, schema_editor):
+    """Create the text index for this database, then write every student's document"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        run_statements(schema_editor, SQLITE_FORWARD)
+    elif vendor == 'postgresql':
+        run_statements(schema_editor, POSTGRESQL_FORWARD)
+
+    Student = apps.get_model('accounts', 'Student')
+    StudentSearchIndex = apps.get_model('accounts', 'StudentSearchIndex')
+    entries = []
+    for student in Student.objects.select_related('user').iterator(chunk_size=1000):
+        user = student.user
+        parts = [
+            student.full_name, user.first_name, user.last_name, user.username,
+            student.student_id, student.registration_number, student.guardian_name,
+            *phone_variants(user.phone_number), *phone_variants(student.guardian_phone),
+        ]
+        tokens = [token for part in parts for token in TOKEN_PATTERN.findall(str(part or '').lower())]
+        entries.append(StudentSearchIndex(student_id=student.pk, document=' '.join(dict.fromkeys(tokens))))
+    StudentSearchIndex.objects.bulk_create(entries, batch_size=1000)
+
+
+def drop_search_backend(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        run_statements(schema_editor, SQLITE_REVERSE)
+    elif vendor == 'postgresql':
+        run_statements(schema_editor, POSTGRESQL_REVERSE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_student_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_backend, drop_search_backend),
+    ]
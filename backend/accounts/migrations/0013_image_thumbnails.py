@@ -0,0 +1,23 @@
+# Generated by Django 5.0 on 2026-10-19 01:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_student_search_backend'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='photo_thumbnail',
+            field=models.ImageField(blank=True, editable=False, help_text='Thumbnail generated from the photograph', null=True, upload_to='students/thumbnails/'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='profile_picture_thumbnail',
+            field=models.ImageField(blank=True, editable=False, help_text='Thumbnail generated from the profile picture', null=True, upload_to='profiles/thumbnails/'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.0 on 2026-10-19 01:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_image_thumbnails'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CohortPromotion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('course', models.CharField(choices=[('BBA', 'BBA'), ('MBA', 'MBA'), ('CSE', 'CSE'), ('THM', 'THM')], help_text='Course of the promoted cohort', max_length=10)),
+                ('intake', models.CharField(choices=[('1st', '1st'), ('2nd', '2nd'), ('9th', '9th'), ('10th', '10th'), ('15th', '15th'), ('16th', '16th'), ('17th', '17th'), ('18th', '18th'), ('19th', '19th'), ('20th', '20th')], help_text='Intake of the promoted cohort', max_length=10)),
+                ('from_semester', models.CharField(choices=[('1st', '1st'), ('2nd', '2nd'), ('3rd', '3rd'), ('4th', '4th'), ('5th', '5th'), ('6th', '6th'), ('7th', '7th'), ('8th', '8th')], help_text='Semester the cohort was promoted from', max_length=10)),
+                ('to_semester', models.CharField(choices=[('1st', '1st'), ('2nd', '2nd'), ('3rd', '3rd'), ('4th', '4th'), ('5th', '5th'), ('6th', '6th'), ('7th', '7th'), ('8th', '8th')], help_text='Semester the cohort was promoted to', max_length=10)),
+                ('to_session', models.CharField(blank=True, default='', help_text='Session assigned with the promotion (blank = unchanged)', max_length=50)),
+                ('promoted_count', models.PositiveIntegerField(default=0, help_text='Students moved to the new semester')),
+                ('held_back_count', models.PositiveIntegerField(default=0, help_text='Students excluded from the promotion')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('promoted_by', models.ForeignKey(blank=True, help_text='User who ran the promotion', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cohort_promotions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Cohort Promotion',
+                'verbose_name_plural': 'Cohort Promotions',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CohortPromotionEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('previous_semester', models.CharField(help_text='Semester before the promotion', max_length=10)),
+                ('previous_session', models.CharField(blank=True, default='', help_text='Session before the promotion', max_length=50)),
+                ('held_back', models.BooleanField(default=False, help_text='Whether the student was excluded and stayed in the previous semester')),
+                ('promotion', models.ForeignKey(help_text='Promotion that took the snapshot', on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='accounts.cohortpromotion')),
+                ('student', models.ForeignKey(help_text='Student in the cohort', on_delete=django.db.models.deletion.CASCADE, related_name='promotion_history', to='accounts.student')),
+            ],
+            options={
+                'verbose_name': 'Cohort Promotion Entry',
+                'verbose_name_plural': 'Cohort Promotion Entries',
+                'ordering': ['promotion', 'student'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='cohortpromotion',
+            index=models.Index(fields=['course', 'intake'], name='accounts_co_course_ef6527_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='cohortpromotionentry',
+            unique_together={('promotion', 'student')},
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0 on 2026-10-19 01:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_cohort_promotions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CohortArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('course', models.CharField(choices=[('BBA', 'BBA'), ('MBA', 'MBA'), ('CSE', 'CSE'), ('THM', 'THM')], help_text='Course of the archived cohort', max_length=10)),
+                ('intake', models.CharField(choices=[('1st', '1st'), ('2nd', '2nd'), ('9th', '9th'), ('10th', '10th'), ('15th', '15th'), ('16th', '16th'), ('17th', '17th'), ('18th', '18th'), ('19th', '19th'), ('20th', '20th')], help_text='Intake of the archived cohort', max_length=10)),
+                ('status', models.CharField(choices=[('archiving', 'Archiving'), ('archived', 'Archived'), ('restoring', 'Restoring'), ('restored', 'Restored')], default='archiving', help_text='Archiving/restoring run in batches; an interrupted run resumes from here', max_length=10)),
+                ('student_count', models.PositiveIntegerField(default=0, help_text='Students in the cohort when it was archived')),
+                ('result_count', models.PositiveIntegerField(default=0, help_text='Result rows moved to the archive')),
+                ('attendance_count', models.PositiveIntegerField(default=0, help_text='Attendance rows moved to the archive')),
+                ('payment_count', models.PositiveIntegerField(default=0, help_text='Payment rows moved to the archive')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('archived_at', models.DateTimeField(blank=True, null=True)),
+                ('restored_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_by', models.ForeignKey(blank=True, help_text='User who archived the cohort', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cohort_archives', to=settings.AUTH_USER_MODEL)),
+                ('restored_by', models.ForeignKey(blank=True, help_text='User who restored the cohort', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cohort_restores', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Cohort Archive',
+                'verbose_name_plural': 'Cohort Archives',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='cohortarchive',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'restored'), _negated=True), fields=('course', 'intake'), name='unique_open_cohort_archive'),
+        ),
+    ]
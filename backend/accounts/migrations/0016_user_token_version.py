@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-19 01:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_cohort_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0, help_text='Embedded in issued tokens; bumping it revokes every token issued before'),
+        ),
+    ]
@@ -1,7 +1,9 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
 
+from .thumbnails import attach_thumbnail
+
 
 class User(AbstractUser):
     """
@@ -47,11 +49,24 @@ class User(AbstractUser):
         help_text='User profile picture'
     )
     
+    profile_picture_thumbnail = models.ImageField(
+        upload_to='profiles/thumbnails/',
+        blank=True,
+        null=True,
+        editable=False,
+        help_text='Thumbnail generated from the profile picture'
+    )
+    
     is_active = models.BooleanField(
         default=True,
         help_text='Designates whether this user should be treated as active.'
     )
     
+    token_version = models.PositiveIntegerField(
+        default=0,
+        help_text='Embedded in issued tokens; bumping it revokes every token issued before'
+    )
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -63,10 +78,68 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.get_full_name() or self.username} ({self.get_role_display()})"
     
+    CREDENTIAL_FIELDS = ('role', 'is_active', 'password')
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded credentials so save() can tell when tokens must be revoked
+        instance._loaded_credentials = {
+            name: value for name, value in zip(field_names, values) if name in cls.CREDENTIAL_FIELDS
+        }
+        return instance
+    
     def get_full_name(self):
         """Return the first_name plus the last_name, with a space in between."""
         full_name = f"{self.first_name} {self.last_name}".strip()
         return full_name or self.username
+    
+    def save(self, *args, **kwargs):
+        is_new = self._state.adding
+        if attach_thumbnail(self, 'profile_picture', 'profile_picture_thumbnail') and kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'profile_picture_thumbnail'}
+        
+        revoke = not is_new and self._credentials_changed(kwargs.get('update_fields'))
+        if revoke:
+            # Tokens carry the role and are only valid for an active user with the old password
+            self.token_version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'token_version'}
+        
+        super().save(*args, **kwargs)
+        self._loaded_credentials = {
+            name: getattr(self, name) for name in self.CREDENTIAL_FIELDS if name in self.__dict__
+        }
+        if revoke:
+            from .authentication import forget_token_version
+            forget_token_version(self.pk)
+        if not is_new:
+            # Keep the linked student's search document in step with name/phone edits
+            from .search import index_user
+            index_user(self, kwargs.get('update_fields'))
+    
+    def _credentials_changed(self, update_fields=None):
+        """
+        Whether this save changes the role, active flag or password stored for the user
+
+        Compares against the values loaded with the instance; the stored row is
+        read only when some were deferred (or the instance was not loaded).
+        """
+        if update_fields is not None and not set(self.CREDENTIAL_FIELDS) & set(update_fields):
+            return False
+        loaded = getattr(self, '_loaded_credentials', {})
+        if len(loaded) == len(self.CREDENTIAL_FIELDS):
+            stored = tuple(loaded[name] for name in self.CREDENTIAL_FIELDS)
+        else:
+            stored = User.objects.filter(pk=self.pk).values_list(*self.CREDENTIAL_FIELDS).first()
+        return stored is not None and stored != tuple(getattr(self, name) for name in self.CREDENTIAL_FIELDS)
+    
+    def revoke_tokens(self):
+        """Invalidate every access and refresh token issued to this user so far"""
+        User.objects.filter(pk=self.pk).update(token_version=models.F('token_version') + 1)
+        self.refresh_from_db(fields=['token_version'])
+        from .authentication import forget_token_version
+        forget_token_version(self.pk)
 
 
 class Student(models.Model):
@@ -286,6 +359,14 @@ class Student(models.Model):
         help_text='Student photograph'
     )
     
+    photo_thumbnail = models.ImageField(
+        upload_to='students/thumbnails/',
+        blank=True,
+        null=True,
+        editable=False,
+        help_text='Thumbnail generated from the photograph'
+    )
+    
     blood_group = models.CharField(
         max_length=3,
         choices=BLOOD_GROUP_CHOICES,
@@ -487,23 +568,328 @@ class Student(models.Model):
     def __str__(self):
         return f"{self.student_id} - {self.user.get_full_name()}"
     
+    COHORT_FIELDS = ('course', 'intake', 'semester')
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded cohort so save() can tell when the fee ledger needs re-pricing
+        instance._loaded_cohort = {
+            name: value for name, value in zip(field_names, values) if name in cls.COHORT_FIELDS
+        }
+        return instance
+    
+    def _cohort_changed(self, update_fields=None):
+        """Whether this save moves the student to another course/intake/semester"""
+        if update_fields is not None and not set(self.COHORT_FIELDS) & set(update_fields):
+            return False
+        loaded = getattr(self, '_loaded_cohort', None)
+        if loaded is None:
+            return False
+        # A field deferred at load and set since has no known previous value
+        return any(
+            loaded[name] != getattr(self, name) if name in loaded else name in self.__dict__
+            for name in self.COHORT_FIELDS
+        )
+    
+    def _stored_cohort(self):
+        """The course/intake/semester stored for the student; read only if some were deferred"""
+        loaded = getattr(self, '_loaded_cohort', {})
+        if len(loaded) == len(self.COHORT_FIELDS):
+            return tuple(loaded[name] for name in self.COHORT_FIELDS)
+        return Student.objects.filter(pk=self.pk).values_list(*self.COHORT_FIELDS).first()
+    
     def save(self, *args, **kwargs):
         """Auto-generate student_id if not exists"""
+        is_new = self._state.adding
         if not self.student_id:
-            # Get the last student ID
-            from datetime import datetime
-            year = datetime.now().year
-            last_student = Student.objects.filter(
-                student_id__startswith=f'STU{year}'
-            ).order_by('student_id').last()
-            
-            if last_student:
-                # Extract the number and increment
-                last_number = int(last_student.student_id[-3:])
-                new_number = last_number + 1
-            else:
-                new_number = 1
+            from .student_ids import reserve_student_ids
+            self.student_id = reserve_student_ids(1)[0]
+        
+        if attach_thumbnail(self, 'photo', 'photo_thumbnail') and kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'photo_thumbnail'}
+        
+        previous_cohort = None
+        if not is_new and self._cohort_changed(kwargs.get('update_fields')):
+            previous_cohort = self._stored_cohort()
+        
+        with transaction.atomic():
+            super().save(*args, **kwargs)
             
-            self.student_id = f'STU{year}{new_number:03d}'
+            if is_new or previous_cohort:
+                cohort = tuple(getattr(self, name) for name in self.COHORT_FIELDS)
+                if is_new or previous_cohort != cohort:
+                    from payments.ledger import refresh_student_ledger
+                    refresh_student_ledger(self.pk)
+                if previous_cohort and previous_cohort != cohort:
+                    from payments.rollups import move_payment_rollups
+                    move_payment_rollups([self.pk], previous_cohort, cohort)
+                self._loaded_cohort = dict(zip(self.COHORT_FIELDS, cohort))
         
-        super().save(*args, **kwargs)
+        from .search import index_student
+        index_student(self, kwargs.get('update_fields'))
+
+
+class StudentIdSequence(models.Model):
+    """
+    Last student ID number handed out per admission year.
+    Allocation goes through accounts.student_ids, which locks the year's row
+    so concurrent admissions never receive the same number.
+    """
+    
+    year = models.PositiveIntegerField(
+        unique=True,
+        help_text='Admission year the sequence belongs to'
+    )
+    
+    last_number = models.PositiveIntegerField(
+        default=0,
+        help_text='Highest number already allocated for the year'
+    )
+    
+    class Meta:
+        ordering = ['-year']
+        verbose_name = 'Student ID Sequence'
+        verbose_name_plural = 'Student ID Sequences'
+    
+    def __str__(self):
+        return f"STU{self.year}: {self.last_number}"
+
+
+class StudentSearchIndex(models.Model):
+    """
+    Normalised search document for one student.
+    Maintained by accounts.search and indexed with pg_trgm (PostgreSQL) or an
+    FTS5 shadow table (SQLite) so name/ID/phone lookups avoid table scans.
+    """
+    
+    student = models.OneToOneField(
+        'Student',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_index',
+        help_text='Student the document describes'
+    )
+    
+    document = models.TextField(
+        blank=True,
+        default='',
+        help_text='Lower-cased name, ID, registration, phone and guardian tokens'
+    )
+    
+    class Meta:
+        verbose_name = 'Student Search Index'
+        verbose_name_plural = 'Student Search Index'
+    
+    def __str__(self):
+        return f"Search index for student {self.student_id}"
+
+
+class CohortPromotion(models.Model):
+    """
+    One bulk semester promotion of a course/intake.
+    The students' prior cohort is kept in CohortPromotionEntry for auditing.
+    """
+    
+    course = models.CharField(
+        max_length=10,
+        choices=Student.COURSE_CHOICES,
+        help_text='Course of the promoted cohort'
+    )
+    
+    intake = models.CharField(
+        max_length=10,
+        choices=Student.INTAKE_CHOICES,
+        help_text='Intake of the promoted cohort'
+    )
+    
+    from_semester = models.CharField(
+        max_length=10,
+        choices=Student.SEMESTER_CHOICES,
+        help_text='Semester the cohort was promoted from'
+    )
+    
+    to_semester = models.CharField(
+        max_length=10,
+        choices=Student.SEMESTER_CHOICES,
+        help_text='Semester the cohort was promoted to'
+    )
+    
+    to_session = models.CharField(
+        max_length=50,
+        blank=True,
+        default='',
+        help_text='Session assigned with the promotion (blank = unchanged)'
+    )
+    
+    promoted_count = models.PositiveIntegerField(
+        default=0,
+        help_text='Students moved to the new semester'
+    )
+    
+    held_back_count = models.PositiveIntegerField(
+        default=0,
+        help_text='Students excluded from the promotion'
+    )
+    
+    promoted_by = models.ForeignKey(
+        'User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='cohort_promotions',
+        help_text='User who ran the promotion'
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Cohort Promotion'
+        verbose_name_plural = 'Cohort Promotions'
+        indexes = [
+            models.Index(fields=['course', 'intake']),
+        ]
+    
+    def __str__(self):
+        return f"{self.course} {self.intake}: {self.from_semester} -> {self.to_semester}"
+
+
+class CohortPromotionEntry(models.Model):
+    """
+    Snapshot of one student's cohort taken by a promotion
+    """
+    
+    promotion = models.ForeignKey(
+        CohortPromotion,
+        on_delete=models.CASCADE,
+        related_name='entries',
+        help_text='Promotion that took the snapshot'
+    )
+    
+    student = models.ForeignKey(
+        'Student',
+        on_delete=models.CASCADE,
+        related_name='promotion_history',
+        help_text='Student in the cohort'
+    )
+    
+    previous_semester = models.CharField(
+        max_length=10,
+        help_text='Semester before the promotion'
+    )
+    
+    previous_session = models.CharField(
+        max_length=50,
+        blank=True,
+        default='',
+        help_text='Session before the promotion'
+    )
+    
+    held_back = models.BooleanField(
+        default=False,
+        help_text='Whether the student was excluded and stayed in the previous semester'
+    )
+    
+    class Meta:
+        ordering = ['promotion', 'student']
+        verbose_name = 'Cohort Promotion Entry'
+        verbose_name_plural = 'Cohort Promotion Entries'
+        unique_together = ['promotion', 'student']
+    
+    def __str__(self):
+        status = 'held back' if self.held_back else 'promoted'
+        return f"{self.student_id} {status} from {self.previous_semester}"
+
+
+class CohortArchive(models.Model):
+    """
+    A course/intake whose results, attendance and payments were moved to the
+    archive tables. Student and user rows stay in place, so logins, ledgers
+    and transcripts keep working; the moved history is read-only until the
+    cohort is restored.
+    """
+    
+    STATUS_CHOICES = [
+        ('archiving', 'Archiving'),
+        ('archived', 'Archived'),
+        ('restoring', 'Restoring'),
+        ('restored', 'Restored'),
+    ]
+    
+    course = models.CharField(
+        max_length=10,
+        choices=Student.COURSE_CHOICES,
+        help_text='Course of the archived cohort'
+    )
+    
+    intake = models.CharField(
+        max_length=10,
+        choices=Student.INTAKE_CHOICES,
+        help_text='Intake of the archived cohort'
+    )
+    
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='archiving',
+        help_text='Archiving/restoring run in batches; an interrupted run resumes from here'
+    )
+    
+    student_count = models.PositiveIntegerField(
+        default=0,
+        help_text='Students in the cohort when it was archived'
+    )
+    
+    result_count = models.PositiveIntegerField(
+        default=0,
+        help_text='Result rows moved to the archive'
+    )
+    
+    attendance_count = models.PositiveIntegerField(
+        default=0,
+        help_text='Attendance rows moved to the archive'
+    )
+    
+    payment_count = models.PositiveIntegerField(
+        default=0,
+        help_text='Payment rows moved to the archive'
+    )
+    
+    archived_by = models.ForeignKey(
+        'User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='cohort_archives',
+        help_text='User who archived the cohort'
+    )
+    
+    restored_by = models.ForeignKey(
+        'User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='cohort_restores',
+        help_text='User who restored the cohort'
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    archived_at = models.DateTimeField(null=True, blank=True)
+    restored_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Cohort Archive'
+        verbose_name_plural = 'Cohort Archives'
+        constraints = [
+            # A cohort has at most one archive that is not restored
+            models.UniqueConstraint(
+                fields=['course', 'intake'],
+                condition=~models.Q(status='restored'),
+                name='unique_open_cohort_archive'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.course} {self.intake} ({self.status})"
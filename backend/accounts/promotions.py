@@ -0,0 +1,114 @@
+"""
+Bulk semester promotion.
+Moves a whole course/intake to its next semester with one UPDATE, records
+the prior cohort of every member for auditing, and brings the ledgers,
+financial rollups and cached summaries keyed by cohort back in step.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from payments.ledger import refresh_cohort_charges
+from payments.rollups import move_payment_rollups
+from .models import Student, CohortPromotion, CohortPromotionEntry
+from .summary import summary_cache_key
+
+SEMESTERS = [code for code, _ in Student.SEMESTER_CHOICES]
+
+
+class PromotionError(ValueError):
+    """Raised when a promotion request cannot be carried out"""
+
+
+def next_semester(semester):
+    """The semester after the given one, or None after the last"""
+    try:
+        index = SEMESTERS.index(semester)
+    except ValueError:
+        return None
+    return SEMESTERS[index + 1] if index + 1 < len(SEMESTERS) else None
+
+
+def promote_cohort(course, intake, from_semester, to_semester=None, exclude=(),
+                   session=None, promoted_by=None):
+    """
+    Promote every student of a course/intake/semester in one transaction
+
+    Students listed in exclude stay where they are but are still recorded in
+    the snapshot, flagged as held back.
+
+    Args:
+        course: Course code
+        intake: Intake number
+        from_semester: Semester the cohort is in now
+        to_semester: Target semester (default: the next one)
+        exclude: Student ids (pk) held back
+        session: New session for the promoted students (optional)
+        promoted_by: User running the promotion (optional)
+
+    Returns:
+        The CohortPromotion record
+    """
+    if from_semester not in SEMESTERS or (to_semester and to_semester not in SEMESTERS):
+        raise PromotionError('Invalid semester')
+    to_semester = to_semester or next_semester(from_semester)
+    if to_semester is None:
+        raise PromotionError(f'{from_semester} is the last semester; give to_semester explicitly')
+    if to_semester == from_semester:
+        raise PromotionError('Target semester must differ from the current semester')
+
+    exclude = {int(student_id) for student_id in exclude}
+    cohort = Student.objects.filter(course=course, intake=intake, semester=from_semester)
+
+    with transaction.atomic():
+        # Lock the cohort so edits made meanwhile cannot slip past the snapshot
+        members = list(cohort.select_for_update().order_by('id').values_list('id', 'session'))
+        if not members:
+            raise PromotionError('No students found in this course/intake/semester')
+
+        member_ids = {student_id for student_id, _ in members}
+        unknown = exclude - member_ids
+        if unknown:
+            raise PromotionError(
+                f"Excluded students are not in this cohort: {', '.join(map(str, sorted(unknown)))}"
+            )
+        promoted_ids = member_ids - exclude
+
+        promotion = CohortPromotion.objects.create(
+            course=course,
+            intake=intake,
+            from_semester=from_semester,
+            to_semester=to_semester,
+            to_session=session or '',
+            promoted_count=len(promoted_ids),
+            held_back_count=len(exclude),
+            promoted_by=promoted_by
+        )
+        CohortPromotionEntry.objects.bulk_create([
+            CohortPromotionEntry(
+                promotion=promotion,
+                student_id=student_id,
+                previous_semester=from_semester,
+                previous_session=previous_session or '',
+                held_back=student_id in exclude
+            )
+            for student_id, previous_session in members
+        ], batch_size=1000)
+
+        changes = {'semester': to_semester, 'updated_at': timezone.now()}
+        if session:
+            changes['session'] = session
+        cohort.exclude(id__in=exclude).update(**changes)
+
+        # The UPDATE skips Student.save: re-price the target cohort's ledgers in one
+        # UPDATE and re-key the promoted students' payments in the daily rollup
+        if promoted_ids:
+            refresh_cohort_charges(course, intake, to_semester)
+            move_payment_rollups(
+                promotion.entries.filter(held_back=False).values('student_id'),
+                (course, intake, from_semester),
+                (course, intake, to_semester)
+            )
+
+    cache.delete_many([summary_cache_key(student_id) for student_id in promoted_ids])
+    return promotion
@@ -0,0 +1,194 @@
+"""
+Student search index.
+Keeps one normalised document per student in StudentSearchIndex and queries
+it through the database's own text index: a pg_trgm GIN index on PostgreSQL
+(fuzzy, typo tolerant) and an FTS5 shadow table on SQLite (prefix matching).
+Ranking and the top-N cut both happen in the database.
+"""
+import re
+
+from django.db import connection
+
+from .models import Student, StudentSearchIndex
+
+# Created by migration 0012 on SQLite, kept in sync by triggers on the index table
+FTS_TABLE = 'accounts_studentsearch_fts'
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+# Letters and digits only; punctuation, spaces and underscores separate tokens
+TOKEN_PATTERN = re.compile(r'[^\W_]+')
+
+# Fields that feed the document; saves touching none of them skip re-indexing
+STUDENT_SEARCH_FIELDS = {
+    'full_name', 'student_id', 'registration_number', 'guardian_name', 'guardian_phone', 'user'
+}
+USER_SEARCH_FIELDS = {'username', 'first_name', 'last_name', 'phone_number'}
+
+INDEX_COLUMNS = (
+    'id', 'full_name', 'student_id', 'registration_number', 'guardian_name', 'guardian_phone',
+    'user__username', 'user__first_name', 'user__last_name', 'user__phone_number',
+)
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(str(text or '').lower())
+
+
+def phone_variants(phone):
+    """Digits of a phone number, plus its local form when stored with the +880 prefix"""
+    digits = re.sub(r'\D', '', phone or '')
+    if not digits:
+        return []
+    if digits.startswith('880') and len(digits) > 10:
+        return [digits, digits[2:]]
+    return [digits]
+
+
+def build_document(student, user):
+    """
+    Build the search document for a student
+
+    Args:
+        student: Student instance
+        user: The student's User
+
+    Returns:
+        Space separated, de-duplicated lower-case tokens
+    """
+    parts = [
+        student.full_name, user.first_name, user.last_name, user.username,
+        student.student_id, student.registration_number, student.guardian_name,
+        *phone_variants(user.phone_number), *phone_variants(student.guardian_phone),
+    ]
+    tokens = [token for part in parts for token in tokenize(part)]
+    return ' '.join(dict.fromkeys(tokens))
+
+
+def _upsert(entries, batch_size=1000):
+    StudentSearchIndex.objects.bulk_create(
+        entries,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['student'],
+        update_fields=['document']
+    )
+
+
+def index_student(student, update_fields=None):
+    """Refresh one student's document after a save (one upsert query)"""
+    if update_fields is not None and not STUDENT_SEARCH_FIELDS & set(update_fields):
+        return
+    _upsert([StudentSearchIndex(student_id=student.pk, document=build_document(student, student.user))])
+
+
+def index_user(user, update_fields=None):
+    """Refresh the document of the student linked to a user whose name or phone changed"""
+    if user.role != 'STUDENT':
+        return
+    if update_fields is not None and not USER_SEARCH_FIELDS & set(update_fields):
+        return
+    index_students(Student.objects.filter(user_id=user.pk))
+
+
+def index_students(students=None, batch_size=1000):
+    """
+    (Re)build search documents in batches
+
+    Args:
+        students: Student queryset to index (default: every student)
+        batch_size: Documents per upsert
+
+    Returns:
+        Number of documents written
+    """
+    if students is None:
+        students = Student.objects.all()
+    students = students.select_related('user').only(*INDEX_COLUMNS).order_by()
+
+    count = 0
+    batch = []
+    for student in students.iterator(chunk_size=batch_size):
+        batch.append(StudentSearchIndex(student_id=student.pk, document=build_document(student, student.user)))
+        if len(batch) >= batch_size:
+            _upsert(batch, batch_size)
+            count += len(batch)
+            batch = []
+    if batch:
+        _upsert(batch, batch_size)
+        count += len(batch)
+    return count
+
+
+def fts_available():
+    return connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+
+
+def rebuild_search_index(batch_size=1000):
+    """
+    Rewrite every document.
+    On SQLite the FTS5 table is first re-read from the index table, so the
+    triggers start from a consistent state even if it had drifted.
+    """
+    if fts_available():
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return index_students(batch_size=batch_size)
+
+
+def _search_postgresql(tokens, limit):
+    """Trigram search: substring matches first, then typo-tolerant word similarity"""
+    table = connection.ops.quote_name(StudentSearchIndex._meta.db_table)
+    like = ' AND '.join(['document LIKE %s'] * len(tokens))
+    patterns = [f'%{token}%' for token in tokens]
+    text = ' '.join(tokens)
+    sql = (
+        f"SELECT student_id FROM {table} "
+        f"WHERE ({like}) OR %s <%% document "
+        f"ORDER BY ({like}) DESC, word_similarity(%s, document) DESC, student_id "
+        f"LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*patterns, text, *patterns, text, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _search_sqlite(tokens, limit):
+    """FTS5 search: every token must prefix-match a word, ranked by bm25"""
+    match = ' '.join(f'"{token}"*' for token in tokens)
+    sql = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s"
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _search_plain(tokens, limit):
+    """Unranked substring search on the document column, for other databases"""
+    entries = StudentSearchIndex.objects.all()
+    for token in tokens:
+        entries = entries.filter(document__contains=token)
+    return list(entries.order_by('student_id').values_list('student_id', flat=True)[:limit])
+
+
+def search_students(query, limit=DEFAULT_SEARCH_LIMIT):
+    """
+    Find students by name, student ID, registration number, phone or guardian
+
+    Args:
+        query: Free text typed by the user
+        limit: Maximum number of results
+
+    Returns:
+        List of Student ids, best match first
+    """
+    tokens = list(dict.fromkeys(tokenize(query)))
+    if not tokens:
+        return []
+    limit = max(1, min(int(limit), MAX_SEARCH_LIMIT))
+
+    if connection.vendor == 'postgresql':
+        return _search_postgresql(tokens, limit)
+    if fts_available():
+        return _search_sqlite(tokens, limit)
+    return _search_plain(tokens, limit)
@@ -1,7 +1,80 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
-from .models import User, Student
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from .authentication import VERSION_CLAIM, current_token_version, token_for_user
+from .models import User, Student, CohortPromotion, CohortArchive
+
+
+def model_columns(serializer, fields, prefix=''):
+    """
+    Map a serializer's fields (name -> field) to the model columns (ORM paths) they read.
+    Nested serializers contribute their own columns under the relation prefix;
+    computed fields declare theirs in the serializer's `sparse_sources`.
+    """
+    concrete = {f.name for f in serializer.Meta.model._meta.concrete_fields}
+    sources = getattr(serializer, 'sparse_sources', {})
+    columns = set()
+    for name, field in fields.items():
+        if name in sources:
+            columns.update(prefix + column for column in sources[name])
+        elif isinstance(field, serializers.BaseSerializer):
+            columns.add(prefix + field.source)
+            columns |= model_columns(field, field.fields, f'{prefix}{field.source}__')
+        else:
+            path = field.source.replace('.', '__')
+            head = path.split('__')[0]
+            if head in concrete:
+                columns.add(prefix + head)
+                columns.add(prefix + path)
+    return columns
+
+
+class SparseFieldsetMixin:
+    """
+    Lets clients pick fields with ?fields=a,b or drop them with ?omit=a,b.
+    Only applies to the top-level serializer of a request, never to nested ones,
+    and exposes the matching .only() so unused columns are never loaded.
+    """
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        
+        request = self.context.get('request')
+        is_root = self.root is self or (
+            isinstance(self.parent, serializers.ListSerializer) and self.parent.parent is None
+        )
+        if request is None or not is_root:
+            return fields
+        
+        requested = request.query_params.get('fields')
+        omitted = request.query_params.get('omit')
+        if requested:
+            keep = {name.strip() for name in requested.split(',')} | {'id'}
+            drop = set(fields) - keep
+        elif omitted:
+            drop = {name.strip() for name in omitted.split(',')} - {'id'}
+        else:
+            drop = set()
+        
+        for name in drop & set(fields):
+            fields.pop(name)
+        return fields
+    
+    def optimize_queryset(self, queryset):
+        """
+        Restrict the queryset to the columns the selected fields read.
+        Both ?fields= and ?omit= end up as .only() of the kept fields' columns,
+        which never loads more than deferring the omitted ones would.
+        """
+        kept = model_columns(self, self.fields)
+        related = {column.split('__')[0] for column in kept if '__' in column}
+        queryset = queryset.select_related(None)
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*kept)
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -9,13 +82,14 @@ class UserSerializer(serializers.ModelSerializer):
     Serializer for User model - Read only for most fields
     """
     full_name = serializers.SerializerMethodField()
+    sparse_sources = {'full_name': ['first_name', 'last_name', 'username']}
     
     class Meta:
         model = User
         fields = [
             'id', 'username', 'email', 'first_name', 'last_name',
             'full_name', 'role', 'phone_number', 'address',
-            'profile_picture', 'is_active', 'date_joined'
+            'profile_picture', 'profile_picture_thumbnail', 'is_active', 'date_joined'
         ]
         read_only_fields = ['id', 'date_joined']
     
@@ -23,6 +97,25 @@ class UserSerializer(serializers.ModelSerializer):
         return obj.get_full_name()
 
 
+class UserSummarySerializer(serializers.ModelSerializer):
+    """
+    Compact user representation for student listings
+    """
+    full_name = serializers.SerializerMethodField()
+    sparse_sources = {'full_name': ['first_name', 'last_name', 'username']}
+    
+    class Meta:
+        model = User
+        fields = [
+            'id', 'username', 'email', 'first_name', 'last_name',
+            'full_name', 'phone_number', 'is_active'
+        ]
+        read_only_fields = fields
+    
+    def get_full_name(self, obj):
+        return obj.get_full_name()
+
+
 class UserCreateSerializer(serializers.ModelSerializer):
     """
     Serializer for creating new users with password
@@ -66,7 +159,7 @@ class UserCreateSerializer(serializers.ModelSerializer):
         return user
 
 
-class StudentSerializer(serializers.ModelSerializer):
+class StudentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer for Student model with nested user data
     """
@@ -87,7 +180,7 @@ class StudentSerializer(serializers.ModelSerializer):
             'father_name', 'father_phone', 'mother_name', 'mother_phone',
             # Academic info
             'admission_date', 'session', 'semester',
-            'photo', 'blood_group',
+            'photo', 'photo_thumbnail', 'blood_group',
             # Structured present address
             'present_address', 'present_house_no', 'present_road_vill',
             'present_police_station', 'present_post_office',
@@ -108,6 +201,23 @@ class StudentSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'student_id', 'created_at', 'updated_at']
 
 
+class StudentListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    Compact Student serializer used by list views and pickers
+    """
+    user = UserSummarySerializer(read_only=True)
+    major_name = serializers.CharField(source='major.name', read_only=True, allow_null=True)
+    
+    class Meta:
+        model = Student
+        fields = [
+            'id', 'user', 'student_id', 'full_name',
+            'course', 'intake', 'semester', 'session',
+            'major', 'major_name', 'photo', 'photo_thumbnail'
+        ]
+        read_only_fields = fields
+
+
 class StudentCreateSerializer(serializers.ModelSerializer):
     """
     Serializer for creating students with user account
@@ -351,7 +461,79 @@ class ChangePasswordSerializer(serializers.Serializer):
         return value
 
 
+class CohortPromotionSerializer(serializers.ModelSerializer):
+    """
+    Read-only record of a bulk semester promotion
+    """
+    promoted_by_name = serializers.CharField(
+        source='promoted_by.get_full_name',
+        read_only=True,
+        allow_null=True
+    )
+    held_back = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = CohortPromotion
+        fields = [
+            'id', 'course', 'intake', 'from_semester', 'to_semester', 'to_session',
+            'promoted_count', 'held_back_count', 'held_back',
+            'promoted_by', 'promoted_by_name', 'created_at'
+        ]
+        read_only_fields = fields
+    
+    def get_held_back(self, obj):
+        """Student ids excluded from the promotion (prefetched as held_back_entries in lists)"""
+        entries = getattr(obj, 'held_back_entries', None)
+        if entries is None:
+            entries = obj.entries.filter(held_back=True)
+        return [entry.student_id for entry in entries]
+
+
+class CohortArchiveSerializer(serializers.ModelSerializer):
+    """
+    Read-only record of an archived (or restored) cohort
+    """
+    archived_by_name = serializers.CharField(
+        source='archived_by.get_full_name',
+        read_only=True,
+        allow_null=True
+    )
+    restored_by_name = serializers.CharField(
+        source='restored_by.get_full_name',
+        read_only=True,
+        allow_null=True
+    )
+    
+    class Meta:
+        model = CohortArchive
+        fields = [
+            'id', 'course', 'intake', 'status',
+            'student_count', 'result_count', 'attendance_count', 'payment_count',
+            'archived_by', 'archived_by_name', 'restored_by', 'restored_by_name',
+            'created_at', 'archived_at', 'restored_at'
+        ]
+        read_only_fields = fields
 
 
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    /api/token/ issues the same claim-carrying tokens as the login endpoint
+    """
+    
+    @classmethod
+    def get_token(cls, user):
+        return token_for_user(user)
 
 
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refuses refresh tokens issued before the user's tokens were revoked
+    """
+    
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if VERSION_CLAIM in refresh and (
+            current_token_version(refresh[jwt_settings.USER_ID_CLAIM]) != refresh[VERSION_CLAIM]
+        ):
+            raise InvalidToken('Token has been revoked')
+        return super().validate(attrs)
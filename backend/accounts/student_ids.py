@@ -0,0 +1,66 @@
+"""
+Student ID allocation.
+IDs look like STU{year}{number}, with the number zero-padded to at least
+three digits. Numbers come from a per-year StudentIdSequence row, so any
+number of ids can be reserved atomically in one locked UPDATE.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Student, StudentIdSequence
+
+PREFIX = 'STU'
+
+
+def format_student_id(year, number):
+    return f'{PREFIX}{year}{number:03d}'
+
+
+def highest_issued_number(year):
+    """Largest number already used by a student ID of this year"""
+    prefix = f'{PREFIX}{year}'
+    numbers = [
+        int(student_id[len(prefix):])
+        for student_id in Student.objects.filter(student_id__startswith=prefix).values_list(
+            'student_id', flat=True
+        ).iterator()
+        if student_id[len(prefix):].isdigit()
+    ]
+    return max(numbers, default=0)
+
+
+def reserve_student_ids(count=1, year=None):
+    """
+    Reserve a contiguous block of student IDs
+
+    The UPDATE that bumps the year's counter takes the row lock (as SELECT FOR
+    UPDATE would) and holds it until the surrounding transaction ends, so
+    concurrent callers are serialised and never receive overlapping blocks.
+    The first reservation of a year creates its row, starting after any ids
+    already issued that year.
+
+    Args:
+        count: Number of ids to reserve
+        year: Admission year (defaults to the current year)
+
+    Returns:
+        List of `count` student IDs in ascending order
+    """
+    if count < 1:
+        return []
+    year = year or timezone.localdate().year
+
+    with transaction.atomic():
+        sequence = StudentIdSequence.objects.filter(year=year)
+        if not sequence.update(last_number=F('last_number') + count):
+            try:
+                with transaction.atomic():
+                    StudentIdSequence.objects.create(year=year, last_number=highest_issued_number(year))
+            except IntegrityError:
+                # Another allocator created the row first; its counter is just as good
+                pass
+            sequence.update(last_number=F('last_number') + count)
+        last_number = sequence.values_list('last_number', flat=True).get()
+
+    return [format_student_id(year, number) for number in range(last_number - count + 1, last_number + 1)]
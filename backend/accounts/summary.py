@@ -0,0 +1,212 @@
+"""
+Student 360 summary.
+Builds everything the student dashboard shows - header, fee totals and
+balance, latest results with GPA, attendance per subject - from a fixed set
+of aggregate queries, optionally cached per student for a short time.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Q, Sum
+
+from academics.models import ArchivedResult, Attendance, Exam, Result
+from academics.utils import calculate_gpa, calculate_overall_grade
+from payments.models import ArchivedPayment, Payment, StudentLedger
+from .serializers import StudentListSerializer
+
+EXAM_TYPE_LABELS = dict(Exam.EXAM_TYPE_CHOICES)
+
+
+def summary_cache_key(student_id):
+    return f"student_summary:{student_id}"
+
+
+def summary_cache_timeout():
+    """Seconds a summary may be served from cache; 0 disables caching"""
+    return getattr(settings, 'STUDENT_SUMMARY_CACHE_SECONDS', 0)
+
+
+def _payment_totals(model, student):
+    return model.objects.filter(student=student).aggregate(
+        count=Count('id'),
+        total_paid=Sum('amount_paid'),
+        total_discount=Sum('discount_amount'),
+        last_payment_date=Max('payment_date')
+    )
+
+
+def payment_summary(student):
+    """
+    Payment totals in one aggregate, balance from the student's ledger row.
+    Students of an archived cohort are totalled from the archive table.
+    """
+    totals = _payment_totals(Payment, student)
+    if not totals['count']:
+        totals = _payment_totals(ArchivedPayment, student)
+    try:
+        ledger = student.ledger
+    except StudentLedger.DoesNotExist:
+        ledger = None
+
+    return {
+        'payments_count': totals['count'],
+        'total_paid': totals['total_paid'] or 0,
+        'total_discount': totals['total_discount'] or 0,
+        'last_payment_date': totals['last_payment_date'],
+        'total_charges': ledger.total_charges if ledger else 0,
+        'total_credits': ledger.total_credits if ledger else 0,
+        'balance': ledger.balance if ledger else 0,
+    }
+
+
+def _overall(results):
+    possible = sum(result.subject.total_marks for result in results)
+    obtained = sum(float(result.marks_obtained) for result in results)
+    percentage = (obtained / possible * 100) if possible > 0 else 0
+    return {
+        'marks_obtained': obtained,
+        'total_marks': possible,
+        'percentage': round(percentage, 2),
+        'grade': calculate_overall_grade(percentage),
+        'gpa': calculate_gpa(percentage),
+    }
+
+
+def _latest_semester_results(model, student):
+    latest_semester = model.objects.filter(student=student).order_by(
+        '-exam__exam_date', '-id'
+    ).values('exam__semester')[:1]
+    return list(
+        model.objects.filter(student=student, exam__semester=latest_semester)
+        .select_related('subject', 'exam')
+        .order_by('-exam__exam_date', 'subject__name')
+    )
+
+
+def results_summary(student):
+    """
+    Results of the latest semester the student has results in (one query)
+
+    GPA and grade use the same scale as the report card. The headline figures
+    and the subject rows are for the most recent exam type; every exam type
+    of the semester gets its own totals.
+    """
+    results = _latest_semester_results(Result, student)
+    if not results:
+        # Archived cohorts keep their results in the archive table
+        results = [row.as_result() for row in _latest_semester_results(ArchivedResult, student)]
+    if not results:
+        return None
+
+    by_type = {}
+    for result in results:
+        by_type.setdefault(result.exam.exam_type, []).append(result)
+    latest_type = results[0].exam.exam_type
+    latest = sorted(by_type[latest_type], key=lambda result: result.subject.name)
+
+    return {
+        'semester': results[0].exam.semester,
+        'exam_type': latest_type,
+        'exam_type_display': EXAM_TYPE_LABELS.get(latest_type, latest_type),
+        **_overall(latest),
+        'exam_types': [
+            {
+                'exam_type': exam_type,
+                'exam_type_display': EXAM_TYPE_LABELS.get(exam_type, exam_type),
+                'subjects': len(type_results),
+                **_overall(type_results),
+            }
+            for exam_type, type_results in by_type.items()
+        ],
+        'subjects': [
+            {
+                'subject_id': result.subject_id,
+                'subject_name': result.subject.name,
+                'subject_code': result.subject.code,
+                'exam_id': result.exam_id,
+                'exam_date': result.exam.exam_date,
+                'marks_obtained': result.marks_obtained,
+                'total_marks': result.subject.total_marks,
+                'percentage': round(float(result.get_percentage()), 2),
+                'grade': result.calculate_grade(),
+                'grade_point': result.get_grade_point(),
+            }
+            for result in latest
+        ],
+    }
+
+
+def attendance_summary(student):
+    """Attendance per subject for the student's current semester (one grouped query)"""
+    rows = Attendance.objects.filter(student=student, semester=student.semester).values(
+        'subject_id', 'subject__name', 'subject__code'
+    ).annotate(
+        total=Count('id'),
+        present=Count('id', filter=Q(status='present'))
+    ).order_by('subject__name')
+
+    subjects = []
+    total = present = 0
+    for row in rows:
+        total += row['total']
+        present += row['present']
+        subjects.append({
+            'subject_id': row['subject_id'],
+            'subject_name': row['subject__name'],
+            'subject_code': row['subject__code'],
+            'total_classes': row['total'],
+            'present': row['present'],
+            'absent': row['total'] - row['present'],
+            'attendance_percentage': round(row['present'] / row['total'] * 100, 2) if row['total'] else 0,
+        })
+
+    return {
+        'semester': student.semester,
+        'total_classes': total,
+        'present': present,
+        'attendance_percentage': round(present / total * 100, 2) if total else 0,
+        'subjects': subjects,
+    }
+
+
+def build_student_summary(student, context=None):
+    """
+    Build the 360 summary for a student
+
+    Args:
+        student: Student loaded with select_related('user', 'major', 'ledger')
+        context: Serializer context (for absolute photo URLs)
+
+    Returns:
+        Dict with student, payments, results and attendance sections
+    """
+    return {
+        'student': dict(StudentListSerializer(student, context=context or {}).data),
+        'payments': payment_summary(student),
+        'results': results_summary(student),
+        'attendance': attendance_summary(student),
+    }
+
+
+def get_student_summary(student, context=None, refresh=False):
+    """
+    Return the student's summary, served from cache when enabled
+
+    Args:
+        student: Student loaded with select_related('user', 'major', 'ledger')
+        context: Serializer context
+        refresh: Rebuild even if a cached copy exists
+
+    Returns:
+        Tuple of (summary dict, whether it came from cache)
+    """
+    timeout = summary_cache_timeout()
+    key = summary_cache_key(student.pk)
+    if timeout and not refresh:
+        summary = cache.get(key)
+        if summary is not None:
+            return summary, True
+
+    summary = build_student_summary(student, context)
+    if timeout:
+        cache.set(key, summary, timeout)
+    return summary, False
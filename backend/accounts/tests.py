@@ -1,3 +1,594 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+import threading
+from datetime import date
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, models
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from academics.models import Attendance, AttendanceSyncOperation, Exam, Result, Subject
+from payments.ledger import reconcile_ledgers
+from payments.models import FeeStructure, Payment, StudentLedger
+from .archive import ArchiveError, archive_cohort, restore_cohort
+from .deletion import StudentDeletionError, _on_delete, delete_students
+from .models import User, Student, StudentIdSequence, StudentSearchIndex
+from .promotions import PromotionError, promote_cohort
+from .search import search_students
+from .thumbnails import THUMBNAIL_SIZE
+from .student_ids import reserve_student_ids
+
+
+class StudentIdAllocatorTests(TestCase):
+    """
+    Sequence behaviour of the student ID allocator
+    """
+
+    def test_reserves_contiguous_blocks(self):
+        first = reserve_student_ids(3, year=2030)
+        second = reserve_student_ids(2, year=2030)
+
+        self.assertEqual(first, ['STU2030001', 'STU2030002', 'STU2030003'])
+        self.assertEqual(second, ['STU2030004', 'STU2030005'])
+
+    def test_numbers_past_999_keep_counting(self):
+        StudentIdSequence.objects.create(year=2030, last_number=998)
+
+        self.assertEqual(reserve_student_ids(3, year=2030), ['STU2030999', 'STU20301000', 'STU20301001'])
+
+    def test_new_year_starts_after_existing_ids(self):
+        user = User.objects.create(username='legacy', role='STUDENT')
+        Student.objects.create(
+            user=user, student_id='STU2031041',
+            date_of_birth=date(2003, 1, 1), admission_date=date(2031, 1, 1)
+        )
+
+        self.assertEqual(reserve_student_ids(1, year=2031), ['STU2031042'])
+
+    def test_student_save_uses_allocator(self):
+        ids = []
+        for idx in range(2):
+            user = User.objects.create(username=f'student{idx}', role='STUDENT')
+            ids.append(Student.objects.create(
+                user=user, date_of_birth=date(2003, 1, 1), admission_date=date(2024, 1, 1)
+            ).student_id)
+
+        self.assertEqual(len(set(ids)), 2)
+        self.assertEqual(int(ids[1][7:]), int(ids[0][7:]) + 1)
+
+
+class StudentSearchIndexTests(TestCase):
+    """
+    Search documents stay in sync with student and user edits
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(username='c2031007', first_name='Rahim', role='STUDENT')
+        self.student = Student.objects.create(
+            user=self.user, full_name='Rahim Uddin', guardian_name='Karim Uddin',
+            guardian_phone='+8801712345678', date_of_birth=date(2003, 1, 1), admission_date=date(2031, 1, 1)
+        )
+
+    def test_finds_student_by_name_id_and_phone(self):
+        for query in ('rahim', 'Uddin', 'karim', self.student.student_id, '01712345678'):
+            self.assertEqual(search_students(query), [self.student.id], query)
+        self.assertEqual(search_students('nobody'), [])
+
+    def test_user_edits_reindex_student(self):
+        self.user.first_name = 'Nusrat'
+        self.user.save()
+
+        self.assertIn('nusrat', StudentSearchIndex.objects.get(student=self.student).document)
+        self.assertEqual(search_students('nusrat'), [self.student.id])
+
+
+@override_settings(STUDENT_SUMMARY_CACHE_SECONDS=0)
+class StudentSummaryTests(TestCase):
+    """
+    The 360 summary endpoint
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(username='c2031008', role='STUDENT')
+        self.student = Student.objects.create(
+            user=self.user, date_of_birth=date(2003, 1, 1), admission_date=date(2031, 1, 1),
+            course='BBA', intake='15th', semester='1st'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_summary_sections(self):
+        response = self.client.get(f'/api/accounts/students/{self.student.id}/summary/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['student']['student_id'], self.student.student_id)
+        self.assertEqual(response.data['payments']['payments_count'], 0)
+        self.assertIsNone(response.data['results'])
+        self.assertEqual(response.data['attendance']['subjects'], [])
+
+    def test_students_cannot_read_other_summaries(self):
+        other = Student.objects.create(
+            user=User.objects.create(username='c2031009', role='STUDENT'),
+            date_of_birth=date(2003, 1, 1), admission_date=date(2031, 1, 1)
+        )
+
+        response = self.client.get(f'/api/accounts/students/{other.id}/summary/')
+
+        self.assertEqual(response.status_code, 403)
+
+
+class StudentListingTests(TestCase):
+    """
+    Compact rows, ?view=full and sparse fieldsets on the student list
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', role='ADMIN')
+        for idx in range(3):
+            Student.objects.create(
+                user=User.objects.create(username=f'c20310{idx}', role='STUDENT', first_name='Listed'),
+                date_of_birth=date(2003, 1, 1), admission_date=date(2031, 1, 1),
+                course='BBA', intake='15th', semester='1st', guardian_name='Guardian'
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def list_students(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/accounts/students/', params)
+        self.assertEqual(response.status_code, 200)
+        rows = response.data['results'] if isinstance(response.data, dict) else response.data
+        # Every column a row needs comes with the page query: no per-row loads
+        self.assertEqual(len(rows), 3)
+        self.assertLessEqual(len(queries), 2)
+        return rows, queries[-1]['sql']
+
+    def test_compact_rows_by_default(self):
+        rows, sql = self.list_students()
+
+        self.assertIn('major_name', rows[0])
+        self.assertEqual(rows[0]['user']['full_name'], 'Listed')
+        self.assertNotIn('admission_date', rows[0])
+        self.assertNotIn('guardian_name', sql)
+
+    def test_full_view(self):
+        rows, _ = self.list_students(view='full')
+
+        self.assertEqual(rows[0]['admission_date'], '2031-01-01')
+        self.assertEqual(rows[0]['guardian_name'], 'Guardian')
+
+    def test_fields_load_only_their_columns(self):
+        rows, sql = self.list_students(fields='student_id,admission_date')
+
+        self.assertEqual(set(rows[0]), {'id', 'student_id', 'admission_date'})
+        self.assertNotIn('guardian_name', sql)
+        self.assertNotIn(User._meta.db_table, sql)
+
+    def test_omit_drops_fields_and_joins(self):
+        rows, sql = self.list_students(omit='user,photo')
+
+        self.assertNotIn('user', rows[0])
+        self.assertNotIn('photo', rows[0])
+        self.assertIn('student_id', rows[0])
+        self.assertNotIn(User._meta.db_table, sql)
+
+
+class ThumbnailTests(TestCase):
+    """
+    Uploaded photos get a small thumbnail
+    """
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def test_photo_upload_creates_thumbnail(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (1200, 900), (30, 90, 160)).save(buffer, 'JPEG')
+        student = Student.objects.create(
+            user=User.objects.create(username='c2031010', role='STUDENT'),
+            date_of_birth=date(2003, 1, 1), admission_date=date(2031, 1, 1),
+            photo=SimpleUploadedFile('face.jpg', buffer.getvalue(), content_type='image/jpeg')
+        )
+
+        student.refresh_from_db()
+        self.assertTrue(student.photo_thumbnail.name.startswith('students/thumbnails/face'))
+        with Image.open(student.photo_thumbnail.path) as thumbnail:
+            self.assertEqual(thumbnail.size, THUMBNAIL_SIZE)
+
+        student.photo = None
+        student.save()
+        self.assertFalse(student.photo_thumbnail)
+
+
+class AdmissionImportTests(TestCase):
+    """
+    Roster uploads to the admissions import endpoint
+    """
+    url = '/api/accounts/students/import_admissions/'
+    header = 'username,full_name,date_of_birth,admission_date,course,intake,semester\n'
+
+    def setUp(self):
+        self.admin = User.objects.create(username='admin', role='ADMIN')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def upload(self, content, name='roster.csv', **data):
+        roster = SimpleUploadedFile(name, content, content_type='application/octet-stream')
+        return self.client.post(self.url, {'file': roster, **data}, format='multipart')
+
+    def roster(self, *usernames):
+        rows = ''.join(
+            f'{username},New Student,2003-01-01,2031-01-01,BBA,15th,1st\n' for username in usernames
+        )
+        return (self.header + rows).encode()
+
+    def test_creates_students(self):
+        response = self.upload(self.roster('c2031101', 'c2031102'), default_password='Adm1ssion-2031')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+        student = Student.objects.get(user__username='c2031101')
+        self.assertEqual(student.user.first_name, 'New')
+        self.assertTrue(student.user.check_password('Adm1ssion-2031'))
+
+    def test_dry_run_and_row_errors(self):
+        User.objects.create(username='c2031101', role='STUDENT')
+
+        response = self.upload(
+            self.roster('c2031101', 'c2031102'), default_password='Adm1ssion-2031', dry_run='true'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['status'] for row in response.data['rows']], ['error', 'valid'])
+        self.assertFalse(Student.objects.exists())
+
+    def test_only_admins_can_import(self):
+        self.client.force_authenticate(User.objects.create(username='teacher', role='TEACHER'))
+
+        response = self.upload(self.roster('c2031101'), default_password='Adm1ssion-2031')
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Student.objects.exists())
+
+    def test_unreadable_rosters_are_rejected(self):
+        latin1 = self.roster('c2031101') + 'c2031102,Jos\xe9,2003-01-01,2031-01-01,BBA,15th,1st\n'.encode('latin-1')
+        for content, name in ((latin1, 'roster.csv'), (b'', 'roster.csv'), (b'not a workbook', 'roster.xlsx')):
+            with self.subTest(name=name, content=content[:20]):
+                response = self.upload(content, name=name, default_password='Adm1ssion-2031')
+
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.data)
+        self.assertFalse(Student.objects.exists())
+
+
+class CohortPromotionTests(TestCase):
+    """
+    Bulk semester promotion
+    """
+
+    def setUp(self):
+        self.students = [
+            Student.objects.create(
+                user=User.objects.create(username=f'c20310{idx}', role='STUDENT'),
+                date_of_birth=date(2003, 1, 1), admission_date=date(2031, 1, 1),
+                course='BBA', intake='15th', semester='3rd'
+            )
+            for idx in range(3)
+        ]
+        FeeStructure.objects.create(
+            course='BBA', intake='15th', semester='4th', fee_type='tuition_fee',
+            amount=Decimal('900'), due_date=date(2031, 7, 1)
+        )
+
+    def test_promotes_cohort_except_held_back(self):
+        held_back = self.students[0]
+
+        promotion = promote_cohort('BBA', '15th', '3rd', exclude=[held_back.id])
+
+        self.assertEqual(promotion.to_semester, '4th')
+        self.assertEqual(promotion.promoted_count, 2)
+        self.assertEqual(
+            dict(Student.objects.values_list('id', 'semester')),
+            {held_back.id: '3rd', self.students[1].id: '4th', self.students[2].id: '4th'}
+        )
+        self.assertEqual(promotion.entries.filter(held_back=True).get().student, held_back)
+        self.assertEqual(StudentLedger.objects.get(student=self.students[1]).total_charges, Decimal('900'))
+        self.assertEqual(reconcile_ledgers(), [])
+
+    def test_rejects_students_outside_cohort(self):
+        with self.assertRaises(PromotionError):
+            promote_cohort('BBA', '15th', '3rd', exclude=[999999])
+        self.assertFalse(Student.objects.filter(semester='4th').exists())
+
+
+class CohortArchiveTests(TestCase):
+    """
+    Moving a graduated cohort to the archive tables and back
+    """
+
+    def setUp(self):
+        self.admin = User.objects.create(username='archive-admin', role='ADMIN')
+        self.student = Student.objects.create(
+            user=User.objects.create(username='a20320', role='STUDENT'),
+            date_of_birth=date(2003, 1, 1), admission_date=date(2032, 1, 1),
+            course='BBA', intake='15th', semester='8th'
+        )
+        subject = Subject.objects.create(name='Auditing', code='580801', course_code='BBA', semester='8th')
+        exam = Exam.objects.create(
+            name='Final', exam_type='final', subject=subject, course='BBA', semester='8th',
+            exam_date=date(2032, 6, 1), total_marks=100
+        )
+        Result.objects.create(student=self.student, exam=exam, subject=subject, marks_obtained=Decimal('72'))
+        self.sync_operation = AttendanceSyncOperation.objects.create(
+            idempotency_key='archive-sync-1', outcome='created', client_timestamp=timezone.now(),
+            attendance=Attendance.objects.create(
+                student=self.student, date=date(2032, 2, 1), subject=subject,
+                course='BBA', intake='15th', semester='8th'
+            )
+        )
+        FeeStructure.objects.create(
+            course='BBA', intake='15th', semester='8th', fee_type='tuition_fee',
+            amount=Decimal('900'), due_date=date(2032, 1, 10)
+        )
+        Payment.objects.create(student=self.student, amount_paid=Decimal('600'), payment_date=date(2032, 1, 5))
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_archived_transcript_and_balance_survive(self):
+        archive = archive_cohort('BBA', '15th')
+
+        self.assertEqual((archive.status, archive.result_count, archive.payment_count), ('archived', 1, 1))
+        self.assertFalse(Result.objects.exists())
+        self.assertEqual(StudentLedger.objects.get(student=self.student).balance, Decimal('300'))
+        self.assertEqual(reconcile_ledgers(), [])
+
+        response = self.client.get('/api/academics/results/student_results/', {'student_id': self.student.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['marks_obtained'], '72.00')
+
+        with self.assertRaises(ArchiveError):
+            archive_cohort('BBA', '15th')
+
+    def test_restore_moves_rows_back(self):
+        archive_cohort('BBA', '15th')
+        archive = restore_cohort('BBA', '15th')
+
+        self.assertEqual(archive.status, 'restored')
+        self.assertEqual(Result.objects.get(student=self.student).marks_obtained, Decimal('72'))
+        self.assertEqual(Payment.objects.filter(student=self.student).count(), 1)
+        self.assertEqual(reconcile_ledgers(), [])
+
+    def test_sync_log_keeps_its_attendance_pointer(self):
+        attendance_id = self.sync_operation.attendance_id
+
+        archive_cohort('BBA', '15th')
+        self.sync_operation.refresh_from_db()
+        self.assertEqual(self.sync_operation.attendance_id, attendance_id)
+        self.assertFalse(Attendance.objects.exists())
+
+        restore_cohort('BBA', '15th')
+        self.sync_operation.refresh_from_db()
+        self.assertEqual(self.sync_operation.attendance.student, self.student)
+
+    def test_only_final_semester_cohorts_without_force(self):
+        Student.objects.create(
+            user=User.objects.create(username='a20321', role='STUDENT'),
+            date_of_birth=date(2003, 1, 1), admission_date=date(2032, 1, 1),
+            course='BBA', intake='15th', semester='7th'
+        )
+
+        response = self.client.post('/api/accounts/students/archive/', {'course': 'BBA', 'intake': '15th'})
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(Result.objects.exists())
+
+        response = self.client.post(
+            '/api/accounts/students/archive/', {'course': 'BBA', 'intake': '15th', 'force': 'true'}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(Result.objects.exists())
+
+    def test_semester_report_counts_archived_payers(self):
+        archive_cohort('BBA', '15th')
+
+        response = self.client.get('/api/reports/payments/semester_wise/', {'course': 'BBA'})
+
+        self.assertEqual(response.data['data'][0]['payment_count'], 1)
+        self.assertEqual(response.data['data'][0]['student_count'], 1)
+
+
+class StudentDeletionTests(TestCase):
+    """
+    Chunked raw deletion of students and everything hanging off them
+    """
+
+    def setUp(self):
+        subject = Subject.objects.create(name='Marketing', code='520201', course_code='BBA', semester='2nd')
+        self.students = []
+        for idx in range(2):
+            student = Student.objects.create(
+                user=User.objects.create(username=f'd20330{idx}', role='STUDENT'),
+                date_of_birth=date(2003, 1, 1), admission_date=date(2033, 1, 1),
+                course='BBA', intake='15th', semester='2nd'
+            )
+            Attendance.objects.bulk_create([
+                Attendance(
+                    student=student, subject=subject, date=date(2033, 2, day),
+                    course='BBA', intake='15th', semester='2nd'
+                )
+                for day in range(1, 8)
+            ])
+            Payment.objects.create(student=student, amount_paid=Decimal('100'), payment_date=date(2033, 2, 1))
+            self.students.append(student)
+
+    def test_dry_run_only_counts(self):
+        counts = delete_students([self.students[0].id], dry_run=True)
+
+        self.assertEqual(counts['academics.Attendance'], 7)
+        self.assertEqual(counts['payments.Payment'], 1)
+        self.assertEqual(counts['accounts.User'], 1)
+        self.assertEqual(Attendance.objects.count(), 14)
+
+    def test_deletes_students_in_chunks(self):
+        counts = delete_students([student.id for student in self.students], chunk_size=3)
+
+        self.assertEqual(counts['academics.Attendance'], 14)
+        self.assertFalse(Student.objects.exists())
+        self.assertFalse(User.objects.filter(role='STUDENT').exists())
+        self.assertFalse(Payment.objects.exists())
+        self.assertFalse(StudentLedger.objects.exists())
+
+    def test_unknown_students_delete_nothing(self):
+        with self.assertRaises(StudentDeletionError):
+            delete_students([self.students[0].id, 999999])
+        self.assertEqual(Student.objects.count(), 2)
+
+    def test_sync_log_pointers_are_cleared(self):
+        operation = AttendanceSyncOperation.objects.create(
+            idempotency_key='delete-sync-1', outcome='created', client_timestamp=timezone.now(),
+            attendance=Attendance.objects.filter(student=self.students[0]).first()
+        )
+
+        delete_students([self.students[0].id])
+
+        operation.refresh_from_db()
+        self.assertIsNone(operation.attendance_id)
+
+    def test_on_delete_handling(self):
+        def relation(on_delete, db_constraint=True):
+            field = mock.Mock(db_constraint=db_constraint, get_default=mock.Mock(return_value=7))
+            field.remote_field.on_delete = on_delete
+            return mock.Mock(field=field)
+
+        self.assertEqual(_on_delete(relation(models.SET_DEFAULT)), ('set', 7))
+        self.assertEqual(_on_delete(relation(models.SET(lambda: 3))), ('set', 3))
+        self.assertEqual(_on_delete(relation(models.DO_NOTHING)), ('check', None))
+        self.assertEqual(_on_delete(relation(models.DO_NOTHING, db_constraint=False)), ('ignore', None))
+        with self.assertRaises(StudentDeletionError):
+            _on_delete(relation(lambda collector, field, sub_objs, using: None))
+
+    def test_only_admins_can_delete(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username='teacher', role='TEACHER'))
+
+        response = client.delete(f'/api/accounts/students/{self.students[0].id}/')
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Student.objects.count(), 2)
+
+
+class ClaimsAuthenticationTests(TestCase):
+    """
+    Requests authenticated from token claims, and token revocation
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='t20340', role='STUDENT')
+        self.user.set_password('Claims!2034')
+        self.user.save()
+        self.student = Student.objects.create(
+            user=self.user, date_of_birth=date(2003, 1, 1), admission_date=date(2034, 1, 1),
+            course='BBA', intake='15th', semester='1st'
+        )
+        Attendance.objects.create(
+            student=self.student, date=date(2034, 2, 1),
+            subject=Subject.objects.create(name='Economics', code='510203', course_code='BBA', semester='1st'),
+            course='BBA', intake='15th', semester='1st'
+        )
+        self.client = APIClient()
+        response = self.client.post('/api/accounts/auth/login/', {
+            'username': 't20340', 'password': 'Claims!2034'
+        }, format='json')
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def test_student_request_needs_no_user_lookup(self):
+        self.client.get('/api/academics/attendance/student_attendance/')
+
+        # Only the attendance aggregate and records; user and profile come from the token
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/academics/attendance/student_attendance/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['student_id'], self.student.id)
+
+    def test_revoked_tokens_are_rejected(self):
+        self.user.revoke_tokens()
+
+        response = self.client.get('/api/academics/attendance/student_attendance/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_credential_changes_are_detected_without_rereading(self):
+        user = User.objects.get(pk=self.user.pk)
+        with CaptureQueriesContext(connection) as queries:
+            user.first_name = 'Renamed'
+            user.save()
+        self.assertFalse([q['sql'] for q in queries if q['sql'].startswith('SELECT') and 'password' in q['sql']])
+        self.assertEqual(User.objects.get(pk=user.pk).token_version, self.user.token_version)
+
+        user.set_password('Changed!2034')
+        user.save()
+        user.save()
+        self.assertEqual(User.objects.get(pk=user.pk).token_version, self.user.token_version + 1)
+
+        response = self.client.get('/api/academics/attendance/student_attendance/')
+        self.assertEqual(response.status_code, 401)
+
+
+class StudentIdAllocatorConcurrencyTests(TransactionTestCase):
+    """
+    Many threads reserving ids at once must never receive the same id
+    """
+
+    THREADS = 8
+    ROUNDS = 25
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('shared-cache in-memory SQLite raises on table locks instead of waiting')
+
+    def test_concurrent_reservations_do_not_overlap(self):
+        reserved = []
+        errors = []
+        lock = threading.Lock()
+        start = threading.Barrier(self.THREADS)
+
+        def worker(block_size):
+            try:
+                start.wait()
+                for _ in range(self.ROUNDS):
+                    ids = reserve_student_ids(block_size, year=2040)
+                    with lock:
+                        reserved.extend(ids)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=worker, args=(1 + idx % 3,))
+            for idx in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        expected = sum(self.ROUNDS * (1 + idx % 3) for idx in range(self.THREADS))
+        self.assertEqual(len(reserved), expected)
+        self.assertEqual(len(set(reserved)), expected)
+        self.assertEqual(StudentIdSequence.objects.get(year=2040).last_number, expected)
@@ -0,0 +1,172 @@
+"""
+Image thumbnails.
+Renders fixed-size thumbnails of student photos and profile pictures with
+Pillow and stores them beside the originals, so rosters and listings send a
+few kilobytes per face instead of the uploaded phone photo.
+"""
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import django
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.db import connections
+from django.db.models import Q
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZE = (160, 160)
+THUMBNAIL_QUALITY = 80
+
+# WebP is about a third smaller than JPEG at the same quality; JPEG if Pillow lacks libwebp
+THUMBNAIL_FORMAT = 'WEBP' if features.check('webp') else 'JPEG'
+THUMBNAIL_EXTENSION = 'webp' if THUMBNAIL_FORMAT == 'WEBP' else 'jpg'
+
+# Model label -> (field holding the upload, field holding its thumbnail)
+THUMBNAIL_FIELDS = {
+    'accounts.Student': ('photo', 'photo_thumbnail'),
+    'accounts.User': ('profile_picture', 'profile_picture_thumbnail'),
+}
+
+
+def render_thumbnail(source, size=THUMBNAIL_SIZE):
+    """
+    Render a centre-cropped square thumbnail
+
+    Args:
+        source: Path or file object of the original image
+        size: (width, height) of the thumbnail
+
+    Returns:
+        Thumbnail bytes in THUMBNAIL_FORMAT
+    """
+    with Image.open(source) as image:
+        # JPEG decodes straight to 1/2..1/8 scale, so a 12MP photo is never fully decoded
+        image.draft('RGB', (size[0] * 2, size[1] * 2))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        thumbnail = ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+
+    buffer = BytesIO()
+    if THUMBNAIL_FORMAT == 'WEBP':
+        thumbnail.save(buffer, 'WEBP', quality=THUMBNAIL_QUALITY, method=4)
+    else:
+        thumbnail.save(buffer, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def thumbnail_filename(source_name):
+    stem = os.path.splitext(os.path.basename(source_name))[0]
+    return f"{stem}.{THUMBNAIL_EXTENSION}"
+
+
+def attach_thumbnail(instance, source_field, thumbnail_field):
+    """
+    Give a freshly uploaded image its thumbnail before the instance is saved
+
+    Only uploads not yet written to storage are rendered, so ordinary saves
+    cost nothing; clearing the image clears the thumbnail too.
+
+    Returns:
+        True if the thumbnail field was changed
+    """
+    source = getattr(instance, source_field)
+    if not source:
+        if getattr(instance, thumbnail_field):
+            setattr(instance, thumbnail_field, None)
+            return True
+        return False
+    if source._committed:
+        return False
+
+    try:
+        data = render_thumbnail(source)
+    except (UnidentifiedImageError, OSError, ValueError) as e:
+        logger.warning(f"Could not render thumbnail for {source.name}: {e}")
+        return False
+    finally:
+        source.seek(0)
+
+    setattr(instance, thumbnail_field, ContentFile(data, name=thumbnail_filename(source.name)))
+    return True
+
+
+def _init_worker():
+    """Pool initializer: spawned (not forked) workers need Django set up"""
+    if not apps.ready:
+        django.setup()
+
+
+def store_thumbnail(model_label, source_name):
+    """
+    Render the thumbnail of a stored image and write it to storage
+
+    Runs in pool workers, which read and write storage in parallel.
+
+    Returns:
+        Tuple of (source name, stored thumbnail name or None on failure)
+    """
+    source_field, thumbnail_field = THUMBNAIL_FIELDS[model_label]
+    model = apps.get_model(model_label)
+    source = model._meta.get_field(source_field)
+    thumbnail = model._meta.get_field(thumbnail_field)
+    try:
+        with source.storage.open(source_name, 'rb') as original:
+            data = render_thumbnail(original)
+    except (UnidentifiedImageError, OSError, ValueError) as e:
+        logger.warning(f"Could not render thumbnail for {source_name}: {e}")
+        return source_name, None
+
+    name = thumbnail.generate_filename(None, thumbnail_filename(source_name))
+    return source_name, thumbnail.storage.save(name, ContentFile(data))
+
+
+def backfill_thumbnails(model, workers=None, batch_size=200, force=False):
+    """
+    Generate missing thumbnails for every stored image of a model
+
+    Args:
+        model: Student or User
+        workers: Processes rendering in parallel (None = CPU count, 0 = inline)
+        batch_size: Rows rendered and updated per round
+        force: Re-render images that already have a thumbnail
+
+    Returns:
+        Tuple of (thumbnails written, images that failed)
+    """
+    model_label = model._meta.label
+    source_field, thumbnail_field = THUMBNAIL_FIELDS[model_label]
+    rows = model.objects.exclude(**{f'{source_field}__isnull': True}).exclude(**{source_field: ''})
+    if not force:
+        rows = rows.filter(Q(**{f'{thumbnail_field}__isnull': True}) | Q(**{thumbnail_field: ''}))
+    rows = list(rows.order_by('pk').values_list('pk', source_field))
+
+    pool = None
+    if workers != 0 and len(rows) > 1:
+        # Children must not share the parent's database connection
+        connections.close_all()
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+
+    written = failed = 0
+    try:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            names = [name for _, name in batch]
+            if pool is not None:
+                stored = dict(pool.map(store_thumbnail, [model_label] * len(names), names))
+            else:
+                stored = dict(store_thumbnail(model_label, name) for name in names)
+
+            updates = [
+                model(pk=pk, **{thumbnail_field: stored[name]})
+                for pk, name in batch if stored.get(name)
+            ]
+            model.objects.bulk_update(updates, [thumbnail_field])
+            written += len(updates)
+            failed += len(batch) - len(updates)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return written, failed
@@ -2,14 +2,22 @@ from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.parsers import MultiPartParser, FormParser
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db import transaction
+from django.db.models import Prefetch
 
-from .models import User, Student
+from .models import User, Student, CohortPromotion, CohortPromotionEntry, CohortArchive
+from .admissions import AdmissionImportError, import_admissions, iter_roster_rows
+from .archive import ArchiveError, archive_cohort, restore_cohort
+from .authentication import token_for_user
+from .deletion import StudentDeletionError, delete_students
+from .promotions import PromotionError, promote_cohort
+from .search import DEFAULT_SEARCH_LIMIT, search_students
+from .summary import get_student_summary
 from .serializers import (
-    UserSerializer, UserCreateSerializer, StudentSerializer,
-    StudentCreateSerializer, StudentUpdateSerializer, LoginSerializer, ChangePasswordSerializer
+    UserSerializer, UserCreateSerializer, StudentSerializer, StudentListSerializer,
+    StudentCreateSerializer, StudentUpdateSerializer, LoginSerializer, ChangePasswordSerializer,
+    CohortPromotionSerializer, CohortArchiveSerializer
 )
 
 
@@ -19,6 +27,8 @@ class UserViewSet(viewsets.ModelViewSet):
     """
     queryset = User.objects.all()
     permission_classes = [IsAuthenticated]
+    # Profile and account management work on the stored user, not token claims
+    authenticate_from_db = True
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['role', 'is_active']
     search_fields = ['username', 'email', 'first_name', 'last_name', 'phone_number']
@@ -49,8 +59,12 @@ class UserViewSet(viewsets.ModelViewSet):
             request.user.set_password(serializer.validated_data['new_password'])
             request.user.save()
             
+            # The password change revoked earlier tokens; hand out fresh ones
+            refresh = token_for_user(request.user)
             return Response({
-                'message': 'Password changed successfully.'
+                'message': 'Password changed successfully.',
+                'refresh': str(refresh),
+                'access': str(refresh.access_token)
             }, status=status.HTTP_200_OK)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -62,6 +76,8 @@ class StudentViewSet(viewsets.ModelViewSet):
     """
     queryset = Student.objects.select_related('user').all()
     permission_classes = [IsAuthenticated]
+    # Admin-only actions re-check the stored user instead of trusting token claims
+    authenticate_from_db = {'destroy', 'bulk_delete', 'import_admissions', 'promote', 'archive', 'restore'}
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['course', 'intake', 'semester', 'session', 'blood_group', 'admission_date', 'user']
     search_fields = [
@@ -71,27 +87,316 @@ class StudentViewSet(viewsets.ModelViewSet):
     ordering_fields = ['admission_date', 'student_id']
     ordering = ['-admission_date']
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'summary':
+            queryset = queryset.select_related('major', 'ledger')
+        if self.action in ['list', 'retrieve']:
+            # Load only the columns the (possibly sparse) serializer will read
+            queryset = self.get_serializer().optimize_queryset(queryset)
+        return queryset
+    
     def get_serializer_class(self):
         if self.action == 'create':
             return StudentCreateSerializer
         if self.action in ['update', 'partial_update']:
             return StudentUpdateSerializer
+        if self.action == 'list' and not (
+            self.request.query_params.get('view') == 'full' or self.request.query_params.get('fields')
+        ):
+            # Compact rows by default; ?view=full or ?fields= selects from the full serializer
+            return StudentListSerializer
         return StudentSerializer
     
     def destroy(self, request, *args, **kwargs):
         """
-        Delete student and associated user account
+        Delete student and associated user account, with their payments,
+        results and attendance. Query params: dry_run (true/false) to only
+        count the rows that would be deleted.
         """
+        if getattr(request.user, 'role', None) != 'ADMIN':
+            return Response(
+                {'error': 'Only administrators can delete students'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
         student = self.get_object()
-        user = student.user
+        dry_run = str(request.query_params.get('dry_run', '')).lower() in ('1', 'true', 'yes')
         
-        with transaction.atomic():
-            # Delete user - this will CASCADE to student due to OneToOneField
-            # Student deletion will CASCADE to payments, results, attendance
-            user.delete()
+        try:
+            deleted = delete_students([student.id], dry_run=dry_run)
+        except StudentDeletionError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
+        if dry_run:
+            return Response({'dry_run': True, 'deleted': deleted})
         return Response(status=status.HTTP_204_NO_CONTENT)
     
+    @action(detail=False, methods=['post'])
+    def bulk_delete(self, request):
+        """
+        Delete many students (and their user accounts and records) in one transaction.
+        Body: ids (list of student ids), dry_run (optional, only count the rows)
+        """
+        if getattr(request.user, 'role', None) != 'ADMIN':
+            return Response(
+                {'error': 'Only administrators can bulk delete students'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        ids = request.data.get('ids') or []
+        if not isinstance(ids, list) or not ids:
+            return Response(
+                {'error': 'ids must be a non-empty list of student ids'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+        
+        try:
+            deleted = delete_students(ids, dry_run=dry_run)
+        except (StudentDeletionError, TypeError, ValueError) as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response({
+            'dry_run': dry_run,
+            'students': len(set(ids)),
+            'deleted': deleted
+        })
+    
+    @action(detail=False, methods=['post'], parser_classes=[MultiPartParser, FormParser])
+    def import_admissions(self, request):
+        """
+        Bulk-import admissions from a roster spreadsheet.
+        Form fields: file (required, .csv or .xlsx with a header row of student
+        create fields), default_password (optional), dry_run (true/false)
+        """
+        if getattr(request.user, 'role', None) != 'ADMIN':
+            return Response(
+                {'error': 'Only administrators can import admissions'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        roster = request.FILES.get('file')
+        if not roster:
+            return Response(
+                {'error': 'file is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        file_format = 'xlsx' if roster.name.lower().endswith('.xlsx') else 'csv'
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+        
+        try:
+            result = import_admissions(
+                iter_roster_rows(roster, file_format),
+                default_password=request.data.get('default_password') or None,
+                # Hash inline: never fork a process pool from a web worker.
+                # Large rosters belong to the import_admissions command.
+                workers=0,
+                dry_run=dry_run
+            )
+        except AdmissionImportError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response(
+            result,
+            status=status.HTTP_201_CREATED if result['created'] else status.HTTP_200_OK
+        )
+    
+    @action(detail=False, methods=['post'])
+    def promote(self, request):
+        """
+        Promote a whole course/intake to another semester in one step.
+        Body: course, intake, from_semester (required), to_semester (default:
+        next semester), session (optional new session), exclude (list of
+        student ids held back)
+        """
+        if getattr(request.user, 'role', None) != 'ADMIN':
+            return Response(
+                {'error': 'Only administrators can promote cohorts'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        course = request.data.get('course')
+        intake = request.data.get('intake')
+        from_semester = request.data.get('from_semester')
+        if not all([course, intake, from_semester]):
+            return Response(
+                {'error': 'course, intake and from_semester are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        exclude = request.data.get('exclude') or []
+        if not isinstance(exclude, list):
+            exclude = [exclude]
+        
+        try:
+            promotion = promote_cohort(
+                course, intake, from_semester,
+                to_semester=request.data.get('to_semester') or None,
+                exclude=exclude,
+                session=request.data.get('session') or None,
+                promoted_by=request.user
+            )
+        except (PromotionError, TypeError, ValueError) as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response(
+            CohortPromotionSerializer(promotion).data,
+            status=status.HTTP_201_CREATED
+        )
+    
+    @action(detail=False, methods=['get'])
+    def promotions(self, request):
+        """
+        Promotion history, newest first
+        Query params: course, intake (optional filters)
+        """
+        promotions = CohortPromotion.objects.select_related('promoted_by').prefetch_related(
+            Prefetch(
+                'entries',
+                queryset=CohortPromotionEntry.objects.filter(held_back=True),
+                to_attr='held_back_entries'
+            )
+        )
+        if request.query_params.get('course'):
+            promotions = promotions.filter(course=request.query_params['course'])
+        if request.query_params.get('intake'):
+            promotions = promotions.filter(intake=request.query_params['intake'])
+        
+        page = self.paginate_queryset(promotions)
+        if page is not None:
+            return self.get_paginated_response(CohortPromotionSerializer(page, many=True).data)
+        return Response(CohortPromotionSerializer(promotions, many=True).data)
+    
+    @action(detail=False, methods=['post'])
+    def archive(self, request):
+        """
+        Move a graduated course/intake's results, attendance and payments to
+        the archive tables. Transcripts stay readable through the usual
+        endpoints. Body: course, intake (required), force (true/false) to
+        archive a cohort not yet in its final semester; calling it again
+        resumes an interrupted run.
+        """
+        force = str(request.data.get('force', '')).lower() in ('1', 'true', 'yes')
+        return self._run_archive(request, archive_cohort, 'archived_by', status.HTTP_201_CREATED, force=force)
+    
+    @action(detail=False, methods=['post'])
+    def restore(self, request):
+        """
+        Move an archived cohort back into the hot tables.
+        Body: course, intake (required)
+        """
+        return self._run_archive(request, restore_cohort, 'restored_by', status.HTTP_200_OK)
+    
+    def _run_archive(self, request, operation, user_field, success_status, **options):
+        if getattr(request.user, 'role', None) != 'ADMIN':
+            return Response(
+                {'error': 'Only administrators can archive or restore cohorts'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        course = request.data.get('course')
+        intake = request.data.get('intake')
+        if not all([course, intake]):
+            return Response(
+                {'error': 'course and intake are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            archive = operation(course, intake, **{user_field: request.user}, **options)
+        except ArchiveError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response(CohortArchiveSerializer(archive).data, status=success_status)
+    
+    @action(detail=False, methods=['get'])
+    def archives(self, request):
+        """
+        Archived and restored cohorts, newest first
+        Query params: course, intake, status (optional filters)
+        """
+        archives = CohortArchive.objects.select_related('archived_by', 'restored_by')
+        for field in ('course', 'intake', 'status'):
+            if request.query_params.get(field):
+                archives = archives.filter(**{field: request.query_params[field]})
+        
+        page = self.paginate_queryset(archives)
+        if page is not None:
+            return self.get_paginated_response(CohortArchiveSerializer(page, many=True).data)
+        return Response(CohortArchiveSerializer(archives, many=True).data)
+    
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Ranked quick search over name, student ID, registration number,
+        phone and guardian, backed by the student search index.
+        Query params: q (required), limit (default 20, max 100)
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {'error': 'q parameter is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            limit = int(request.query_params.get('limit', DEFAULT_SEARCH_LIMIT))
+        except ValueError:
+            return Response(
+                {'error': 'limit must be a number'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        ids = search_students(query, limit)
+        students = Student.objects.select_related('user', 'major').in_bulk(ids)
+        ranked = [students[student_id] for student_id in ids if student_id in students]
+        serializer = StudentListSerializer(ranked, many=True, context=self.get_serializer_context())
+        
+        return Response({
+            'query': query,
+            'count': len(ranked),
+            'results': serializer.data
+        })
+    
+    @action(detail=True, methods=['get'])
+    def summary(self, request, pk=None):
+        """
+        Student 360 summary: header, payment totals and balance, latest
+        results with GPA, and attendance per subject in one response.
+        Students may only read their own summary.
+        Query params: refresh=true to bypass the short-lived cache
+        """
+        student = self.get_object()
+        if getattr(request.user, 'role', None) == 'STUDENT' and student.user_id != request.user.id:
+            return Response(
+                {'error': 'You can only view your own summary'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        refresh = request.query_params.get('refresh', '').lower() in ('1', 'true', 'yes')
+        summary, cached = get_student_summary(student, self.get_serializer_context(), refresh=refresh)
+        
+        response = Response(summary)
+        response['X-Summary-Cache'] = 'hit' if cached else 'miss'
+        return response
+    
     @action(detail=True, methods=['get'])
     def profile(self, request, pk=None):
         """Get complete student profile with payments"""
@@ -119,8 +424,8 @@ class LoginView(viewsets.ViewSet):
         if serializer.is_valid():
             user = serializer.validated_data['user']
             
-            # Generate JWT tokens
-            refresh = RefreshToken.for_user(user)
+            # Generate JWT tokens; the claims let requests authenticate without a user lookup
+            refresh = token_for_user(user)
             
             return Response({
                 'refresh': str(refresh),
@@ -0,0 +1,76 @@
+"""
+Streaming CSV/XLSX export helpers shared by the report endpoints.
+Rows are consumed lazily from a generator so memory stays flat for large exports.
+"""
+import csv
+import tempfile
+
+from django.http import FileResponse, StreamingHttpResponse
+
+# Try to import openpyxl, XLSX export is unavailable without it
+try:
+    from openpyxl import Workbook
+    HAS_OPENPYXL = True
+except ImportError:
+    HAS_OPENPYXL = False
+
+EXPORT_FORMATS = ('csv', 'xlsx')
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class Echo:
+    """
+    File-like object whose write() returns the value instead of buffering it,
+    so csv.writer can feed a StreamingHttpResponse row by row.
+    """
+    def write(self, value):
+        return value
+
+
+def csv_streaming_response(rows, filename):
+    """
+    Stream an iterable of rows as a CSV attachment
+    """
+    writer = csv.writer(Echo())
+    response = StreamingHttpResponse(
+        (writer.writerow(row) for row in rows),
+        content_type='text/csv'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def xlsx_response(rows, filename, sheet_title='Sheet1'):
+    """
+    Write an iterable of rows to an XLSX attachment.
+    Uses openpyxl's write-only mode, which flushes rows to a temporary file
+    instead of keeping the whole workbook in memory.
+    """
+    if not HAS_OPENPYXL:
+        raise ValueError('XLSX export requires openpyxl to be installed')
+    
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title[:31])
+    for row in rows:
+        sheet.append(list(row))
+    
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    
+    return FileResponse(
+        output,
+        content_type=XLSX_CONTENT_TYPE,
+        as_attachment=True,
+        filename=f'{filename}.xlsx'
+    )
+
+
+def export_response(rows, filename, file_format='csv', sheet_title='Sheet1'):
+    """
+    Build a CSV (streamed) or XLSX response for the requested format
+    """
+    if file_format == 'xlsx':
+        return xlsx_response(rows, filename, sheet_title=sheet_title)
+    return csv_streaming_response(rows, filename)
@@ -1,7 +1,19 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 10000
+
+
+class CursorResultsSetPagination(CursorPagination):
+    """
+    Keyset pagination for long, append-mostly listings.
+    The cursor position comes from the first ordering field, so views that
+    override `ordering` must lead with a unique, unchanging field such as '-id'.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = '-id'
@@ -172,7 +172,7 @@ AUTH_PASSWORD_VALIDATORS = [
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.ClaimsJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -201,8 +201,16 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
+    'TOKEN_OBTAIN_SERIALIZER': 'accounts.serializers.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.ClaimsTokenRefreshSerializer',
 }
 
+# How long a user's current token version is cached. No CACHES is configured,
+# so each process has its own local-memory cache: a revocation takes effect at
+# once in the process that made it and in the others within this many seconds.
+# Configure a shared cache (e.g. Redis or Memcached) to make it immediate everywhere.
+TOKEN_VERSION_CACHE_SECONDS = int(os.getenv('TOKEN_VERSION_CACHE_SECONDS', '60'))
+
 
 # CORS Configuration
 # Parse CORS_ALLOWED_ORIGINS from environment variable (comma-separated)
@@ -372,6 +380,18 @@ if not DEBUG:
 # Custom User Model
 AUTH_USER_MODEL = 'accounts.User'
 
+# Seconds the student 360 summary may be served from cache (0 disables)
+STUDENT_SUMMARY_CACHE_SECONDS = int(os.getenv('STUDENT_SUMMARY_CACHE_SECONDS', '30'))
+
+# Seconds a rendered receipt PDF (single or daily batch) stays in the server cache
+RECEIPT_CACHE_SECONDS = int(os.getenv('RECEIPT_CACHE_SECONDS', '86400'))
+
+# Offline attendance sync: changes are re-read this many seconds before the
+# client's token (longer than any attendance write transaction), and returned
+# at most this many per response
+ATTENDANCE_SYNC_LAG_SECONDS = int(os.getenv('ATTENDANCE_SYNC_LAG_SECONDS', '120'))
+ATTENDANCE_SYNC_PAGE_SIZE = int(os.getenv('ATTENDANCE_SYNC_PAGE_SIZE', '500'))
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
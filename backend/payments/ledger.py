@@ -0,0 +1,171 @@
+"""
+Student fee ledger maintenance.
+Keeps StudentLedger rows in step with payments and fee structures, and
+rebuilds or reconciles them from the raw tables using grouped queries.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from accounts.models import Student
+from .models import ArchivedPayment, FeeStructure, Payment, StudentLedger
+
+ZERO = Decimal('0.00')
+
+# Payments of archived cohorts keep counting toward their students' ledgers
+PAYMENT_MODELS = (Payment, ArchivedPayment)
+NET_PAID = F('amount_paid') - F('discount_amount')
+
+
+def cohort_fee_total(course, intake, semester):
+    """Total fees charged to one course/intake/semester"""
+    return FeeStructure.objects.filter(
+        course=course, intake=intake, semester=semester
+    ).aggregate(total=Sum('amount'))['total'] or ZERO
+
+
+def refresh_student_ledger(student_id):
+    """
+    Recompute one student's ledger from their payments and cohort fees.
+    The ledger row is locked first so concurrent payment writes apply in turn;
+    a student's first ledger row is inserted with ON CONFLICT DO NOTHING so two
+    first writes do not race on the unique student column.
+    """
+    cohort = Student.objects.filter(pk=student_id).values_list(
+        'course', 'intake', 'semester'
+    ).first()
+    if cohort is None:
+        return None
+
+    with transaction.atomic():
+        ledger = StudentLedger.objects.select_for_update().filter(student_id=student_id).first()
+        if ledger is None:
+            # Skips the insert (instead of raising) when a concurrent first write created it
+            StudentLedger.objects.bulk_create([StudentLedger(student_id=student_id)], ignore_conflicts=True)
+            ledger = StudentLedger.objects.select_for_update().get(student_id=student_id)
+        ledger.total_charges = cohort_fee_total(*cohort)
+        ledger.total_credits = sum(
+            model.objects.filter(student_id=student_id).aggregate(total=Sum(NET_PAID))['total'] or ZERO
+            for model in PAYMENT_MODELS
+        )
+        ledger.balance = ledger.total_charges - ledger.total_credits
+        ledger.save()
+        return ledger
+
+
+def refresh_cohort_charges(course, intake, semester):
+    """
+    Re-price every ledger in a cohort after its fee structures changed.
+    One UPDATE covers the whole cohort; students without a ledger yet are built first.
+    """
+    fee_total = cohort_fee_total(course, intake, semester)
+    students = Student.objects.filter(course=course, intake=intake, semester=semester)
+
+    with transaction.atomic():
+        missing = list(students.filter(ledger__isnull=True).values_list('id', flat=True))
+        if missing:
+            rebuild_ledgers(Student.objects.filter(id__in=missing))
+
+        return StudentLedger.objects.filter(student__in=students).update(
+            total_charges=fee_total,
+            balance=fee_total - F('total_credits'),
+            updated_at=timezone.now()
+        )
+
+
+def expected_ledgers(students=None):
+    """
+    Compute (charges, credits) per student straight from the raw tables.
+    Uses one grouped query per payment table and one for fee structures.
+
+    Returns:
+        Dict of student id -> (total_charges, total_credits)
+    """
+    if students is None:
+        students = Student.objects.all()
+
+    credits = {}
+    for model in PAYMENT_MODELS:
+        for student_id, total in model.objects.filter(student__in=students).order_by().values(
+            'student'
+        ).annotate(total=Sum(NET_PAID)).values_list('student', 'total'):
+            credits[student_id] = credits.get(student_id, ZERO) + total
+    fees = {
+        (row['course'], row['intake'], row['semester']): row['total']
+        for row in FeeStructure.objects.order_by().values('course', 'intake', 'semester').annotate(
+            total=Sum('amount')
+        )
+    }
+
+    return {
+        student_id: (fees.get((course, intake, semester)) or ZERO, credits.get(student_id) or ZERO)
+        for student_id, course, intake, semester in students.values_list(
+            'id', 'course', 'intake', 'semester'
+        ).iterator(chunk_size=2000)
+    }
+
+
+def rebuild_ledgers(students=None, batch_size=1000):
+    """
+    Rebuild ledgers from the raw tables with a bulk upsert.
+
+    Returns:
+        Number of ledgers written
+    """
+    now = timezone.now()
+    ledgers = [
+        StudentLedger(
+            student_id=student_id,
+            total_charges=charges,
+            total_credits=credits,
+            balance=charges - credits,
+            updated_at=now
+        )
+        for student_id, (charges, credits) in expected_ledgers(students).items()
+    ]
+    StudentLedger.objects.bulk_create(
+        ledgers,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['student'],
+        update_fields=['total_charges', 'total_credits', 'balance', 'updated_at']
+    )
+    return len(ledgers)
+
+
+def reconcile_ledgers(students=None):
+    """
+    Compare stored ledgers with the raw payments and fee structures.
+
+    Returns:
+        List of dicts describing every student whose ledger is missing or differs
+    """
+    if students is None:
+        students = Student.objects.all()
+
+    expected = expected_ledgers(students)
+    stored = {
+        row[0]: row[1:] for row in StudentLedger.objects.filter(
+            student__in=students
+        ).values_list('student_id', 'total_charges', 'total_credits', 'balance')
+    }
+
+    mismatches = []
+    for student_id, (charges, credits) in expected.items():
+        ledger = stored.get(student_id)
+        if ledger is None:
+            mismatches.append({
+                'student': student_id,
+                'problem': 'missing',
+                'expected_balance': charges - credits,
+            })
+        elif ledger != (charges, credits, charges - credits):
+            mismatches.append({
+                'student': student_id,
+                'problem': 'mismatch',
+                'stored_balance': ledger[2],
+                'expected_balance': charges - credits,
+            })
+    return mismatches
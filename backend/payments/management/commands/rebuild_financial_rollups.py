@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from payments.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily financial rollup table from payments and expenses'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows per INSERT when writing the rollup (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        payment_rows, expense_rows = rebuild_rollups(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt daily rollup: {payment_rows} payment rows, {expense_rows} expense rows'
+        ))
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import Student
+from payments.ledger import reconcile_ledgers, rebuild_ledgers
+
+
+class Command(BaseCommand):
+    help = 'Verify student fee ledgers against raw payments and fee structures'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Rebuild the ledgers of students whose ledger is missing or wrong',
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Rebuild every ledger from scratch without checking first',
+        )
+        parser.add_argument(
+            '--verbose-list',
+            action='store_true',
+            help='Print every mismatching student',
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            with transaction.atomic():
+                rebuilt = rebuild_ledgers()
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {rebuilt} ledgers'))
+            return
+
+        mismatches = reconcile_ledgers()
+
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('All student ledgers match the raw payments.'))
+            return
+
+        missing = sum(1 for m in mismatches if m['problem'] == 'missing')
+        self.stdout.write(self.style.WARNING(
+            f'{len(mismatches)} ledger(s) out of sync ({missing} missing, {len(mismatches) - missing} wrong)'
+        ))
+
+        if options['verbose_list']:
+            for mismatch in mismatches:
+                self.stdout.write(
+                    f"  student {mismatch['student']}: {mismatch['problem']}, "
+                    f"stored {mismatch.get('stored_balance', '-')}, expected {mismatch['expected_balance']}"
+                )
+
+        if options['fix']:
+            with transaction.atomic():
+                fixed = rebuild_ledgers(
+                    Student.objects.filter(id__in=[m['student'] for m in mismatches])
+                )
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {fixed} ledgers'))
@@ -2,10 +2,13 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import timedelta
 import random
+import uuid
 from decimal import Decimal
 
 from accounts.models import Student
 from payments.models import Payment
+from payments.ledger import rebuild_ledgers
+from payments.rollups import rebuild_rollups
 
 
 class Command(BaseCommand):
@@ -43,6 +46,9 @@ class Command(BaseCommand):
 
         if clear:
             deleted_count = Payment.objects.all().delete()[0]
+            # Queryset deletes bypass Payment.delete, so rebuild ledgers and rollups in one pass
+            rebuild_ledgers()
+            rebuild_rollups()
             self.stdout.write(self.style.WARNING(f'Deleted {deleted_count} existing payments'))
 
         students = list(Student.objects.all())
@@ -81,7 +87,7 @@ class Command(BaseCommand):
                 payment_method=random.choice(self.PAYMENT_METHODS),
                 fee_type=fee_type,
                 payment_regularity=regularity,
-                transaction_id=f'TXN-{fee_type[:3].upper()}-{random.randint(100000, 999999)}',
+                transaction_id=f'TXN-{fee_type[:3].upper()}-{uuid.uuid4().hex[:10].upper()}',
                 remarks=f'Payment for {fee_type.replace("_", " ")}' if random.random() < 0.3 else ''
             )
             payments_created += 1
@@ -0,0 +1,32 @@
+# Generated by Django 5.0 on 2026-10-19 00:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_student_major_student_major_locked'),
+        ('payments', '0004_model_updates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_charges', models.DecimalField(decimal_places=2, default=0, help_text='Total fees charged to the student', max_digits=12)),
+                ('total_credits', models.DecimalField(decimal_places=2, default=0, help_text='Total paid by the student, net of discounts', max_digits=12)),
+                ('balance', models.DecimalField(decimal_places=2, default=0, help_text='Outstanding amount (charges - credits)', max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.OneToOneField(help_text='Student this ledger belongs to', on_delete=django.db.models.deletion.CASCADE, related_name='ledger', to='accounts.student')),
+            ],
+            options={
+                'verbose_name': 'Student Ledger',
+                'verbose_name_plural': 'Student Ledgers',
+                'ordering': ['-balance'],
+                'indexes': [models.Index(fields=['balance'], name='payments_st_balance_88ac7d_idx')],
+            },
+        ),
+    ]
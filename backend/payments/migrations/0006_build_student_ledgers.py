@@ -0,0 +1,50 @@
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import F, Sum
+
+
+def build_ledgers(apps, schema_editor):
+    """Populate StudentLedger for existing students from payments and fee structures"""
+    Student = apps.get_model('accounts', 'Student')
+    Payment = apps.get_model('payments', 'Payment')
+    FeeStructure = apps.get_model('payments', 'FeeStructure')
+    StudentLedger = apps.get_model('payments', 'StudentLedger')
+
+    zero = Decimal('0.00')
+    credits = dict(
+        Payment.objects.order_by().values('student').annotate(
+            total=Sum(F('amount_paid') - F('discount_amount'))
+        ).values_list('student', 'total')
+    )
+    fees = {
+        (row['course'], row['intake'], row['semester']): row['total']
+        for row in FeeStructure.objects.order_by().values('course', 'intake', 'semester').annotate(
+            total=Sum('amount')
+        )
+    }
+
+    ledgers = []
+    for student_id, course, intake, semester in Student.objects.values_list(
+        'id', 'course', 'intake', 'semester'
+    ).iterator():
+        charges = fees.get((course, intake, semester)) or zero
+        paid = credits.get(student_id) or zero
+        ledgers.append(StudentLedger(
+            student_id=student_id,
+            total_charges=charges,
+            total_credits=paid,
+            balance=charges - paid
+        ))
+    StudentLedger.objects.bulk_create(ledgers, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0005_student_ledger'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_ledgers, migrations.RunPython.noop),
+    ]
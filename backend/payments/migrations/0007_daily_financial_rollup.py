@@ -0,0 +1,38 @@
+# Generated by Django 5.0 on 2026-10-19 00:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0006_build_student_ledgers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyFinancialRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Day the payments/expenses were recorded for')),
+                ('kind', models.CharField(choices=[('payment', 'Payment'), ('expense', 'Expense')], help_text='Whether this row sums payments or expenses', max_length=10)),
+                ('course', models.CharField(blank=True, default='', max_length=10)),
+                ('intake', models.CharField(blank=True, default='', max_length=10)),
+                ('semester', models.CharField(blank=True, default='', max_length=10)),
+                ('fee_type', models.CharField(blank=True, default='', max_length=20)),
+                ('payment_method', models.CharField(blank=True, default='', max_length=20)),
+                ('expense_type', models.CharField(blank=True, default='', max_length=20)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, help_text='Sum of amount paid (payments) or amount (expenses)', max_digits=15)),
+                ('total_discount', models.DecimalField(decimal_places=2, default=0, help_text='Sum of discounts (payments only)', max_digits=15)),
+                ('entry_count', models.PositiveIntegerField(default=0, help_text='Number of payments/expenses summed into this row')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Daily Financial Rollup',
+                'verbose_name_plural': 'Daily Financial Rollups',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['kind', 'date'], name='payments_da_kind_2697f9_idx'), models.Index(fields=['kind', 'course', 'intake'], name='payments_da_kind_07c1d4_idx')],
+                'unique_together': {('date', 'kind', 'course', 'intake', 'semester', 'fee_type', 'payment_method', 'expense_type')},
+            },
+        ),
+    ]
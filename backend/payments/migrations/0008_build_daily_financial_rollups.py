@@ -0,0 +1,49 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def build_rollups(apps, schema_editor):
+    """Populate DailyFinancialRollup from existing payments and expenses"""
+    Payment = apps.get_model('payments', 'Payment')
+    Expense = apps.get_model('payments', 'Expense')
+    DailyFinancialRollup = apps.get_model('payments', 'DailyFinancialRollup')
+
+    rows = []
+    for row in Payment.objects.order_by().values(
+        'payment_date', 'student__course', 'student__intake', 'student__semester',
+        'fee_type', 'payment_method'
+    ).annotate(total=Sum('amount_paid'), discount=Sum('discount_amount'), entries=Count('id')):
+        rows.append(DailyFinancialRollup(
+            date=row['payment_date'],
+            kind='payment',
+            course=row['student__course'] or '',
+            intake=row['student__intake'] or '',
+            semester=row['student__semester'] or '',
+            fee_type=row['fee_type'] or '',
+            payment_method=row['payment_method'] or '',
+            total_amount=row['total'],
+            total_discount=row['discount'],
+            entry_count=row['entries']
+        ))
+    for row in Expense.objects.order_by().values('expense_date', 'expense_type').annotate(
+        total=Sum('amount'), entries=Count('id')
+    ):
+        rows.append(DailyFinancialRollup(
+            date=row['expense_date'],
+            kind='expense',
+            expense_type=row['expense_type'],
+            total_amount=row['total'],
+            entry_count=row['entries']
+        ))
+    DailyFinancialRollup.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0007_daily_financial_rollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
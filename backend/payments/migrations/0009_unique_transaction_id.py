@@ -0,0 +1,35 @@
+# Generated by Django 5.0 on 2026-10-19 00:37
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def suffix_duplicate_transaction_ids(apps, schema_editor):
+    """Keep the first payment per transaction_id and suffix later ones with their id"""
+    Payment = apps.get_model('payments', 'Payment')
+
+    duplicated = Payment.objects.exclude(transaction_id__isnull=True).exclude(
+        transaction_id=''
+    ).order_by().values('transaction_id').annotate(n=Count('id')).filter(n__gt=1).values_list(
+        'transaction_id', flat=True
+    )
+    for transaction_id in list(duplicated):
+        for payment in Payment.objects.filter(transaction_id=transaction_id).order_by('id')[1:]:
+            payment.transaction_id = f'{transaction_id}-{payment.id}'[:100]
+            payment.save(update_fields=['transaction_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_student_major_student_major_locked'),
+        ('payments', '0008_build_daily_financial_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(suffix_duplicate_transaction_ids, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='payment',
+            constraint=models.UniqueConstraint(condition=models.Q(('transaction_id__isnull', False), models.Q(('transaction_id', ''), _negated=True)), fields=('transaction_id',), name='unique_payment_transaction_id'),
+        ),
+    ]
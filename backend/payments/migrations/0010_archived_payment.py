@@ -0,0 +1,39 @@
+# Generated by Django 5.0 on 2026-10-19 01:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_cohort_archive'),
+        ('payments', '0009_unique_transaction_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPayment',
+            fields=[
+                ('id', models.BigIntegerField(help_text='Primary key of the original Payment', primary_key=True, serialize=False)),
+                ('amount_paid', models.DecimalField(decimal_places=2, help_text='Amount paid', max_digits=10)),
+                ('payment_date', models.DateField(help_text='Date of payment')),
+                ('payment_method', models.CharField(choices=[('cash', 'Cash'), ('bank_transfer', 'Bank Transfer'), ('online', 'Online Payment')], help_text='Payment method used', max_length=20)),
+                ('transaction_id', models.CharField(blank=True, help_text='Transaction reference ID', max_length=100, null=True)),
+                ('discount_amount', models.DecimalField(decimal_places=2, default=0.0, help_text='Discount applied', max_digits=10)),
+                ('remarks', models.TextField(blank=True, help_text='Additional remarks', null=True)),
+                ('payment_regularity', models.CharField(choices=[('regular', 'Regular'), ('irregular', 'Irregular')], help_text='Payment regularity status', max_length=20)),
+                ('fee_type', models.CharField(blank=True, choices=[('lab_fee', 'Lab Fee'), ('library_fee', 'Library Fee'), ('fine', 'Fine'), ('semester_fee', 'Semester Fee'), ('tuition_fee', 'Tuition Fee'), ('admission_fee', 'Admission Fee'), ('exam_fee', 'Exam Fee')], help_text='Direct fee type (when not linked to FeeStructure)', max_length=20, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('fee_structure', models.ForeignKey(blank=True, help_text='Associated fee structure', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_payments', to='payments.feestructure')),
+                ('student', models.ForeignKey(help_text='Student who made the payment', on_delete=django.db.models.deletion.CASCADE, related_name='archived_payments', to='accounts.student')),
+            ],
+            options={
+                'verbose_name': 'Archived Payment',
+                'verbose_name_plural': 'Archived Payments',
+                'ordering': ['-payment_date'],
+                'indexes': [models.Index(fields=['payment_date'], name='payments_ar_payment_f6008a_idx'), models.Index(fields=['student', 'payment_date'], name='payments_ar_student_4db892_idx'), models.Index(fields=['transaction_id'], name='payments_ar_transac_cd93ca_idx')],
+            },
+        ),
+    ]
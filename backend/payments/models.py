@@ -1,7 +1,39 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 
 
+class RollupSnapshotMixin:
+    """
+    Remembers the ROLLUP_FIELDS values an instance was loaded with, so a write
+    can move its daily rollup contribution (see payments.signals) without
+    reading the stored row again.
+    """
+    
+    ROLLUP_FIELDS = ()
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_rollup = {
+            name: value for name, value in zip(field_names, values) if name in cls.ROLLUP_FIELDS
+        }
+        return instance
+    
+    def _rollup_values(self):
+        """Current ROLLUP_FIELDS values, cleaned the way the database returns them"""
+        return {
+            name: self._meta.get_field(name).to_python(getattr(self, name))
+            for name in self.ROLLUP_FIELDS
+        }
+    
+    def _stored_rollup_values(self):
+        """Stored ROLLUP_FIELDS values; read from the database only if some were deferred"""
+        loaded = getattr(self, '_loaded_rollup', None)
+        if loaded is not None and len(loaded) == len(self.ROLLUP_FIELDS):
+            return loaded
+        return type(self)._base_manager.filter(pk=self.pk).values(*self.ROLLUP_FIELDS).first()
+
+
 class FeeStructure(models.Model):
     """
     Fee structure for different course/intake/semester/session combinations
@@ -101,13 +133,22 @@ class FeeStructure(models.Model):
     
     def __str__(self):
         return f"{self.course} {self.intake} - {self.semester} Sem - {self.get_fee_type_display()} - ${self.amount}"
+    
+    def save(self, *args, **kwargs):
+        """Save in a transaction with the ledger re-pricing done by payments.signals"""
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
 
-class Payment(models.Model):
+class Payment(RollupSnapshotMixin, models.Model):
     """
     Payment records for student fees
     """
     
+    ROLLUP_FIELDS = (
+        'student_id', 'payment_date', 'amount_paid', 'discount_amount', 'fee_type', 'payment_method'
+    )
+    
     PAYMENT_METHOD_CHOICES = [
         ('cash', 'Cash'),
         ('bank_transfer', 'Bank Transfer'),
@@ -209,13 +250,27 @@ class Payment(models.Model):
             models.Index(fields=['payment_method']),
             models.Index(fields=['student', 'payment_date']),
         ]
+        constraints = [
+            # Bank references identify a transfer; blank/missing references are allowed to repeat
+            models.UniqueConstraint(
+                fields=['transaction_id'],
+                condition=models.Q(transaction_id__isnull=False) & ~models.Q(transaction_id=''),
+                name='unique_payment_transaction_id'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.student.user.get_full_name()} - ${self.amount_paid} on {self.payment_date}"
     
+    def save(self, *args, **kwargs):
+        """Save in a transaction with the ledger and rollup upkeep done by payments.signals"""
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
     def calculate_due_amount(self):
         """
         Calculate due amount based on fee structure
+        (the student's overall balance is on their StudentLedger)
         """
         if self.fee_structure:
             total_paid = Payment.objects.filter(
@@ -236,11 +291,13 @@ class Payment(models.Model):
         return self.amount_paid - self.discount_amount
 
 
-class Expense(models.Model):
+class Expense(RollupSnapshotMixin, models.Model):
     """
     Expense tracking for institution
     """
     
+    ROLLUP_FIELDS = ('expense_date', 'expense_type', 'amount')
+    
     EXPENSE_TYPE_CHOICES = [
         ('salary', 'Salary'),
         ('rent', 'Rent'),
@@ -299,3 +356,222 @@ class Expense(models.Model):
     
     def __str__(self):
         return f"{self.get_expense_type_display()} - ${self.amount} on {self.expense_date}"
+    
+    def save(self, *args, **kwargs):
+        """Save in a transaction with the rollup upkeep done by payments.signals"""
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class DailyFinancialRollup(models.Model):
+    """
+    Pre-aggregated payment and expense totals per day.
+    Payment rows are keyed by the student's course/intake/semester, fee type and
+    payment method; expense rows by expense type. Dimensions that do not apply to
+    a row are stored as empty strings so the unique key stays usable.
+    Report endpoints read from here, so their cost scales with days, not transactions.
+    """
+    
+    KIND_CHOICES = [
+        ('payment', 'Payment'),
+        ('expense', 'Expense'),
+    ]
+    
+    date = models.DateField(
+        help_text='Day the payments/expenses were recorded for'
+    )
+    
+    kind = models.CharField(
+        max_length=10,
+        choices=KIND_CHOICES,
+        help_text='Whether this row sums payments or expenses'
+    )
+    
+    course = models.CharField(max_length=10, blank=True, default='')
+    intake = models.CharField(max_length=10, blank=True, default='')
+    semester = models.CharField(max_length=10, blank=True, default='')
+    fee_type = models.CharField(max_length=20, blank=True, default='')
+    payment_method = models.CharField(max_length=20, blank=True, default='')
+    expense_type = models.CharField(max_length=20, blank=True, default='')
+    
+    total_amount = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=0,
+        help_text='Sum of amount paid (payments) or amount (expenses)'
+    )
+    
+    total_discount = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=0,
+        help_text='Sum of discounts (payments only)'
+    )
+    
+    entry_count = models.PositiveIntegerField(
+        default=0,
+        help_text='Number of payments/expenses summed into this row'
+    )
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-date']
+        verbose_name = 'Daily Financial Rollup'
+        verbose_name_plural = 'Daily Financial Rollups'
+        unique_together = [
+            'date', 'kind', 'course', 'intake', 'semester',
+            'fee_type', 'payment_method', 'expense_type'
+        ]
+        indexes = [
+            models.Index(fields=['kind', 'date']),
+            models.Index(fields=['kind', 'course', 'intake']),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} {self.kind} - {self.total_amount} ({self.entry_count})"
+
+
+class StudentLedger(models.Model):
+    """
+    Running fee balance per student.
+    Charges come from the FeeStructure rows of the student's course/intake/semester,
+    credits from the student's payments net of discount. Maintained on every
+    payment and fee structure write so balance lookups are a single row read.
+    """
+    
+    student = models.OneToOneField(
+        'accounts.Student',
+        on_delete=models.CASCADE,
+        related_name='ledger',
+        help_text='Student this ledger belongs to'
+    )
+    
+    total_charges = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        help_text='Total fees charged to the student'
+    )
+    
+    total_credits = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        help_text='Total paid by the student, net of discounts'
+    )
+    
+    balance = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        help_text='Outstanding amount (charges - credits)'
+    )
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-balance']
+        verbose_name = 'Student Ledger'
+        verbose_name_plural = 'Student Ledgers'
+        indexes = [
+            models.Index(fields=['balance']),
+        ]
+    
+    def __str__(self):
+        return f"{self.student.student_id} - balance {self.balance}"
+
+
+class ArchivedPayment(models.Model):
+    """
+    Cold copy of a Payment of an archived cohort.
+    Same columns and primary key as the original row. Archived payments still
+    count toward ledgers, daily rollups and dues aging.
+    """
+    
+    id = models.BigIntegerField(
+        primary_key=True,
+        help_text='Primary key of the original Payment'
+    )
+    
+    student = models.ForeignKey(
+        'accounts.Student',
+        on_delete=models.CASCADE,
+        related_name='archived_payments',
+        help_text='Student who made the payment'
+    )
+    
+    fee_structure = models.ForeignKey(
+        FeeStructure,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='archived_payments',
+        help_text='Associated fee structure'
+    )
+    
+    amount_paid = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        help_text='Amount paid'
+    )
+    
+    payment_date = models.DateField(
+        help_text='Date of payment'
+    )
+    
+    payment_method = models.CharField(
+        max_length=20,
+        choices=Payment.PAYMENT_METHOD_CHOICES,
+        help_text='Payment method used'
+    )
+    
+    transaction_id = models.CharField(
+        max_length=100,
+        blank=True,
+        null=True,
+        help_text='Transaction reference ID'
+    )
+    
+    discount_amount = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0.00,
+        help_text='Discount applied'
+    )
+    
+    remarks = models.TextField(
+        blank=True,
+        null=True,
+        help_text='Additional remarks'
+    )
+    
+    payment_regularity = models.CharField(
+        max_length=20,
+        choices=Payment.REGULARITY_CHOICES,
+        help_text='Payment regularity status'
+    )
+    
+    fee_type = models.CharField(
+        max_length=20,
+        choices=Payment.FEE_TYPE_CHOICES,
+        blank=True,
+        null=True,
+        help_text='Direct fee type (when not linked to FeeStructure)'
+    )
+    
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['-payment_date']
+        verbose_name = 'Archived Payment'
+        verbose_name_plural = 'Archived Payments'
+        indexes = [
+            models.Index(fields=['payment_date']),
+            models.Index(fields=['student', 'payment_date']),
+            models.Index(fields=['transaction_id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.student_id} - {self.amount_paid} on {self.payment_date} (archived)"
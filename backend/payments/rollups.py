@@ -0,0 +1,219 @@
+"""
+Daily financial rollup maintenance.
+Payment and expense writes add their change to the affected DailyFinancialRollup
+rows as atomic increments; rebuild_rollups recomputes the whole table from the
+raw tables on demand.
+"""
+from django.db import transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from accounts.models import Student
+from .models import ArchivedPayment, DailyFinancialRollup, Expense, Payment
+
+PAYMENT_DIMENSIONS = {
+    'course': 'student__course',
+    'intake': 'student__intake',
+    'semester': 'student__semester',
+    'fee_type': 'fee_type',
+    'payment_method': 'payment_method',
+}
+
+COHORT_DIMENSIONS = ('course', 'intake', 'semester')
+
+ROLLUP_DIMENSIONS = (*PAYMENT_DIMENSIONS, 'expense_type')
+
+
+def payment_rollup_rows():
+    """
+    Build unsaved payment rollup rows with one grouped query per payment table.
+    Payments are keyed by the student's current course/intake/semester;
+    archived payments count like any other.
+    """
+    totals = {}
+    for model in (Payment, ArchivedPayment):
+        rows = model.objects.order_by().values('payment_date', *PAYMENT_DIMENSIONS.values()).annotate(
+            total=Sum('amount_paid'),
+            discount=Sum('discount_amount'),
+            entries=Count('id')
+        )
+        for row in rows:
+            key = (row['payment_date'], *(row[lookup] or '' for lookup in PAYMENT_DIMENSIONS.values()))
+            total, discount, entries = totals.get(key, (0, 0, 0))
+            totals[key] = (total + row['total'], discount + row['discount'], entries + row['entries'])
+
+    now = timezone.now()
+    return [
+        DailyFinancialRollup(
+            date=key[0],
+            kind='payment',
+            total_amount=total,
+            total_discount=discount,
+            entry_count=entries,
+            updated_at=now,
+            **dict(zip(PAYMENT_DIMENSIONS, key[1:]))
+        )
+        for key, (total, discount, entries) in totals.items()
+    ]
+
+
+def expense_rollup_rows():
+    """Build unsaved expense rollup rows with one grouped query"""
+    now = timezone.now()
+    rows = Expense.objects.order_by().values('expense_date', 'expense_type').annotate(
+        total=Sum('amount'),
+        entries=Count('id')
+    )
+    return [
+        DailyFinancialRollup(
+            date=row['expense_date'],
+            kind='expense',
+            expense_type=row['expense_type'],
+            total_amount=row['total'],
+            entry_count=row['entries'],
+            updated_at=now
+        )
+        for row in rows
+    ]
+
+
+def _replace_rollups(kind, rows, batch_size=1000):
+    """Swap every stored row of one kind for fresh ones"""
+    with transaction.atomic():
+        DailyFinancialRollup.objects.filter(kind=kind).delete()
+        DailyFinancialRollup.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def apply_rollup_delta(kind, day, amount, discount=0, entries=1, **dimensions):
+    """
+    Add one change to a day's rollup row (negative values take it out)
+
+    The row is incremented in place with F() expressions, so concurrent writes
+    to the same row queue on its row lock instead of overwriting each other. A
+    missing row is inserted empty first with ON CONFLICT DO NOTHING, and a row
+    whose last entry was taken out is dropped.
+    """
+    key = {
+        'date': day,
+        'kind': kind,
+        **{name: dimensions.get(name) or '' for name in ROLLUP_DIMENSIONS},
+    }
+    rows = DailyFinancialRollup.objects.filter(**key)
+    changes = {
+        'total_amount': F('total_amount') + amount,
+        'total_discount': F('total_discount') + discount,
+        'entry_count': Greatest(F('entry_count') + entries, Value(0)),
+        'updated_at': timezone.now(),
+    }
+
+    with transaction.atomic():
+        if not rows.update(**changes) and entries > 0:
+            DailyFinancialRollup.objects.bulk_create([DailyFinancialRollup(**key)], ignore_conflicts=True)
+            rows.update(**changes)
+        if entries < 0:
+            rows.filter(entry_count=0).delete()
+
+
+def _payment_groups(payments, cohort=None):
+    """
+    Payments summed per rollup row with one grouped query.
+    Keyed by cohort when given, else by each student's current course/intake/semester.
+
+    Returns:
+        List of (day, dimensions, total, discount, entries)
+    """
+    lookups = PAYMENT_DIMENSIONS if cohort is None else {'fee_type': 'fee_type', 'payment_method': 'payment_method'}
+    rows = payments.order_by().values('payment_date', *lookups.values()).annotate(
+        total=Sum('amount_paid'),
+        discount=Sum('discount_amount'),
+        entries=Count('id')
+    )
+    groups = []
+    for row in rows:
+        dimensions = {name: row[lookup] for name, lookup in lookups.items()}
+        if cohort is not None:
+            dimensions.update(zip(COHORT_DIMENSIONS, cohort))
+        groups.append((row['payment_date'], dimensions, row['total'], row['discount'], row['entries']))
+    return groups
+
+
+def apply_payment_rollups(payments, sign=1):
+    """
+    Add (sign=1) or take out (sign=-1) a queryset of payments from the rollup.
+    For bulk writes that skip Payment.save; taking payments out must happen
+    before their rows (or their students) are deleted.
+    """
+    for day, dimensions, total, discount, entries in _payment_groups(payments):
+        apply_rollup_delta('payment', day, sign * total, sign * discount, sign * entries, **dimensions)
+
+
+def move_payment_rollups(student_ids, old_cohort, new_cohort):
+    """
+    Re-key students' payments after their course/intake/semester changed.
+    Only the rows of the days and fee types they paid for are touched.
+    """
+    for model in (Payment, ArchivedPayment):
+        for day, dimensions, total, discount, entries in _payment_groups(
+            model.objects.filter(student_id__in=student_ids), old_cohort
+        ):
+            apply_rollup_delta('payment', day, -total, -discount, -entries, **dimensions)
+            dimensions.update(zip(COHORT_DIMENSIONS, new_cohort))
+            apply_rollup_delta('payment', day, total, discount, entries, **dimensions)
+
+
+def record_payment_change(before, after, student=None):
+    """
+    Move one payment's contribution to the rollup from its stored values to its new ones
+
+    Args:
+        before: Payment.ROLLUP_FIELDS values before the write (None for a new payment)
+        after: Values after the write (None for a deleted payment)
+        student: The payment's student, if already loaded, to read its cohort from
+    """
+    student_ids = {values['student_id'] for values in (before, after) if values}
+    cohorts = {}
+    if student is not None:
+        cohorts[student.pk] = tuple(getattr(student, name) for name in COHORT_DIMENSIONS)
+    if student_ids - set(cohorts):
+        cohorts.update(
+            (row[0], row[1:]) for row in Student.objects.filter(
+                pk__in=student_ids - set(cohorts)
+            ).values_list('id', *COHORT_DIMENSIONS)
+        )
+
+    with transaction.atomic():
+        for values, sign in ((before, -1), (after, 1)):
+            if values:
+                apply_rollup_delta(
+                    'payment', values['payment_date'],
+                    sign * values['amount_paid'], sign * values['discount_amount'], sign,
+                    fee_type=values['fee_type'], payment_method=values['payment_method'],
+                    **dict(zip(COHORT_DIMENSIONS, cohorts.get(values['student_id'], ())))
+                )
+
+
+def record_expense_change(before, after):
+    """Move one expense's contribution to the rollup from its stored values to its new ones"""
+    with transaction.atomic():
+        for values, sign in ((before, -1), (after, 1)):
+            if values:
+                apply_rollup_delta(
+                    'expense', values['expense_date'], sign * values['amount'], entries=sign,
+                    expense_type=values['expense_type']
+                )
+
+
+def rebuild_rollups(batch_size=1000):
+    """
+    Rebuild the whole rollup table from payments and expenses.
+    Recomputes everything, so run it from maintenance jobs, not per write.
+
+    Returns:
+        Tuple of (payment rows, expense rows) written
+    """
+    with transaction.atomic():
+        payment_rows = _replace_rollups('payment', payment_rollup_rows(), batch_size=batch_size)
+        expense_rows = _replace_rollups('expense', expense_rollup_rows(), batch_size=batch_size)
+    return payment_rows, expense_rows
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.db.models import Sum
-from .models import FeeStructure, Payment, Expense
+from .models import ArchivedPayment, FeeStructure, Payment, Expense
 
 
 class FeeStructureSerializer(serializers.ModelSerializer):
@@ -8,21 +8,30 @@ class FeeStructureSerializer(serializers.ModelSerializer):
     Serializer for FeeStructure model
     """
     total_collected = serializers.SerializerMethodField()
+    payer_count = serializers.SerializerMethodField()
     
     class Meta:
         model = FeeStructure
         fields = [
             'id', 'course', 'intake', 'semester',
             'fee_type', 'amount', 'due_date', 'description',
-            'total_collected', 'created_at', 'updated_at'
+            'total_collected', 'payer_count', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
     
     def get_total_collected(self, obj):
-        """Calculate total amount collected for this fee structure"""
+        """Total amount collected for this fee structure (annotated by FeeStructureViewSet)"""
+        if hasattr(obj, 'collected_total'):
+            return obj.collected_total
         return obj.payments.aggregate(
             total=Sum('amount_paid')
         )['total'] or 0
+    
+    def get_payer_count(self, obj):
+        """Number of distinct students who paid against this fee structure"""
+        if hasattr(obj, 'collected_payer_count'):
+            return obj.collected_payer_count
+        return obj.payments.values('student').distinct().count()
 
 
 class PaymentSerializer(serializers.ModelSerializer):
@@ -57,6 +66,17 @@ class PaymentSerializer(serializers.ModelSerializer):
     def get_net_amount(self, obj):
         return obj.net_amount()
     
+    def validate_transaction_id(self, value):
+        """Transaction references must be unique across payments"""
+        if value:
+            duplicates = Payment.objects.filter(transaction_id=value)
+            if self.instance is not None:
+                duplicates = duplicates.exclude(pk=self.instance.pk)
+            # Archived payments keep their reference: a clash would stop the cohort being restored
+            if duplicates.exists() or ArchivedPayment.objects.filter(transaction_id=value).exists():
+                raise serializers.ValidationError('A payment with this transaction ID already exists.')
+        return value
+    
     def validate(self, attrs):
         """Validate payment amounts"""
         amount_paid = attrs.get('amount_paid', 0)
@@ -90,14 +110,15 @@ class PaymentDetailSerializer(serializers.ModelSerializer):
     fee_structure = FeeStructureSerializer(read_only=True)
     net_amount = serializers.SerializerMethodField()
     due_amount = serializers.SerializerMethodField()
+    student_balance = serializers.SerializerMethodField()
     
     class Meta:
         model = Payment
         fields = [
             'id', 'student', 'fee_structure', 'amount_paid',
             'payment_date', 'payment_method', 'transaction_id',
-            'discount_amount', 'net_amount', 'due_amount', 'remarks',
-            'created_at', 'updated_at'
+            'discount_amount', 'net_amount', 'due_amount', 'student_balance',
+            'remarks', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
     
@@ -106,6 +127,11 @@ class PaymentDetailSerializer(serializers.ModelSerializer):
     
     def get_due_amount(self, obj):
         return obj.calculate_due_amount()
+    
+    def get_student_balance(self, obj):
+        """Outstanding balance across all of the student's fees, from the ledger"""
+        ledger = getattr(obj.student, 'ledger', None)
+        return ledger.balance if ledger else None
 
 
 class ExpenseSerializer(serializers.ModelSerializer):
@@ -0,0 +1,97 @@
+"""
+Ledger and daily rollup upkeep for payment, expense and fee structure writes.
+Receivers (rather than save/delete overrides) also run for queryset deletes,
+the admin's bulk delete and ORM cascades, which never call Model.delete.
+Bulk inserts and updates send no signals; their callers rebuild instead.
+"""
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from accounts.models import Student, User
+from .ledger import refresh_cohort_charges, refresh_student_ledger
+from .models import Expense, FeeStructure, Payment
+from .rollups import record_expense_change, record_payment_change
+
+COHORT = ('course', 'intake', 'semester')
+
+
+def deletes_students(origin):
+    """Whether a delete started from students (or their users), whose ledgers go with them"""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(model, (Student, User))
+
+
+@receiver(pre_save, sender=Payment)
+@receiver(pre_save, sender=Expense)
+@receiver(pre_delete, sender=Payment)
+@receiver(pre_delete, sender=Expense)
+def remember_stored_rollup(sender, instance, raw=False, **kwargs):
+    """Stored ROLLUP_FIELDS values, taken while the row still holds them"""
+    instance._rollup_before = None if raw or instance._state.adding else instance._stored_rollup_values()
+
+
+@receiver(post_save, sender=Payment)
+def payment_saved(sender, instance, raw, **kwargs):
+    if raw:
+        return
+    before, after = instance._rollup_before, instance._rollup_values()
+    refresh_student_ledger(instance.student_id)
+    if before and before['student_id'] != instance.student_id:
+        refresh_student_ledger(before['student_id'])
+    if before != after:
+        record_payment_change(
+            before, after, student=instance.student if Payment.student.is_cached(instance) else None
+        )
+    instance._loaded_rollup = after
+
+
+@receiver(post_delete, sender=Payment)
+def payment_deleted(sender, instance, origin=None, **kwargs):
+    # Read from the values taken before the delete: student_id may have been deferred.
+    # The student still exists here (cascades delete payments first), so its cohort is found.
+    before = instance._rollup_before
+    record_payment_change(before, None)
+    if before and not deletes_students(origin):
+        refresh_student_ledger(before['student_id'])
+
+
+@receiver(post_save, sender=Expense)
+def expense_saved(sender, instance, raw, **kwargs):
+    if raw:
+        return
+    before, after = instance._rollup_before, instance._rollup_values()
+    if before != after:
+        record_expense_change(before, after)
+    instance._loaded_rollup = after
+
+
+@receiver(post_delete, sender=Expense)
+def expense_deleted(sender, instance, **kwargs):
+    record_expense_change(instance._rollup_before, None)
+
+
+@receiver(pre_save, sender=FeeStructure)
+def remember_fee_cohort(sender, instance, raw, **kwargs):
+    instance._stored_cohort = None
+    if not raw and not instance._state.adding:
+        instance._stored_cohort = FeeStructure._base_manager.filter(pk=instance.pk).values_list(
+            *COHORT
+        ).first()
+
+
+@receiver(post_save, sender=FeeStructure)
+def fee_structure_saved(sender, instance, raw, **kwargs):
+    """Re-price the ledgers of every student in the affected cohort(s)"""
+    if raw:
+        return
+    cohort = tuple(getattr(instance, name) for name in COHORT)
+    refresh_cohort_charges(*cohort)
+    previous = getattr(instance, '_stored_cohort', None)
+    if previous and previous != cohort:
+        refresh_cohort_charges(*previous)
+
+
+@receiver(post_delete, sender=FeeStructure)
+def fee_structure_deleted(sender, instance, **kwargs):
+    refresh_cohort_charges(*(getattr(instance, name) for name in COHORT))
@@ -0,0 +1,216 @@
+"""
+Bank statement import.
+Parses a CSV statement, matches each line to a student using dictionaries
+preloaded in a handful of queries, and bulk-creates the matched payments
+in one transaction.
+"""
+import csv
+import io
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from accounts.models import Student
+from .ledger import rebuild_ledgers
+from .models import ArchivedPayment, Payment
+from .rollups import apply_payment_rollups
+
+# Accepted header spellings for each statement column
+STATEMENT_COLUMNS = {
+    'date': ('date', 'transaction date', 'value date', 'payment_date'),
+    'amount': ('amount', 'credit', 'deposit', 'amount_paid'),
+    'transaction_id': ('transaction_id', 'transaction id', 'reference', 'ref', 'txn id'),
+    'student_id': ('student_id', 'student id'),
+    'description': ('description', 'narration', 'details', 'remarks'),
+    'fee_type': ('fee_type', 'fee type'),
+}
+
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%m/%d/%Y')
+
+TOKEN_PATTERN = re.compile(r'[A-Za-z0-9]+')
+
+
+class StatementError(ValueError):
+    """Raised when the statement file itself cannot be read"""
+
+
+def parse_statement_date(value):
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised date '{value}'")
+
+
+def read_statement(file):
+    """
+    Read a CSV statement into a list of dicts keyed by canonical column names
+
+    Args:
+        file: Uploaded file or any binary/text file object
+
+    Returns:
+        List of (line number, row dict)
+    """
+    content = file.read()
+    if isinstance(content, bytes):
+        try:
+            content = content.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise StatementError('Statement must be UTF-8 encoded CSV')
+
+    reader = csv.DictReader(io.StringIO(content))
+    if not reader.fieldnames:
+        raise StatementError('Statement is empty')
+
+    headers = {name.strip().lower(): name for name in reader.fieldnames if name}
+    mapping = {}
+    for column, aliases in STATEMENT_COLUMNS.items():
+        for alias in aliases:
+            if alias in headers:
+                mapping[column] = headers[alias]
+                break
+
+    missing = [column for column in ('date', 'amount', 'transaction_id') if column not in mapping]
+    if missing:
+        raise StatementError(f"Statement is missing column(s): {', '.join(missing)}")
+
+    # Line 1 is the header
+    return [
+        (line, {column: (row.get(source) or '').strip() for column, source in mapping.items()})
+        for line, row in enumerate(reader, start=2)
+    ]
+
+
+def import_bank_statement(file, payment_method='bank_transfer', dry_run=False):
+    """
+    Import payments from a bank statement
+
+    A line is matched by its student_id column; when that is empty, the
+    reference and description are searched for a known student ID.
+    Lines whose transaction_id is already recorded (or repeated in the file)
+    are skipped, so re-importing a statement is harmless.
+
+    Args:
+        file: CSV statement
+        payment_method: Method recorded on the created payments
+        dry_run: Validate and match without writing anything
+
+    Returns:
+        Dict with created/skipped/error counts and a per-line report
+    """
+    rows = read_statement(file)
+    valid_fee_types = {choice for choice, _ in Payment.FEE_TYPE_CHOICES}
+    amount_field = Payment._meta.get_field('amount_paid')
+    transaction_id_length = Payment._meta.get_field('transaction_id').max_length
+
+    # Preload every lookup the lines need: students by ID and already-used transaction IDs
+    candidate_ids = set()
+    for _, row in rows:
+        if row.get('student_id'):
+            candidate_ids.add(row['student_id'].upper())
+        else:
+            text = f"{row['transaction_id']} {row.get('description', '')}"
+            candidate_ids.update(token.upper() for token in TOKEN_PATTERN.findall(text))
+
+    students = dict(
+        Student.objects.filter(student_id__in=candidate_ids).values_list('student_id', 'id')
+    )
+    references = [row['transaction_id'] for _, row in rows if row['transaction_id']]
+    existing_transactions = set()
+    for model in (Payment, ArchivedPayment):
+        existing_transactions.update(
+            model.objects.filter(transaction_id__in=references).values_list('transaction_id', flat=True)
+        )
+
+    report = []
+    payments = []
+    for line, row in rows:
+        entry = {'line': line, 'transaction_id': row['transaction_id'], 'student_id': None}
+        report.append(entry)
+
+        if not row['transaction_id']:
+            entry.update(status='error', message='Missing transaction_id')
+            continue
+        if len(row['transaction_id']) > transaction_id_length:
+            entry.update(status='error', message=f'transaction_id is longer than {transaction_id_length} characters')
+            continue
+        if row['transaction_id'] in existing_transactions:
+            entry.update(status='skipped', message='Transaction already recorded')
+            continue
+
+        if row.get('student_id'):
+            student_key = row['student_id'].upper()
+            student_pk = students.get(student_key)
+        else:
+            text = f"{row['transaction_id']} {row.get('description', '')}"
+            matches = {token.upper() for token in TOKEN_PATTERN.findall(text)} & students.keys()
+            student_key = matches.pop() if len(matches) == 1 else None
+            student_pk = students.get(student_key)
+        if student_pk is None:
+            entry.update(status='error', message='No matching student')
+            continue
+        entry['student_id'] = student_key
+
+        try:
+            payment_date = parse_statement_date(row['date'])
+            amount = Decimal(row['amount'].replace(',', ''))
+            # Digits beyond the column's max_digits/decimal_places would fail the INSERT
+            amount_field.run_validators(amount)
+        except ValidationError as e:
+            entry.update(status='error', message=f"Invalid amount: {' '.join(e.messages)}")
+            continue
+        except (ValueError, InvalidOperation) as e:
+            entry.update(status='error', message=str(e) or 'Invalid amount')
+            continue
+        if amount <= 0:
+            entry.update(status='error', message='Amount must be positive')
+            continue
+
+        fee_type = row.get('fee_type') or None
+        if fee_type and fee_type not in valid_fee_types:
+            entry.update(status='error', message=f"Unknown fee type '{fee_type}'")
+            continue
+
+        existing_transactions.add(row['transaction_id'])
+        payments.append(Payment(
+            student_id=student_pk,
+            amount_paid=amount,
+            payment_date=payment_date,
+            payment_method=payment_method,
+            transaction_id=row['transaction_id'],
+            fee_type=fee_type,
+            remarks=row.get('description') or None
+        ))
+        entry.update(status='created', message='Imported' if not dry_run else 'Would import')
+
+    if payments and not dry_run:
+        try:
+            with transaction.atomic():
+                Payment.objects.bulk_create(payments, batch_size=500)
+                # bulk_create skips Payment.save: rebuild ledgers and add the payments to the rollup
+                rebuild_ledgers(Student.objects.filter(id__in={p.student_id for p in payments}))
+                apply_payment_rollups(Payment.objects.filter(
+                    transaction_id__in=[p.transaction_id for p in payments]
+                ))
+        except IntegrityError:
+            raise StatementError(
+                'Another import recorded some of these transactions at the same time; '
+                'no payments were created, please retry'
+            )
+
+    counts = {'created': 0, 'skipped': 0, 'error': 0}
+    for entry in report:
+        counts[entry['status']] += 1
+
+    return {
+        'dry_run': dry_run,
+        'created': counts['created'],
+        'skipped': counts['skipped'],
+        'errors': counts['error'],
+        'lines': report,
+    }
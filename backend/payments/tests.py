@@ -1,3 +1,547 @@
-from django.test import TestCase
+import csv
+import io
+from datetime import date
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import User, Student
+from config.exports import HAS_OPENPYXL
+from .ledger import rebuild_ledgers, reconcile_ledgers
+from .models import DailyFinancialRollup, Expense, FeeStructure, Payment, StudentLedger
+from .rollups import rebuild_rollups
+from .serializers import FeeStructureSerializer
+
+
+class PaymentStatisticsTests(TestCase):
+    """
+    Totals and the monthly breakdown of the statistics endpoint
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', role='ADMIN')
+        student = Student.objects.create(
+            user=User.objects.create(username='stats0', role='STUDENT'),
+            date_of_birth=date(2003, 1, 1), admission_date=date(2025, 1, 1),
+            course='BBA', intake='15th', semester='1st'
+        )
+        for day, amount in ((date(2025, 1, 31), '500'), (date(2025, 3, 1), '300'), (date(2025, 3, 31), '200')):
+            Payment.objects.create(student=student, amount_paid=Decimal(amount), payment_date=day)
+        Expense.objects.create(
+            expense_type='rent', amount=Decimal('150'), expense_date=date(2025, 1, 15), description='Rent'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_breakdown_by_calendar_month_with_empty_months(self):
+        response = self.client.get('/api/payments/payments/statistics/', {
+            'date_from': '2024-12', 'date_to': '2025-03'
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row['month'], row['revenue'], row['expenses']) for row in response.data['monthly_breakdown']],
+            [('December 2024', 0.0, 0.0), ('January 2025', 500.0, 150.0),
+             ('February 2025', 0.0, 0.0), ('March 2025', 500.0, 0.0)]
+        )
+        self.assertEqual(response.data['monthly_breakdown'][1]['profit'], 350.0)
+        self.assertEqual(Decimal(str(response.data['total_revenue'])), Decimal('1000'))
+        self.assertEqual(Decimal(str(response.data['net_profit'])), Decimal('850'))
+
+    def test_window_length(self):
+        response = self.client.get('/api/payments/payments/statistics/', {'months': 24})
+        self.assertEqual(len(response.data['monthly_breakdown']), 24)
+
+        for params in ({'months': 7}, {'date_from': '2025-04', 'date_to': '2025-01'}, {'date_to': '2025/01'}):
+            response = self.client.get('/api/payments/payments/statistics/', params)
+            self.assertEqual(response.status_code, 400, params)
+
+
+class StudentLedgerTests(TestCase):
+    """
+    The per-student fee ledger, its reconciliation and rebuild
+    """
+
+    def setUp(self):
+        self.fee = FeeStructure.objects.create(
+            course='BBA', intake='15th', semester='1st', fee_type='tuition_fee',
+            amount=Decimal('1000'), due_date=date(2025, 1, 31)
+        )
+        self.student = Student.objects.create(
+            user=User.objects.create(username='ledger0', role='STUDENT'),
+            date_of_birth=date(2003, 1, 1), admission_date=date(2025, 1, 1),
+            course='BBA', intake='15th', semester='1st'
+        )
+
+    def ledger(self):
+        return StudentLedger.objects.get(student=self.student)
+
+    def client_for_admin(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username='ledger-admin', role='ADMIN'))
+        return client
+
+    def test_payments_and_fees_update_balance(self):
+        payment = Payment.objects.create(
+            student=self.student, fee_structure=self.fee, amount_paid=Decimal('400'),
+            discount_amount=Decimal('50'), payment_date=date(2025, 1, 10)
+        )
+        self.assertEqual(
+            (self.ledger().total_charges, self.ledger().total_credits, self.ledger().balance),
+            (Decimal('1000'), Decimal('350'), Decimal('650'))
+        )
+        # Due on the payment's own fee structure; the ledger balance covers every fee
+        self.assertEqual(payment.calculate_due_amount(), Decimal('600'))
+        response = self.client_for_admin().get(f'/api/payments/payments/{payment.id}/')
+        self.assertEqual((response.data['due_amount'], response.data['student_balance']), (Decimal('600'), Decimal('650')))
+
+        FeeStructure.objects.create(
+            course='BBA', intake='15th', semester='1st', fee_type='exam_fee',
+            amount=Decimal('100'), due_date=date(2025, 2, 28)
+        )
+        self.assertEqual(self.ledger().balance, Decimal('750'))
+
+        payment.delete()
+        self.assertEqual(self.ledger().balance, Decimal('1100'))
+        self.assertEqual(reconcile_ledgers(), [])
+
+    def test_queryset_deletes_update_ledgers(self):
+        Payment.objects.create(student=self.student, amount_paid=Decimal('100'), payment_date=date(2025, 1, 10))
+
+        Payment.objects.all().delete()
+        self.assertEqual(self.ledger().total_credits, Decimal('0'))
+
+        FeeStructure.objects.filter(course='BBA').delete()
+        self.assertEqual(self.ledger().balance, Decimal('0'))
+        self.assertEqual(reconcile_ledgers(), [])
+
+    def test_deleting_student_user_cascades_cleanly(self):
+        Payment.objects.create(student=self.student, amount_paid=Decimal('100'), payment_date=date(2025, 1, 10))
+
+        self.student.user.delete()
+
+        self.assertFalse(Payment.objects.exists())
+        self.assertFalse(StudentLedger.objects.exists())
+
+    def test_cohort_change_reprices_ledger(self):
+        self.student.semester = '2nd'
+        self.student.save()
+
+        self.assertEqual(self.ledger().total_charges, Decimal('0'))
+
+    def test_saving_deferred_student_skips_repricing(self):
+        student = Student.objects.only('id', 'full_name').get(pk=self.student.pk)
+        student.full_name = 'Renamed'
+
+        with mock.patch('payments.ledger.refresh_student_ledger') as refresh:
+            student.save(update_fields=['full_name'])
+            student.save()
+        refresh.assert_not_called()
+
+    def test_reconcile_reports_and_rebuild_fixes_drift(self):
+        Payment.objects.create(student=self.student, amount_paid=Decimal('300'), payment_date=date(2025, 1, 10))
+        StudentLedger.objects.filter(student=self.student).update(balance=Decimal('1'))
+        other = Student.objects.create(
+            user=User.objects.create(username='ledger1', role='STUDENT'),
+            date_of_birth=date(2003, 1, 1), admission_date=date(2025, 1, 1),
+            course='BBA', intake='15th', semester='1st'
+        )
+        StudentLedger.objects.filter(student=other).delete()
+
+        mismatches = {m['student']: m for m in reconcile_ledgers()}
+        self.assertEqual(mismatches[self.student.id]['problem'], 'mismatch')
+        self.assertEqual(mismatches[self.student.id]['expected_balance'], Decimal('700'))
+        self.assertEqual(mismatches[other.id]['problem'], 'missing')
+
+        self.assertEqual(rebuild_ledgers(), 2)
+        self.assertEqual(reconcile_ledgers(), [])
+        self.assertEqual(self.ledger().balance, Decimal('700'))
+
+
+class FeeStructureListingTests(TestCase):
+    """
+    Collected totals annotated on fee structure listings
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', role='ADMIN')
+        cls.fees = [
+            FeeStructure.objects.create(
+                course='BBA', intake='15th', semester='1st', fee_type=fee_type,
+                amount=Decimal('500'), due_date=date(2025, 1, day)
+            )
+            for day, fee_type in ((10, 'tuition_fee'), (20, 'lab_fee'))
+        ]
+        students = [
+            Student.objects.create(
+                user=User.objects.create(username=f'fee{idx}', role='STUDENT'),
+                date_of_birth=date(2003, 1, 1), admission_date=date(2025, 1, 1),
+                course='BBA', intake='15th', semester='1st'
+            )
+            for idx in range(2)
+        ]
+        # The first student pays the tuition fee in two parts
+        for student, amount in ((students[0], '200'), (students[0], '300'), (students[1], '500')):
+            Payment.objects.create(
+                student=student, fee_structure=cls.fees[0], amount_paid=Decimal(amount),
+                payment_date=date(2025, 1, 5)
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_list_uses_fixed_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/payments/fee-structures/')
+
+        collected = {row['id']: (row['total_collected'], row['payer_count']) for row in response.data['results']}
+        self.assertEqual(collected[self.fees[0].id], (Decimal('1000.00'), 2))
+        self.assertEqual(collected[self.fees[1].id], (Decimal('0.00'), 0))
+
+    def test_unannotated_instances_fall_back_to_aggregates(self):
+        data = FeeStructureSerializer(FeeStructure.objects.get(pk=self.fees[0].pk)).data
+
+        self.assertEqual((data['total_collected'], data['payer_count']), (Decimal('1000.00'), 2))
+
+
+class FinancialRollupTests(TestCase):
+    """
+    Incremental rollup upkeep matches a full rebuild after every kind of write
+    """
+
+    def setUp(self):
+        self.student = Student.objects.create(
+            user=User.objects.create(username='rollup0', role='STUDENT'),
+            date_of_birth=date(2003, 1, 1), admission_date=date(2025, 1, 1),
+            course='BBA', intake='15th', semester='1st'
+        )
+
+    def stored_rollups(self):
+        return sorted(DailyFinancialRollup.objects.values_list(
+            'date', 'kind', 'course', 'intake', 'semester', 'fee_type', 'payment_method',
+            'expense_type', 'total_amount', 'total_discount', 'entry_count'
+        ))
+
+    def assertMatchesRebuild(self):
+        incremental = self.stored_rollups()
+        rebuild_rollups()
+        self.assertEqual(incremental, self.stored_rollups())
+
+    def test_payment_create_update_and_delete(self):
+        first = Payment.objects.create(
+            student=self.student, amount_paid=Decimal('300'), discount_amount=Decimal('20'),
+            fee_type='tuition_fee', payment_date=date(2025, 1, 10)
+        )
+        second = Payment.objects.create(
+            student=self.student, amount_paid=Decimal('200'), fee_type='tuition_fee',
+            payment_date=date(2025, 1, 10)
+        )
+        row = DailyFinancialRollup.objects.get(kind='payment')
+        self.assertEqual((row.total_amount, row.total_discount, row.entry_count), (Decimal('500'), Decimal('20'), 2))
+
+        first = Payment.objects.get(pk=first.pk)
+        first.amount_paid = Decimal('350')
+        first.payment_method = 'online'
+        first.save()
+        self.assertMatchesRebuild()
+
+        second.delete()
+        self.assertMatchesRebuild()
+        first.delete()
+        self.assertFalse(DailyFinancialRollup.objects.exists())
+
+    def test_payment_date_change_moves_it_between_days(self):
+        payment = Payment.objects.create(
+            student=self.student, amount_paid=Decimal('300'), payment_date=date(2025, 1, 10)
+        )
+        Payment.objects.create(student=self.student, amount_paid=Decimal('100'), payment_date=date(2025, 1, 10))
+
+        payment.payment_date = date(2025, 2, 1)
+        payment.save()
+
+        self.assertEqual(
+            dict(DailyFinancialRollup.objects.values_list('date', 'total_amount')),
+            {date(2025, 1, 10): Decimal('100'), date(2025, 2, 1): Decimal('300')}
+        )
+        self.assertMatchesRebuild()
+
+    def test_unrelated_edit_leaves_rollup_alone(self):
+        payment = Payment.objects.create(
+            student=self.student, amount_paid=Decimal('300'), payment_date=date(2025, 1, 10)
+        )
+        payment = Payment.objects.get(pk=payment.pk)
+        payment.remarks = 'Paid at the counter'
+
+        with mock.patch('payments.rollups.apply_rollup_delta') as apply:
+            payment.save()
+        apply.assert_not_called()
+
+    def test_expense_changes(self):
+        expense = Expense.objects.create(
+            expense_type='rent', amount=Decimal('150'), expense_date=date(2025, 1, 15), description='Rent'
+        )
+        expense.expense_type = 'utility'
+        expense.expense_date = date(2025, 1, 16)
+        expense.save()
+        self.assertMatchesRebuild()
+
+        expense.delete()
+        self.assertFalse(DailyFinancialRollup.objects.exists())
+
+    def test_cascade_and_queryset_deletes(self):
+        Payment.objects.create(student=self.student, amount_paid=Decimal('100'), payment_date=date(2025, 1, 10))
+        Payment.objects.only('id').get().delete()
+        self.assertFalse(DailyFinancialRollup.objects.exists())
+
+        for amount in ('100', '50'):
+            Payment.objects.create(student=self.student, amount_paid=Decimal(amount), payment_date=date(2025, 1, 10))
+            Expense.objects.create(
+                expense_type='rent', amount=Decimal(amount), expense_date=date(2025, 1, 15), description='Rent'
+            )
+        Expense.objects.all().delete()
+        self.assertMatchesRebuild()
+
+        admin = User.objects.create(username='rollup-admin', role='ADMIN')
+        client = APIClient()
+        client.force_authenticate(admin)
+        response = client.delete(f'/api/accounts/users/{self.student.user_id}/')
+
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Payment.objects.exists())
+        self.assertFalse(DailyFinancialRollup.objects.exists())
+
+    def test_cohort_change_rekeys_payments(self):
+        Payment.objects.create(student=self.student, amount_paid=Decimal('300'), payment_date=date(2025, 1, 10))
+
+        self.student.semester = '2nd'
+        self.student.save()
+
+        self.assertEqual(DailyFinancialRollup.objects.get().semester, '2nd')
+        self.assertMatchesRebuild()
+
+
+class ExportTests(TestCase):
+    """
+    Filtered payment and expense downloads
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', role='ADMIN')
+        student = Student.objects.create(
+            user=User.objects.create(username='export0', role='STUDENT', first_name='Nadia', last_name='Islam'),
+            date_of_birth=date(2003, 1, 1), admission_date=date(2025, 1, 1),
+            course='BBA', intake='15th', semester='1st'
+        )
+        fee = FeeStructure.objects.create(
+            course='BBA', intake='15th', semester='1st', fee_type='exam_fee',
+            amount=Decimal('500'), due_date=date(2025, 1, 31)
+        )
+        for day, method, fee_type in ((5, 'cash', 'tuition_fee'), (6, 'online', None), (7, 'cash', None)):
+            Payment.objects.create(
+                student=student, amount_paid=Decimal('100'), payment_method=method,
+                payment_date=date(2025, 1, day), fee_type=fee_type, fee_structure=fee if day == 7 else None
+            )
+        Expense.objects.create(
+            expense_type='rent', amount=Decimal('150'), expense_date=date(2025, 1, 15),
+            description='Rent', created_by=cls.admin
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def rows(self, response):
+        return list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+    def test_payment_export_follows_filters_and_ordering(self):
+        response = self.client.get('/api/payments/payments/export/', {
+            'payment_method': 'cash', 'ordering': 'payment_date'
+        })
+
+        self.assertEqual(response.status_code, 200)
+        rows = self.rows(response)
+        self.assertEqual(rows[0][:3], ['Payment ID', 'Payment Date', 'Student ID'])
+        self.assertEqual([row[1] for row in rows[1:]], ['2025-01-05', '2025-01-07'])
+        self.assertEqual(rows[1][3:5], ['Nadia', 'Islam'])
+        # Empty values are written as blanks, not "None"
+        self.assertEqual(rows[1][12], '')
+        # Own fee type first, else the linked fee structure's
+        self.assertEqual([row[8] for row in rows[1:]], ['tuition_fee', 'exam_fee'])
+
+    def test_expense_export(self):
+        rows = self.rows(self.client.get('/api/payments/expenses/export/'))
+
+        self.assertEqual(rows[1][2:5], ['rent', '150.00', ''])
+        self.assertEqual(rows[1][6], 'admin')
+
+    @skipUnless(HAS_OPENPYXL, 'openpyxl is not installed')
+    def test_xlsx_export(self):
+        from openpyxl import load_workbook
+
+        response = self.client.get('/api/payments/payments/export/', {'file_format': 'xlsx'})
+
+        sheet = load_workbook(io.BytesIO(b''.join(response.streaming_content))).active
+        self.assertEqual(sheet.title, 'Payments')
+        self.assertEqual(sheet.max_row, 4)
+
+    def test_unknown_format(self):
+        response = self.client.get('/api/payments/payments/export/', {'file_format': 'pdf'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ReceiptTests(TestCase):
+    """
+    Receipt PDFs, their cache and ETag validators
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create(username='admin', role='ADMIN')
+        self.user = User.objects.create(username='receipt0', role='STUDENT', first_name='Tania', last_name='Akter')
+        self.student = Student.objects.create(
+            user=self.user, date_of_birth=date(2003, 1, 1), admission_date=date(2025, 1, 1),
+            course='BBA', intake='15th', semester='1st'
+        )
+        self.payment = Payment.objects.create(
+            student=self.student, amount_paid=Decimal('500'), payment_date=date(2025, 1, 10)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def get_receipt(self, **headers):
+        return self.client.get(f'/api/payments/payments/{self.payment.id}/receipt/', headers=headers)
+
+    def test_etag_revalidation(self):
+        response = self.get_receipt()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        # Unversioned URL: clients must revalidate rather than keep the PDF
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+        response = self.get_receipt(**{'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_cached_pdf_is_reused_until_printed_details_change(self):
+        with mock.patch('payments.utils.build_receipt_pdf', return_value=b'%PDF-') as build:
+            first = self.get_receipt()['ETag']
+            self.assertEqual(self.get_receipt()['ETag'], first)
+            self.assertEqual(build.call_count, 1)
+
+            self.user.last_name = 'Rahman'
+            self.user.save()
+            renamed = self.get_receipt()['ETag']
+            self.student.semester = '2nd'
+            self.student.save()
+            moved = self.get_receipt()['ETag']
+
+        self.assertEqual(len({first, renamed, moved}), 3)
+        self.assertEqual(build.call_count, 3)
+
+    @override_settings(RECEIPT_CACHE_SECONDS=600)
+    def test_cached_pdfs_expire(self):
+        with mock.patch('payments.utils.cache') as receipt_cache:
+            receipt_cache.get.return_value = None
+            self.get_receipt()
+            self.client.get('/api/payments/payments/daily_receipts/', {'date': '2025-01-10'})
+
+        self.assertEqual([call.args[2] for call in receipt_cache.set.call_args_list], [600, 600])
+
+    def test_daily_receipts_change_with_student_edits(self):
+        params = {'date': '2025-01-10'}
+        response = self.client.get('/api/payments/payments/daily_receipts/', params)
+        self.assertEqual(response['X-Receipt-Count'], '1')
+
+        self.user.first_name = 'Tanjila'
+        self.user.save()
+
+        self.assertNotEqual(
+            self.client.get('/api/payments/payments/daily_receipts/', params)['ETag'], response['ETag']
+        )
+        response = self.client.get('/api/payments/payments/daily_receipts/', {'date': '2025-01-11'})
+        self.assertEqual(response.status_code, 404)
+
+
+class StatementImportTests(TestCase):
+    """
+    Importing payments from CSV bank statements
+    """
+
+    def setUp(self):
+        self.admin = User.objects.create(username='admin', role='ADMIN')
+        self.students = [
+            Student.objects.create(
+                user=User.objects.create(username=f'statement{idx}', role='STUDENT'),
+                date_of_birth=date(2003, 1, 1), admission_date=date(2025, 1, 1),
+                course='BBA', intake='15th', semester='1st'
+            )
+            for idx in range(2)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def upload(self, lines, **data):
+        statement = SimpleUploadedFile('statement.csv', '\n'.join(lines).encode(), content_type='text/csv')
+        return self.client.post(
+            '/api/payments/payments/import_statement/', {'file': statement, **data}, format='multipart'
+        )
+
+    def statement(self):
+        first, second = (student.student_id for student in self.students)
+        return [
+            'Date,Amount,Reference,Student ID,Narration',
+            f'10/01/2025,"1,200.00",TXN-1,{first},Tuition',
+            f'11/01/2025,300,TXN-2,,Fee from {second}',
+            '12/01/2025,100,TXN-3,,Unknown sender',
+            f'12/01/2025,123456789012,TXN-4,{first},Typo',
+        ]
+
+    def test_import_matches_students_and_reports_bad_lines(self):
+        response = self.upload(self.statement())
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['errors']), (2, 2))
+        statuses = {line['transaction_id']: line for line in response.data['lines']}
+        self.assertEqual(statuses['TXN-2']['student_id'], self.students[1].student_id)
+        self.assertEqual(statuses['TXN-3']['message'], 'No matching student')
+        self.assertTrue(statuses['TXN-4']['message'].startswith('Invalid amount'))
+        self.assertEqual(Payment.objects.get(transaction_id='TXN-1').amount_paid, Decimal('1200'))
+        self.assertEqual(StudentLedger.objects.get(student=self.students[1]).total_credits, Decimal('300'))
+        self.assertEqual(
+            DailyFinancialRollup.objects.filter(kind='payment').aggregate(total=Sum('total_amount'))['total'],
+            Decimal('1500')
+        )
+
+    def test_reimport_skips_recorded_transactions(self):
+        self.upload(self.statement())
+        response = self.upload(self.statement())
+
+        self.assertEqual((response.status_code, response.data['created'], response.data['skipped']), (200, 0, 2))
+        self.assertEqual(Payment.objects.count(), 2)
+
+    def test_dry_run_writes_nothing(self):
+        response = self.upload(self.statement(), dry_run='true')
+
+        self.assertEqual(response.data['created'], 2)
+        self.assertFalse(Payment.objects.exists())
+
+    def test_only_admins_can_import(self):
+        self.client.force_authenticate(self.students[0].user)
+        response = self.upload(self.statement())
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Payment.objects.exists())
+
+    def test_unreadable_statements(self):
+        self.assertEqual(self.upload(['Date,Amount', '10/01/2025,100']).status_code, 400)
+        self.assertEqual(self.upload(['Date,Amount,Reference'], payment_method='cheque').status_code, 400)
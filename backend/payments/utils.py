@@ -0,0 +1,256 @@
+"""
+Utility functions for payments app
+Includes PDF payment receipt generation
+"""
+import hashlib
+from io import BytesIO
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A5
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+from reportlab.lib.enums import TA_CENTER
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Payment
+
+# Receipts are keyed by the payment's updated_at and the printed student details,
+# so a cached PDF never goes stale; superseded versions expire after
+# RECEIPT_CACHE_SECONDS instead of staying in the cache
+DEFAULT_RECEIPT_CACHE_SECONDS = 24 * 60 * 60
+
+# Student details printed on a receipt, as lookups from the payment
+RECEIPT_STUDENT_LOOKUPS = (
+    'student__student_id', 'student__user__first_name', 'student__user__last_name',
+    'student__user__username', 'student__course', 'student__intake', 'student__semester',
+)
+
+
+def receipt_cache_timeout():
+    return getattr(settings, 'RECEIPT_CACHE_SECONDS', DEFAULT_RECEIPT_CACHE_SECONDS)
+
+
+def receipt_number(payment):
+    """Human-readable receipt number for a payment"""
+    return f"RCT-{payment.id:06d}"
+
+
+def receipt_digest(values):
+    """Short stable digest of the values a receipt is rendered from"""
+    return hashlib.sha256(repr(values).encode()).hexdigest()[:16]
+
+
+def receipt_version(payment):
+    """
+    Version of one receipt; changes whenever the payment is edited or the
+    student's name, ID or course/intake/semester changes
+    """
+    student = payment.student
+    printed = (
+        student.student_id, student.user.first_name, student.user.last_name,
+        student.user.username, student.course, student.intake, student.semester
+    )
+    return f"{payment.id}-{payment.updated_at.timestamp():.6f}-{receipt_digest(printed)}"
+
+
+def receipt_cache_key(payment):
+    """Cache key for one receipt"""
+    return f"payment_receipt:{receipt_version(payment)}"
+
+
+def receipt_styles():
+    """Paragraph styles shared by single and batch receipts"""
+    styles = getSampleStyleSheet()
+    return {
+        'title': ParagraphStyle(
+            'ReceiptTitle',
+            parent=styles['Heading1'],
+            fontSize=16,
+            textColor=colors.HexColor('#1a365d'),
+            spaceAfter=4,
+            alignment=TA_CENTER,
+            fontName='Helvetica-Bold'
+        ),
+        'subtitle': ParagraphStyle(
+            'ReceiptSubtitle',
+            parent=styles['Normal'],
+            fontSize=11,
+            textColor=colors.HexColor('#2d3748'),
+            spaceAfter=8,
+            alignment=TA_CENTER,
+            fontName='Helvetica'
+        ),
+        'footer': ParagraphStyle(
+            'ReceiptFooter',
+            parent=styles['Normal'],
+            fontSize=8,
+            textColor=colors.HexColor('#718096'),
+            alignment=TA_CENTER
+        ),
+    }
+
+
+def receipt_elements(payment, styles):
+    """
+    Build the flowables for one receipt
+
+    Args:
+        payment: Payment with student and student.user loaded
+        styles: Dict returned by receipt_styles()
+
+    Returns:
+        List of ReportLab flowables
+    """
+    student = payment.student
+    elements = [
+        Paragraph("IGMIS University", styles['title']),
+        Paragraph("Payment Receipt", styles['subtitle']),
+    ]
+
+    info_data = [
+        ['Receipt No:', receipt_number(payment)],
+        ['Date:', payment.payment_date.strftime('%B %d, %Y')],
+        ['Student ID:', student.student_id],
+        ['Name:', student.user.get_full_name()],
+        ['Course:', f"{student.course} / {student.intake} / {student.semester}"],
+    ]
+    info_table = Table(info_data, colWidths=[1.2*inch, 3.4*inch])
+    info_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#e2e8f0')),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#2d3748')),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+        ('TOPPADDING', (0, 0), (-1, -1), 4),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#cbd5e0'))
+    ]))
+    elements.append(info_table)
+    elements.append(Spacer(1, 0.15*inch))
+
+    net_amount = payment.amount_paid - payment.discount_amount
+    amount_data = [
+        ['Description', 'Amount'],
+        [payment.get_fee_type_display() if payment.fee_type else 'Fee Payment', f"{payment.amount_paid:,.2f}"],
+        ['Discount', f"-{payment.discount_amount:,.2f}"],
+        ['NET RECEIVED', f"{net_amount:,.2f}"],
+    ]
+    amount_table = Table(amount_data, colWidths=[3.2*inch, 1.4*inch])
+    amount_table.setStyle(TableStyle([
+        # Header row
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c5282')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+
+        # Data rows
+        ('BACKGROUND', (0, 1), (-1, -2), colors.beige),
+        ('TEXTCOLOR', (0, 1), (-1, -2), colors.HexColor('#2d3748')),
+        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+
+        # Total row
+        ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#4299e1')),
+        ('TEXTCOLOR', (0, -1), (-1, -1), colors.whitesmoke),
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+        ('TOPPADDING', (0, 0), (-1, -1), 5),
+        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#718096'))
+    ]))
+    elements.append(amount_table)
+    elements.append(Spacer(1, 0.1*inch))
+
+    method_data = [
+        ['Payment Method:', payment.get_payment_method_display()],
+        ['Transaction ID:', payment.transaction_id or '-'],
+    ]
+    if payment.remarks:
+        method_data.append(['Remarks:', payment.remarks[:60]])
+    method_table = Table(method_data, colWidths=[1.2*inch, 3.4*inch])
+    method_table.setStyle(TableStyle([
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#2d3748')),
+    ]))
+    elements.append(method_table)
+    elements.append(Spacer(1, 0.2*inch))
+
+    # Stamp the record version rather than the render time so reprints are identical
+    elements.append(Paragraph(
+        f"Recorded: {payment.updated_at.strftime('%B %d, %Y %I:%M %p')} | Computer-generated receipt",
+        styles['footer']
+    ))
+    return elements
+
+
+def build_receipt_pdf(payments):
+    """Render one receipt per page into a single PDF and return its bytes"""
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A5, rightMargin=20, leftMargin=20, topMargin=20, bottomMargin=20)
+    styles = receipt_styles()
+
+    elements = []
+    for payment in payments:
+        if elements:
+            elements.append(PageBreak())
+        elements.extend(receipt_elements(payment, styles))
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def generate_payment_receipt(payment_id):
+    """
+    Generate (or fetch from cache) the PDF receipt for one payment
+
+    Args:
+        payment_id: ID of the payment
+
+    Returns:
+        Tuple of (payment, pdf bytes)
+    """
+    try:
+        payment = Payment.objects.select_related('student', 'student__user').get(id=payment_id)
+    except Payment.DoesNotExist:
+        raise ValueError("Payment not found")
+
+    key = receipt_cache_key(payment)
+    pdf = cache.get(key)
+    if pdf is None:
+        pdf = build_receipt_pdf([payment])
+        cache.set(key, pdf, receipt_cache_timeout())
+    return payment, pdf
+
+
+def generate_daily_receipts(day, payment_method=None):
+    """
+    Generate (or fetch from cache) one PDF holding every receipt for a day
+
+    The cache key is a digest of every receipt's payment id, updated_at and
+    printed student details (one narrow query), so adding, editing or deleting
+    a payment that day, or editing one of its students, produces a new entry.
+
+    Args:
+        day: Date of the payments
+        payment_method: Restrict to one payment method (optional)
+
+    Returns:
+        Tuple of (receipt count, pdf bytes, version string)
+    """
+    payments = Payment.objects.filter(payment_date=day)
+    if payment_method:
+        payments = payments.filter(payment_method=payment_method)
+
+    printed = list(payments.order_by('id').values_list('id', 'updated_at', *RECEIPT_STUDENT_LOOKUPS))
+    if not printed:
+        raise ValueError("No payments found for this date")
+
+    version_tag = f"{day.isoformat()}-{payment_method or 'all'}-{len(printed)}-{receipt_digest(printed)}"
+    key = f"payment_receipts:{version_tag}"
+    pdf = cache.get(key)
+    if pdf is None:
+        pdf = build_receipt_pdf(
+            payments.select_related('student', 'student__user').order_by('id').iterator(chunk_size=500)
+        )
+        cache.set(key, pdf, receipt_cache_timeout())
+    return len(printed), pdf, version_tag
@@ -2,22 +2,127 @@ from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.parsers import MultiPartParser, FormParser
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Sum, Count, Q
+from django.db.models import Sum, Count, Q, DecimalField, Value
+from django.db.models.functions import Coalesce, NullIf, TruncMonth
+from django.http import HttpResponse, HttpResponseNotModified
 from datetime import datetime, timedelta
+from decimal import Decimal
 
-from .models import FeeStructure, Payment, Expense
+from .models import FeeStructure, Payment, Expense, StudentLedger, DailyFinancialRollup
 from .serializers import (
     FeeStructureSerializer, PaymentSerializer, PaymentDetailSerializer,
     ExpenseSerializer, PaymentStatisticsSerializer
 )
+from .utils import generate_payment_receipt, generate_daily_receipts, receipt_version
+from .statements import StatementError, import_bank_statement
+from config.exports import EXPORT_FORMATS, export_response
+
+
+BREAKDOWN_WINDOWS = (12, 24, 36)
+
+EXPORT_CHUNK_SIZE = 2000
+
+# (column header, queryset lookup) pairs for the export actions
+PAYMENT_EXPORT_COLUMNS = (
+    ('Payment ID', 'id'),
+    ('Payment Date', 'payment_date'),
+    ('Student ID', 'student__student_id'),
+    ('First Name', 'student__user__first_name'),
+    ('Last Name', 'student__user__last_name'),
+    ('Course', 'student__course'),
+    ('Intake', 'student__intake'),
+    ('Semester', 'student__semester'),
+    # Payments linked to a fee structure may leave their own fee_type empty
+    ('Fee Type', Coalesce(NullIf('fee_type', Value('')), 'fee_structure__fee_type')),
+    ('Amount Paid', 'amount_paid'),
+    ('Discount', 'discount_amount'),
+    ('Payment Method', 'payment_method'),
+    ('Transaction ID', 'transaction_id'),
+    ('Regularity', 'payment_regularity'),
+    ('Remarks', 'remarks'),
+)
+
+EXPENSE_EXPORT_COLUMNS = (
+    ('Expense ID', 'id'),
+    ('Expense Date', 'expense_date'),
+    ('Expense Type', 'expense_type'),
+    ('Amount', 'amount'),
+    ('Paid To', 'paid_to'),
+    ('Description', 'description'),
+    ('Created By', 'created_by__username'),
+)
+
+
+def month_range(start, end):
+    """Yield the first day of every month from start to end (inclusive)"""
+    current = start.replace(day=1)
+    while current <= end:
+        yield current
+        current = (current + timedelta(days=32)).replace(day=1)
+
+
+def iter_export_rows(queryset, columns):
+    """
+    Yield a header row followed by one row per object.
+    Columns are field lookups or expressions. Reads plain value tuples through a chunked iterator (a server-side cursor
+    on PostgreSQL), so no model instances or full result lists are built.
+    """
+    yield [header for header, _ in columns]
+    lookups = [lookup for _, lookup in columns]
+    for row in queryset.values_list(*lookups).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield ['' if value is None else value for value in row]
+
+
+def receipt_response(request, pdf, filename, etag):
+    """
+    Return a receipt PDF with validators that let clients reuse their copy.
+    The URL carries no version, so clients revalidate every time (no-cache)
+    and get a 304 while the ETag, which follows the payment versions, matches.
+    """
+    etag = f'"{etag}"'
+    if request.headers.get('If-None-Match') == etag:
+        return HttpResponseNotModified(headers={'ETag': etag})
+    
+    response = HttpResponse(pdf, content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.pdf"'
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def export_queryset(request, queryset, columns, filename, sheet_title):
+    """Build a CSV/XLSX export response for an already-filtered queryset"""
+    file_format = request.query_params.get('file_format', 'csv')
+    if file_format not in EXPORT_FORMATS:
+        return Response(
+            {'error': 'file_format must be csv or xlsx'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        return export_response(
+            iter_export_rows(queryset, columns),
+            f'{filename}_{datetime.now():%Y%m%d}',
+            file_format,
+            sheet_title=sheet_title
+        )
+    except ValueError as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
 
 class FeeStructureViewSet(viewsets.ModelViewSet):
     """
     ViewSet for FeeStructure model CRUD operations
     """
-    queryset = FeeStructure.objects.all()
+    queryset = FeeStructure.objects.annotate(
+        collected_total=Coalesce(Sum('payments__amount_paid'), Value(Decimal('0.00')), output_field=DecimalField(max_digits=15, decimal_places=2)),
+        collected_payer_count=Count('payments__student', distinct=True)
+    )
     serializer_class = FeeStructureSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -35,6 +140,7 @@ class PaymentViewSet(viewsets.ModelViewSet):
         'student', 'student__user', 'fee_structure'
     ).all()
     permission_classes = [IsAuthenticated]
+    authenticate_from_db = {'import_statement'}
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['student', 'fee_structure', 'payment_method', 'payment_date']
     search_fields = [
@@ -44,6 +150,12 @@ class PaymentViewSet(viewsets.ModelViewSet):
     ordering_fields = ['payment_date', 'amount_paid']
     ordering = ['-payment_date']
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            queryset = queryset.select_related('student__ledger')
+        return queryset
+    
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return PaymentDetailSerializer
@@ -61,60 +173,84 @@ class PaymentViewSet(viewsets.ModelViewSet):
         - Total expenses
         - Net profit
         - Pending payments
-        - Monthly breakdown
+        - Monthly breakdown (months=12|24|36, or date_from/date_to as YYYY-MM)
         """
-        # Calculate total revenue
-        total_revenue = Payment.objects.aggregate(
-            total=Sum('amount_paid')
-        )['total'] or 0
-        
-        # Calculate total expenses
-        total_expenses = Expense.objects.aggregate(
-            total=Sum('amount')
-        )['total'] or 0
+        # Revenue and expense totals from the daily rollup
+        totals = DailyFinancialRollup.objects.aggregate(
+            revenue=Sum('total_amount', filter=Q(kind='payment')),
+            expenses=Sum('total_amount', filter=Q(kind='expense'))
+        )
+        total_revenue = totals['revenue'] or 0
+        total_expenses = totals['expenses'] or 0
         
         # Net profit
         net_profit = total_revenue - total_expenses
         
-        # Calculate pending payments (total fee structure amount - total collected)
+        # Pending payments: outstanding balances from the student ledgers
         from accounts.models import Student
         total_students = Student.objects.count()
         
-        total_fee = FeeStructure.objects.aggregate(
-            total=Sum('amount')
+        pending_payments = StudentLedger.objects.filter(balance__gt=0).aggregate(
+            total=Sum('balance')
         )['total'] or 0
         
-        pending_payments = total_fee - total_revenue
+        # Monthly breakdown: one grouped query over the daily rollup
+        today = datetime.now().date()
+        date_from = request.query_params.get('date_from')
+        date_to = request.query_params.get('date_to')
+        
+        if date_from or date_to:
+            try:
+                end_month = datetime.strptime(date_to, '%Y-%m').date() if date_to else today.replace(day=1)
+                start_month = datetime.strptime(date_from, '%Y-%m').date() if date_from else end_month
+            except ValueError:
+                return Response(
+                    {'error': 'Invalid date format. Use YYYY-MM'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if start_month > end_month:
+                return Response(
+                    {'error': 'date_from must not be after date_to'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        else:
+            try:
+                months = int(request.query_params.get('months', 12))
+            except ValueError:
+                months = None
+            if months not in BREAKDOWN_WINDOWS:
+                return Response(
+                    {'error': f'months must be one of {", ".join(str(m) for m in BREAKDOWN_WINDOWS)}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            end_month = today.replace(day=1)
+            start_month = end_month
+            for _ in range(months - 1):
+                start_month = (start_month - timedelta(days=1)).replace(day=1)
+        
+        window_end = (end_month + timedelta(days=32)).replace(day=1)
+        
+        revenue_by_month = {}
+        expenses_by_month = {}
+        for row in DailyFinancialRollup.objects.filter(
+            date__gte=start_month, date__lt=window_end
+        ).annotate(month=TruncMonth('date')).values('month', 'kind').annotate(
+            total=Sum('total_amount')
+        ).order_by():
+            target = revenue_by_month if row['kind'] == 'payment' else expenses_by_month
+            target[row['month']] = row['total']
         
-        # Monthly breakdown for last 12 months
         monthly_breakdown = []
-        today = datetime.now()
-        
-        for i in range(12):
-            month_date = today - timedelta(days=30 * i)
-            month_start = month_date.replace(day=1)
-            
-            # Calculate revenue for this month
-            month_revenue = Payment.objects.filter(
-                payment_date__year=month_date.year,
-                payment_date__month=month_date.month
-            ).aggregate(total=Sum('amount_paid'))['total'] or 0
-            
-            # Calculate expenses for this month
-            month_expenses = Expense.objects.filter(
-                expense_date__year=month_date.year,
-                expense_date__month=month_date.month
-            ).aggregate(total=Sum('amount'))['total'] or 0
-            
+        for month_start in month_range(start_month, end_month):
+            month_revenue = revenue_by_month.get(month_start) or 0
+            month_expenses = expenses_by_month.get(month_start) or 0
             monthly_breakdown.append({
-                'month': month_date.strftime('%B %Y'),
+                'month': month_start.strftime('%B %Y'),
                 'revenue': float(month_revenue),
                 'expenses': float(month_expenses),
                 'profit': float(month_revenue - month_expenses)
             })
         
-        monthly_breakdown.reverse()
-        
         data = {
             'total_revenue': total_revenue,
             'total_expenses': total_expenses,
@@ -157,6 +293,105 @@ class PaymentViewSet(viewsets.ModelViewSet):
         payments = self.queryset.filter(student__id=student_id)
         serializer = self.get_serializer(payments, many=True)
         return Response(serializer.data)
+    
+    @action(detail=True, methods=['get'])
+    def receipt(self, request, pk=None):
+        """Download the PDF receipt for one payment"""
+        try:
+            payment, pdf = generate_payment_receipt(pk)
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        return receipt_response(request, pdf, f'receipt_{payment.id}', receipt_version(payment))
+    
+    @action(detail=False, methods=['get'])
+    def daily_receipts(self, request):
+        """
+        Download every receipt for one day as a single PDF (one receipt per page)
+        Query params: date (YYYY-MM-DD, default today), payment_method (optional)
+        """
+        date_str = request.query_params.get('date')
+        payment_method = request.query_params.get('payment_method')
+        
+        try:
+            day = datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else datetime.now().date()
+        except ValueError:
+            return Response(
+                {'error': 'Invalid date format. Use YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            count, pdf, version = generate_daily_receipts(day, payment_method)
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        response = receipt_response(request, pdf, f'receipts_{day}', version)
+        response['X-Receipt-Count'] = str(count)
+        return response
+    
+    @action(detail=False, methods=['post'], parser_classes=[MultiPartParser, FormParser])
+    def import_statement(self, request):
+        """
+        Import payments from a CSV bank statement.
+        Form fields: file (required; columns date, amount, transaction_id and
+        optionally student_id, description, fee_type), payment_method
+        (default bank_transfer), dry_run (true/false)
+        """
+        if getattr(request.user, 'role', None) != 'ADMIN':
+            return Response(
+                {'error': 'Only administrators can import statements'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        statement = request.FILES.get('file')
+        payment_method = request.data.get('payment_method', 'bank_transfer')
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+        
+        if not statement:
+            return Response(
+                {'error': 'file is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if payment_method not in dict(Payment.PAYMENT_METHOD_CHOICES):
+            return Response(
+                {'error': f'Invalid payment_method: {payment_method}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            report = import_bank_statement(statement, payment_method, dry_run=dry_run)
+        except StatementError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response(
+            report,
+            status=status.HTTP_201_CREATED if report['created'] and not dry_run else status.HTTP_200_OK
+        )
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Download every payment matching the list filters, search and ordering.
+        Query params: any list filter, search, ordering, file_format (csv|xlsx)
+        """
+        return export_queryset(
+            request,
+            self.filter_queryset(self.get_queryset()),
+            PAYMENT_EXPORT_COLUMNS,
+            'payments',
+            'Payments'
+        )
 
 
 class ExpenseViewSet(viewsets.ModelViewSet):
@@ -179,9 +414,11 @@ class ExpenseViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def summary(self, request):
         """Get expense summary by type"""
-        summary = Expense.objects.values('expense_type').annotate(
-            total=Sum('amount'),
-            count=Count('id')
+        summary = DailyFinancialRollup.objects.filter(kind='expense').values(
+            'expense_type'
+        ).annotate(
+            total=Sum('total_amount'),
+            count=Sum('entry_count')
         ).order_by('-total')
         
         return Response(summary)
@@ -193,21 +430,36 @@ class ExpenseViewSet(viewsets.ModelViewSet):
         month = request.query_params.get('month', datetime.now().month)
         year = request.query_params.get('year', datetime.now().year)
         
-        monthly_expenses = Expense.objects.filter(
-            expense_date__year=year,
-            expense_date__month=month
+        monthly_expenses = DailyFinancialRollup.objects.filter(
+            kind='expense',
+            date__year=year,
+            date__month=month
         )
         
         # Group by expense type
         summary = monthly_expenses.values('expense_type').annotate(
-            total=Sum('amount'),
-            count=Count('id')
-        )
+            total=Sum('total_amount'),
+            count=Sum('entry_count')
+        ).order_by('expense_type')
         
-        total = monthly_expenses.aggregate(total=Sum('amount'))['total'] or 0
+        total = sum((row['total'] for row in summary), Decimal('0'))
         
         return Response({
             'month': f'{month}/{year}',
             'total_expenses': total,
             'breakdown': summary
         })
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Download every expense matching the list filters, search and ordering.
+        Query params: any list filter, search, ordering, file_format (csv|xlsx)
+        """
+        return export_queryset(
+            request,
+            self.filter_queryset(self.get_queryset()),
+            EXPENSE_EXPORT_COLUMNS,
+            'expenses',
+            'Expenses'
+        )
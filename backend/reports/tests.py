@@ -1,3 +1,176 @@
+from datetime import date
+from decimal import Decimal
+
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from accounts.models import User, Student
+from payments.models import FeeStructure, Payment
+
+
+class DuesReportTests(TestCase):
+    """
+    The per-student dues report
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', role='ADMIN')
+        FeeStructure.objects.create(
+            course='BBA', intake='15th', semester='1st', fee_type='tuition_fee',
+            amount=Decimal('1000'), due_date=date(2025, 1, 31)
+        )
+        FeeStructure.objects.create(
+            course='BBA', intake='15th', semester='1st', fee_type='exam_fee',
+            amount=Decimal('200'), due_date=date(2025, 2, 28)
+        )
+        cls.students = []
+        for idx, paid in enumerate((Decimal('1200'), Decimal('700'), Decimal('100'))):
+            student = Student.objects.create(
+                user=User.objects.create(
+                    username=f'dues{idx}', role='STUDENT', first_name='Student', last_name=str(idx)
+                ),
+                date_of_birth=date(2003, 1, 1), admission_date=date(2025, 1, 1),
+                course='BBA', intake='15th', semester='1st'
+            )
+            Payment.objects.create(student=student, amount_paid=paid, payment_date=date(2025, 1, 10))
+            cls.students.append(student)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_students_with_dues_sorted_by_amount(self):
+        response = self.client.get('/api/reports/payments/dues/', {'course': 'BBA'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['summary'], {
+            'total_students': 3, 'students_with_dues': 2,
+            'total_paid': 2000.0, 'total_credits': 2000.0, 'total_due': 1600.0
+        })
+        self.assertEqual(
+            [(row['student_id'], row['due_amount']) for row in response.data['data']],
+            [(self.students[2].student_id, 1100.0), (self.students[1].student_id, 500.0)]
+        )
+        self.assertEqual(response.data['data'][0]['student_name'], 'Student 2')
+        self.assertEqual(response.data['data'][0]['total_fee'], 1200.0)
+        self.assertEqual(response.data['data'][0]['total_paid'], 100.0)
+
+    def test_paginated_dues(self):
+        response = self.client.get('/api/reports/payments/dues/', {'course': 'BBA', 'page_size': 1, 'page': 2})
+
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual([row['student_id'] for row in response.data['data']], [self.students[1].student_id])
+        self.assertEqual(response.data['summary']['students_with_dues'], 2)
+
+
+class DuesAgingTests(TestCase):
+    """
+    Outstanding dues bucketed by days past the fee due date
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', role='ADMIN')
+        for fee_type, amount, due_date in (
+            ('library_fee', '100', date(2024, 12, 1)),
+            ('tuition_fee', '1000', date(2025, 1, 15)),
+            ('exam_fee', '200', date(2025, 2, 20)),
+            ('tuition_fee', '500', date(2025, 3, 20)),
+            ('tuition_fee', '800', date(2025, 6, 30)),
+        ):
+            FeeStructure.objects.create(
+                course='BBA', intake='15th', semester='1st', fee_type=fee_type,
+                amount=Decimal(amount), due_date=due_date
+            )
+        cls.students = [
+            Student.objects.create(
+                user=User.objects.create(username=f'aging{idx}', role='STUDENT'),
+                date_of_birth=date(2003, 1, 1), admission_date=date(2024, 11, 1),
+                course='BBA', intake='15th', semester='1st'
+            )
+            for idx in range(2)
+        ]
+        # Unlinked: must settle only the oldest tuition installment
+        Payment.objects.create(
+            student=cls.students[0], fee_type='tuition_fee',
+            amount_paid=Decimal('1000'), payment_date=date(2025, 1, 10)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_buckets_by_days_past_due(self):
+        response = self.client.get('/api/reports/payments/dues_aging/', {'as_of': '2025-04-01'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data'], [{
+            'course': 'BBA', 'intake': '15th', 'students_with_dues': 2,
+            '0-30': 1000.0, '31-60': 400.0, '61-90': 1000.0, '90+': 200.0, 'total_due': 2600.0
+        }])
+        self.assertEqual(response.data['summary']['total_due'], 2600.0)
+
+    def test_unlinked_payment_counts_once(self):
+        Payment.objects.create(
+            student=self.students[1], fee_type='tuition_fee',
+            amount_paid=Decimal('300'), payment_date=date(2025, 3, 1)
+        )
+
+        response = self.client.get('/api/reports/payments/dues_aging/', {'as_of': '2025-04-01'})
+
+        row = response.data['data'][0]
+        self.assertEqual(row['61-90'], 700.0)
+        self.assertEqual(row['0-30'], 1000.0)
+        self.assertEqual(row['total_due'], 2300.0)
+
+    def test_invalid_as_of(self):
+        response = self.client.get('/api/reports/payments/dues_aging/', {'as_of': '01/04/2025'})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class CurrentSemesterReportTests(TestCase):
+    """
+    Cursor-paginated current semester payments
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', role='ADMIN')
+        cls.student = Student.objects.create(
+            user=User.objects.create(username='nameless', role='STUDENT'),
+            date_of_birth=date(2003, 1, 1), admission_date=date(2025, 1, 1),
+            course='BBA', intake='15th', semester='1st'
+        )
+        # Several payments on one day: the cursor must still walk them all once
+        cls.payments = [
+            Payment.objects.create(
+                student=cls.student, amount_paid=Decimal('100'), payment_date=date(2025, 1, 10)
+            )
+            for _ in range(5)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_cursor_walks_every_payment_once(self):
+        seen = []
+        response = self.client.get('/api/reports/payments/current_semester/', {'course': 'BBA', 'page_size': 2})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['stats']['payment_count'], 5)
+            seen.extend(payment['id'] for payment in response.data['payments'])
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+
+        self.assertEqual(seen, sorted((payment.id for payment in self.payments), reverse=True))
+
+    def test_student_name_falls_back_to_username(self):
+        # Stats and one page: the name columns load with the page, not per row
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/reports/payments/current_semester/', {'page_size': 2})
 
-# Create your tests here.
+        self.assertEqual(response.data['payments'][0]['student_name'], 'nameless')
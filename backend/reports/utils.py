@@ -0,0 +1,124 @@
+"""
+Utility functions for reports app
+Includes the SQL-side dues aging computation
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection
+
+from accounts.models import Student
+from payments.models import ArchivedPayment, FeeStructure, Payment
+
+AGING_BUCKETS = ('0-30', '31-60', '61-90', '90+')
+
+AGING_SQL = """
+WITH payment AS (
+    SELECT id, student_id, fee_structure_id, fee_type, amount_paid, discount_amount FROM {payment}
+    UNION ALL
+    SELECT id, student_id, fee_structure_id, fee_type, amount_paid, discount_amount FROM {archived_payment}
+),
+unlinked AS (
+    SELECT p.student_id, fs.id AS fee_structure_id, p.amount_paid - p.discount_amount AS amount,
+           ROW_NUMBER() OVER (PARTITION BY p.id ORDER BY fs.due_date, fs.id) AS position
+    FROM payment p
+    JOIN {student} s ON s.id = p.student_id
+    JOIN {fee} fs ON fs.course = s.course AND fs.intake = s.intake
+        AND fs.semester = s.semester AND fs.fee_type = p.fee_type
+    WHERE p.fee_structure_id IS NULL
+),
+paid AS (
+    SELECT student_id, fee_structure_id, SUM(amount) AS amount
+    FROM (
+        SELECT p.student_id, p.fee_structure_id, p.amount_paid - p.discount_amount AS amount
+        FROM payment p
+        WHERE p.fee_structure_id IS NOT NULL
+        UNION ALL
+        SELECT student_id, fee_structure_id, amount
+        FROM unlinked
+        WHERE position = 1
+    ) allocated
+    GROUP BY student_id, fee_structure_id
+),
+owed AS (
+    SELECT s.id AS student_id, s.course, s.intake, fs.due_date,
+           fs.amount - COALESCE(paid.amount, 0) AS outstanding
+    FROM {student} s
+    JOIN {fee} fs ON fs.course = s.course AND fs.intake = s.intake AND fs.semester = s.semester
+    LEFT JOIN paid ON paid.student_id = s.id AND paid.fee_structure_id = fs.id
+    WHERE fs.due_date <= %s AND fs.amount > COALESCE(paid.amount, 0){where}
+)
+SELECT course, intake,
+       COUNT(DISTINCT student_id),
+       SUM(CASE WHEN due_date >= %s THEN outstanding ELSE 0 END),
+       SUM(CASE WHEN due_date < %s AND due_date >= %s THEN outstanding ELSE 0 END),
+       SUM(CASE WHEN due_date < %s AND due_date >= %s THEN outstanding ELSE 0 END),
+       SUM(CASE WHEN due_date < %s THEN outstanding ELSE 0 END),
+       SUM(outstanding)
+FROM owed
+GROUP BY course, intake
+ORDER BY course, intake
+"""
+
+
+def to_money(value):
+    """Normalise a SUM() result (Decimal on PostgreSQL, float/int on SQLite) to 2dp"""
+    return Decimal(str(value or 0)).quantize(Decimal('0.01'))
+
+
+def dues_aging(as_of, course=None, intake=None):
+    """
+    Bucket outstanding dues by days past FeeStructure.due_date per course/intake
+
+    Every student is charged the fee structures of their current
+    course/intake/semester. Payments count toward the fee structure they are
+    linked to, or, when unlinked, toward the oldest of the cohort's fee
+    structures of the same fee_type (so each payment is counted once).
+    Payments with neither carry no due date and are not allocated.
+    Payments moved to the archive with their cohort still count.
+    Only fee structures already due on as_of are included.
+    The whole report is one grouped query.
+
+    Args:
+        as_of: Date the ages are measured from
+        course: Course code (optional)
+        intake: Intake number (optional)
+
+    Returns:
+        List of dicts, one per course/intake
+    """
+    where = ''
+    filter_params = []
+    if course:
+        where += ' AND s.course = %s'
+        filter_params.append(course)
+    if intake:
+        where += ' AND s.intake = %s'
+        filter_params.append(intake)
+
+    sql = AGING_SQL.format(
+        payment=connection.ops.quote_name(Payment._meta.db_table),
+        archived_payment=connection.ops.quote_name(ArchivedPayment._meta.db_table),
+        student=connection.ops.quote_name(Student._meta.db_table),
+        fee=connection.ops.quote_name(FeeStructure._meta.db_table),
+        where=where
+    )
+    day_30 = as_of - timedelta(days=30)
+    day_60 = as_of - timedelta(days=60)
+    day_90 = as_of - timedelta(days=90)
+    params = [as_of, *filter_params, day_30, day_30, day_60, day_60, day_90, day_90]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    return [
+        {
+            'course': row[0],
+            'intake': row[1],
+            'students_with_dues': row[2],
+            **{bucket: to_money(value) for bucket, value in zip(AGING_BUCKETS, row[3:7])},
+            'total_due': to_money(row[7]),
+        }
+        for row in rows
+    ]
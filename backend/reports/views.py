@@ -1,13 +1,18 @@
-from rest_framework import viewsets
+from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum, Count, Q
+from django.db.models import Sum, Count, Q, DecimalField, Value, Exists, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from datetime import datetime
 from decimal import Decimal
 
+from config.pagination import StandardResultsSetPagination, CursorResultsSetPagination
+from config.exports import EXPORT_FORMATS, export_response
 from accounts.models import Student
-from payments.models import Payment, FeeStructure
+from payments.models import ArchivedPayment, Payment, FeeStructure, DailyFinancialRollup
 from academics.models import Result, Exam
+from .utils import AGING_BUCKETS, dues_aging
 
 
 class PaymentReportViewSet(viewsets.ViewSet):
@@ -25,32 +30,45 @@ class PaymentReportViewSet(viewsets.ViewSet):
         course = request.query_params.get('course')
         intake = request.query_params.get('intake')
         
-        # Build filter for students
+        # Build filter for rollup rows and students
+        rollup_filter = Q(kind='payment')
         student_filter = Q()
         if course:
-            student_filter &= Q(student__course=course)
+            rollup_filter &= Q(course=course)
+            student_filter &= Q(course=course)
         if intake:
-            student_filter &= Q(student__intake=intake)
+            rollup_filter &= Q(intake=intake)
+            student_filter &= Q(intake=intake)
         
-        # Aggregate payments by semester
-        semester_payments = Payment.objects.filter(student_filter).values(
-            'student__semester'
+        # Aggregate payments by semester from the daily rollup
+        semester_payments = DailyFinancialRollup.objects.filter(rollup_filter).values(
+            'semester'
         ).annotate(
-            total_amount=Sum('amount_paid'),
-            total_discount=Sum('discount_amount'),
-            payment_count=Count('id'),
-            student_count=Count('student', distinct=True)
-        ).order_by('student__semester')
+            total_amount=Sum('total_amount'),
+            total_discount=Sum('total_discount'),
+            payment_count=Sum('entry_count')
+        ).order_by('semester')
+        
+        # Distinct paying students can't be summed from the rollup; count them per semester.
+        # The rollup keeps archived payments, so their students count too.
+        student_counts = dict(
+            Student.objects.filter(student_filter).filter(
+                Exists(Payment.objects.filter(student=OuterRef('pk')))
+                | Exists(ArchivedPayment.objects.filter(student=OuterRef('pk')))
+            ).order_by().values('semester').annotate(
+                count=Count('id')
+            ).values_list('semester', 'count')
+        )
         
         result = []
         for item in semester_payments:
             result.append({
-                'semester': item['student__semester'],
+                'semester': item['semester'],
                 'total_amount': float(item['total_amount'] or 0),
                 'total_discount': float(item['total_discount'] or 0),
                 'net_amount': float((item['total_amount'] or 0) - (item['total_discount'] or 0)),
                 'payment_count': item['payment_count'],
-                'student_count': item['student_count']
+                'student_count': student_counts.get(item['semester'], 0)
             })
         
         return Response({
@@ -63,6 +81,9 @@ class PaymentReportViewSet(viewsets.ViewSet):
     def current_semester(self, request):
         """
         Get payments for current semester students
+        Payments are cursor-paginated, most recently recorded first
+        (page_size, cursor);
+        stats cover every matching payment, not just the current page.
         """
         course = request.query_params.get('course')
         intake = request.query_params.get('intake')
@@ -75,9 +96,7 @@ class PaymentReportViewSet(viewsets.ViewSet):
         if intake:
             student_filter &= Q(student__intake=intake)
         
-        payments = Payment.objects.filter(student_filter).select_related(
-            'student', 'student__user'
-        ).order_by('-payment_date')
+        payments = Payment.objects.filter(student_filter)
         
         # Aggregate stats
         stats = payments.aggregate(
@@ -87,9 +106,21 @@ class PaymentReportViewSet(viewsets.ViewSet):
             student_count=Count('student', distinct=True)
         )
         
-        # Get payment details
+        # Get payment details, loading only the columns listed below
+        paginator = CursorResultsSetPagination()
+        page = paginator.paginate_queryset(
+            payments.select_related('student__user', 'fee_structure').only(
+                'id', 'amount_paid', 'discount_amount', 'payment_date', 'payment_method',
+                'fee_type', 'payment_regularity', 'student__student_id',
+                'student__user__username', 'student__user__first_name',
+                'student__user__last_name', 'fee_structure__fee_type'
+            ),
+            request,
+            view=self
+        )
+        
         payment_list = []
-        for p in payments[:100]:  # Limit to 100 for performance
+        for p in page:
             payment_list.append({
                 'id': p.id,
                 'student_name': p.student.user.get_full_name(),
@@ -112,6 +143,8 @@ class PaymentReportViewSet(viewsets.ViewSet):
                 'payment_count': stats['payment_count'],
                 'student_count': stats['student_count']
             },
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
             'payments': payment_list
         })
 
@@ -119,7 +152,11 @@ class PaymentReportViewSet(viewsets.ViewSet):
     def dues(self, request):
         """
         Get due amounts for course completion
-        Calculates total course fee - total paid per student
+        Reads fee charges, credits (payments net of discount) and balance from
+        each student's ledger, sorted by due amount in the database.
+        total_paid stays the gross amount paid (before discounts), as before;
+        total_credits is the net figure the balance is computed from.
+        Pass page/page_size to paginate the student list.
         """
         course = request.query_params.get('course')
         intake = request.query_params.get('intake')
@@ -134,55 +171,160 @@ class PaymentReportViewSet(viewsets.ViewSet):
         if semester:
             student_filter &= Q(semester=semester)
         
-        students = Student.objects.filter(student_filter).select_related('user')
+        money = DecimalField(max_digits=15, decimal_places=2)
+        zero = Value(Decimal('0.00'), output_field=money)
         
-        dues_list = []
-        total_due = Decimal('0.00')
-        total_paid = Decimal('0.00')
-        
-        for student in students:
-            # Get total paid by student
-            paid = Payment.objects.filter(student=student).aggregate(
-                total=Sum('amount_paid')
-            )['total'] or Decimal('0.00')
-            
-            # Get total fee for student's course/intake/semester
-            fee_total = FeeStructure.objects.filter(
-                course=student.course,
-                intake=student.intake,
-                semester=student.semester
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-            
-            due = fee_total - paid
-            total_paid += paid
-            total_due += max(due, Decimal('0.00'))
-            
-            if due > 0:
-                dues_list.append({
-                    'student_id': student.student_id,
-                    'student_name': student.user.get_full_name(),
-                    'course': student.course,
-                    'intake': student.intake,
-                    'semester': student.semester,
-                    'total_fee': float(fee_total),
-                    'total_paid': float(paid),
-                    'due_amount': float(due)
-                })
+        # Gross payments per student, archived ones included like the ledger
+        paid_per_student = [
+            Coalesce(Subquery(
+                model.objects.filter(student=OuterRef('pk')).order_by().values('student').annotate(
+                    total=Sum('amount_paid')
+                ).values('total'),
+                output_field=money
+            ), zero)
+            for model in (Payment, ArchivedPayment)
+        ]
+        
+        # Balances are maintained on the student ledger, so this is a plain join
+        students = Student.objects.filter(student_filter).annotate(
+            total_paid=paid_per_student[0] + paid_per_student[1],
+            total_credits=Coalesce('ledger__total_credits', zero),
+            total_fee=Coalesce('ledger__total_charges', zero),
+            due_amount=Coalesce('ledger__balance', zero),
+        )
         
-        # Sort by due amount descending
-        dues_list.sort(key=lambda x: x['due_amount'], reverse=True)
+        summary = students.aggregate(
+            total_students=Count('id'),
+            students_with_dues=Count('id', filter=Q(due_amount__gt=0)),
+            paid_sum=Sum('total_paid'),
+            credit_sum=Sum('total_credits'),
+            due_sum=Sum('due_amount', filter=Q(due_amount__gt=0))
+        )
         
-        return Response({
+        dues = students.filter(due_amount__gt=0).order_by('-due_amount', 'student_id').values(
+            'student_id', 'user__username', 'user__first_name', 'user__last_name',
+            'course', 'intake', 'semester', 'total_fee', 'total_paid', 'total_credits', 'due_amount'
+        )
+        
+        # Paginate in the database when the client asks for pages
+        paginator = None
+        if 'page' in request.query_params or 'page_size' in request.query_params:
+            paginator = StandardResultsSetPagination()
+            dues = paginator.paginate_queryset(dues, request, view=self)
+        
+        dues_list = []
+        for row in dues:
+            dues_list.append({
+                'student_id': row['student_id'],
+                'student_name': f"{row['user__first_name']} {row['user__last_name']}".strip() or row['user__username'],
+                'course': row['course'],
+                'intake': row['intake'],
+                'semester': row['semester'],
+                'total_fee': float(row['total_fee']),
+                'total_paid': float(row['total_paid']),
+                'total_credits': float(row['total_credits']),
+                'due_amount': float(row['due_amount'])
+            })
+        
+        response = {
             'report_type': 'dues',
             'filters': {'course': course, 'intake': intake, 'semester': semester},
             'summary': {
-                'total_students': len(students),
-                'students_with_dues': len(dues_list),
-                'total_paid': float(total_paid),
-                'total_due': float(total_due)
+                'total_students': summary['total_students'],
+                'students_with_dues': summary['students_with_dues'],
+                'total_paid': float(summary['paid_sum'] or 0),
+                'total_credits': float(summary['credit_sum'] or 0),
+                'total_due': float(summary['due_sum'] or 0)
             },
             'data': dues_list
-        })
+        }
+        if paginator:
+            response.update({
+                'count': paginator.page.paginator.count,
+                'next': paginator.get_next_link(),
+                'previous': paginator.get_previous_link(),
+            })
+        
+        return Response(response)
+
+    @action(detail=False, methods=['get'])
+    def dues_aging(self, request):
+        """
+        Get outstanding dues bucketed by days past the fee due date
+        (0-30, 31-60, 61-90, 90+) per course/intake, from one grouped query.
+        Query params: course, intake, as_of (YYYY-MM-DD, default today),
+        page/page_size to paginate, file_format (csv|xlsx) to download
+        """
+        course = request.query_params.get('course')
+        intake = request.query_params.get('intake')
+        as_of_str = request.query_params.get('as_of')
+        file_format = request.query_params.get('file_format')
+        
+        try:
+            as_of = datetime.strptime(as_of_str, '%Y-%m-%d').date() if as_of_str else datetime.now().date()
+        except ValueError:
+            return Response(
+                {'error': 'Invalid date format. Use YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if file_format and file_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': 'file_format must be csv or xlsx'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        rows = dues_aging(as_of, course=course, intake=intake)
+        
+        if file_format:
+            header = ['Course', 'Intake', 'Students With Dues', *[f'{b} Days' for b in AGING_BUCKETS], 'Total Due']
+            export_rows = [header] + [
+                [row['course'], row['intake'], row['students_with_dues'],
+                 *[row[b] for b in AGING_BUCKETS], row['total_due']]
+                for row in rows
+            ]
+            try:
+                return export_response(export_rows, f'dues_aging_{as_of}', file_format, sheet_title='Dues Aging')
+            except ValueError as e:
+                return Response(
+                    {'error': str(e)},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        summary = {bucket: float(sum(row[bucket] for row in rows)) for bucket in AGING_BUCKETS}
+        summary['total_due'] = float(sum(row['total_due'] for row in rows))
+        summary['students_with_dues'] = sum(row['students_with_dues'] for row in rows)
+        
+        paginator = None
+        page = rows
+        if 'page' in request.query_params or 'page_size' in request.query_params:
+            paginator = StandardResultsSetPagination()
+            page = paginator.paginate_queryset(rows, request, view=self)
+        
+        response = {
+            'report_type': 'dues_aging',
+            'filters': {'course': course, 'intake': intake, 'as_of': as_of},
+            'buckets': list(AGING_BUCKETS),
+            'summary': summary,
+            'data': [
+                {
+                    'course': row['course'],
+                    'intake': row['intake'],
+                    'students_with_dues': row['students_with_dues'],
+                    **{bucket: float(row[bucket]) for bucket in AGING_BUCKETS},
+                    'total_due': float(row['total_due'])
+                }
+                for row in page
+            ]
+        }
+        if paginator:
+            response.update({
+                'count': paginator.page.paginator.count,
+                'next': paginator.get_next_link(),
+                'previous': paginator.get_previous_link(),
+            })
+        
+        return Response(response)
 
     @action(detail=False, methods=['get'])
     def fee_type_summary(self, request):
@@ -193,18 +335,18 @@ class PaymentReportViewSet(viewsets.ViewSet):
         intake = request.query_params.get('intake')
         
         # Build filter
-        payment_filter = Q()
+        rollup_filter = Q(kind='payment')
         if course:
-            payment_filter &= Q(student__course=course)
+            rollup_filter &= Q(course=course)
         if intake:
-            payment_filter &= Q(student__intake=intake)
+            rollup_filter &= Q(intake=intake)
         
-        # Aggregate by direct fee_type field
-        fee_type_payments = Payment.objects.filter(payment_filter).exclude(
-            fee_type__isnull=True
-        ).exclude(fee_type='').values('fee_type').annotate(
-            total_amount=Sum('amount_paid'),
-            payment_count=Count('id')
+        # Aggregate by direct fee_type field from the daily rollup
+        fee_type_payments = DailyFinancialRollup.objects.filter(rollup_filter).exclude(
+            fee_type=''
+        ).values('fee_type').annotate(
+            total_amount=Sum('total_amount'),
+            payment_count=Sum('entry_count')
         ).order_by('-total_amount')
         
         result = []
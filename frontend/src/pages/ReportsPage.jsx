@@ -326,7 +326,7 @@ const ReportsPage = () => {
 
       autoTable(doc, {
         startY: yPos,
-        head: [['Student ID', 'Name', 'Course', 'Intake', 'Semester', 'Total Fee', 'Paid', 'Due']],
+        head: [['Student ID', 'Name', 'Course', 'Intake', 'Semester', 'Total Fee', 'Paid (net)', 'Due']],
         body: duesData.data.map(d => [
           d.student_id,
           d.student_name,
@@ -334,7 +334,7 @@ const ReportsPage = () => {
           d.intake,
           d.semester,
           `TK ${d.total_fee?.toLocaleString() || 0}`,
-          `TK ${d.total_paid?.toLocaleString() || 0}`,
+          `TK ${d.total_credits?.toLocaleString() || 0}`,
           `TK ${d.due_amount?.toLocaleString() || 0}`,
         ]),
         styles: { fontSize: 8 },
@@ -664,7 +664,7 @@ const ReportsPage = () => {
                           <th className="px-4 py-3 text-left text-xs font-medium text-gray-500 uppercase">Student</th>
                           <th className="px-4 py-3 text-left text-xs font-medium text-gray-500 uppercase">Course</th>
                           <th className="px-4 py-3 text-left text-xs font-medium text-gray-500 uppercase">Total Fee</th>
-                          <th className="px-4 py-3 text-left text-xs font-medium text-gray-500 uppercase">Paid</th>
+                          <th className="px-4 py-3 text-left text-xs font-medium text-gray-500 uppercase">Paid (net)</th>
                           <th className="px-4 py-3 text-left text-xs font-medium text-gray-500 uppercase">Due</th>
                         </tr>
                       </thead>
@@ -677,7 +677,7 @@ const ReportsPage = () => {
                             </td>
                             <td className="px-4 py-3 text-sm">{d.course} - {d.intake}</td>
                             <td className="px-4 py-3 text-sm">৳{d.total_fee?.toLocaleString()}</td>
-                            <td className="px-4 py-3 text-sm text-green-600">৳{d.total_paid?.toLocaleString()}</td>
+                            <td className="px-4 py-3 text-sm text-green-600">৳{d.total_credits?.toLocaleString()}</td>
                             <td className="px-4 py-3 text-sm font-bold text-red-600">৳{d.due_amount?.toLocaleString()}</td>
                           </tr>
                         ))}
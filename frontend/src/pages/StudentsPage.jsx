@@ -46,7 +46,7 @@ const StudentsPage = () => {
   const fetchStudents = async () => {
     try {
       setLoading(true);
-      const response = await api.get('/accounts/students/', { params: { page_size: 10000 } });
+      const response = await api.get('/accounts/students/', { params: { page_size: 10000, view: 'full' } });
       setStudents(response.data.results || response.data || []);
     } catch (error) {
       console.error('Error fetching students:', error);
@@ -415,7 +415,7 @@ const StudentsPage = () => {
                           {student.photo ? (
                             <img
                               className="h-10 w-10 rounded-full object-cover"
-                              src={student.photo}
+                              src={student.photo_thumbnail || student.photo}
                               alt=""
                             />
                           ) : (
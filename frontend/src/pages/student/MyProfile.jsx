@@ -13,7 +13,7 @@ const MyProfile = () => {
       setLoading(true);
       try {
         const studentResponse = await api.get('/accounts/students/', {
-          params: { user: user?.id }
+          params: { user: user?.id, view: 'full' }
         });
         const students = studentResponse.data.results || studentResponse.data;
         const studentProfile = students.find(s => s.user?.id === user?.id) || students[0];